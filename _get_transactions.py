@@ -6,7 +6,7 @@ import re
 from dateutil.parser import parse
 
 from db.team import Team
-from db.player import Player
+from utils.player_name_index import get_player_name_index
 from utils.player_finder import PlayerFinder
 
 
@@ -90,17 +90,7 @@ def retrieve_waiver_claim(transaction_raw_data):
 
     # using only first letter of found position
     position = position[0]
-    # first trying to find player by full name and position
-    plr = Player.find_by_full_name(plr_name, position[0])
-    # then trying to find player by full name only
-    if plr is None:
-        plr = Player.find_by_full_name(plr_name)
-    # at last naively splitting full name into first and last name and
-    # trying to find player accordingly
-    if plr is None:
-        first_name, last_name = plr_name.split(" ", 2)
-        plr = Player.find_by_name_extended(
-            first_name, last_name)
+    plr = find_player_in_transaction(position, plr_name)
 
     if plr is None:
         print(
@@ -115,17 +105,17 @@ def find_player_in_transaction(position, plr_name):
     """
     Finds actual player in database.
     """
+    name_index = get_player_name_index()
     # first trying to find player by full name and position
-    plr = Player.find_by_full_name(plr_name, position[0])
+    plr = name_index.find_by_full_name(plr_name, position[0])
     # then trying to find player by full name only
     if plr is None:
-        plr = Player.find_by_full_name(plr_name)
+        plr = name_index.find_by_full_name(plr_name)
     # at last naively splitting full name into first and last name and
     # trying to find player accordingly
     if plr is None:
         first_name, last_name = plr_name.strip().split(" ", 2)[:2]
-        plr = Player.find_by_name_extended(
-            first_name, last_name)
+        plr = name_index.find(first_name, last_name, position[0])
     return plr
 
 
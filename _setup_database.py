@@ -20,7 +20,7 @@ if __name__ == '__main__':
         'steps', metavar='setup_steps', help='Setup steps to execute.',
         choices=[
             'a', 'c', 't', 'd', 'p', 'pf', 'pc',
-            'ps', 'pd', 'cf', 'cft', 'dft', 'lc', 'ct'])
+            'ps', 'pd', 'pr', 'sd', 'sr', 'cf', 'cft', 'dft', 'lc', 'ct'])
     parser.add_argument(
         '--roster_src', dest='roster_src', action='store', default='roster',
         choices=['roster', 'system', 'contract'],
@@ -28,6 +28,9 @@ if __name__ == '__main__':
     parser.add_argument(
         '--draft_year', dest='draft_year', action='store', default=2017,
         help='draft year to retrieve players from', type=int)
+    parser.add_argument(
+        '--refresh', dest='refresh', action='store_true',
+        help='retrieve cached draft overview pages again')
     parser.add_argument(
         '--roster_season', dest='roster_season', action='store', default=None,
         help='season to retrieve roster players for')
@@ -37,6 +40,9 @@ if __name__ == '__main__':
     parser.add_argument(
         '--players', dest='players', nargs='+', action='store', type=int,
         default=None, help='players (as ids) to retrieve contracts for')
+    parser.add_argument(
+        '--season', dest='season', action='store', type=int, default=None,
+        help='season to derive player season statistics for')
     parser.add_argument(
         '--contract_count', dest='contract_count', action='store',
         type=int, default=5, help='number of latest signings to retrieve')
@@ -58,13 +64,24 @@ if __name__ == '__main__':
             args.roster_src, args.teams, args.roster_season)
     # creating players from draft overview
     if setup_steps in ['pc', 'a']:
-        cp.create_players_for_draft_year(args.draft_year)
+        cp.create_players_for_draft_year(args.draft_year, args.refresh)
     # retrieving player season statistics for all players in database
     if setup_steps in ['ps', 'a']:
         cpd.create_player_seasons()
     # retrieving individual player data for all players in database
     if setup_steps in ['pd', 'a']:
         cpd.create_player_data()
+    # refreshing season statistics, individual and draft data for all
+    # players in database (optionally only for players specified on command
+    # line) using a single retrieval per player
+    if setup_steps in ['pr']:
+        cpd.refresh_players(args.players)
+    # deriving season statistics from parsed games for all players in
+    # database (optionally only for players specified on command line),
+    # either storing them or merely reconciling them with retrieved ones
+    if setup_steps in ['sd', 'sr']:
+        cpd.derive_player_seasons(
+            args.season, args.players, store=setup_steps == 'sd')
     # retrieving contract data for all players in database
     # (optionally only for players specified on command line)
     if setup_steps in ['c']:
@@ -75,7 +92,8 @@ if __name__ == '__main__':
     # retrieving latest contract signings
     if setup_steps in ['lc']:
         cpd.create_latest_contract_signings(args.contract_count)
-    # retrieving draft data for all players in database
+    # retrieving draft data for all players in database by importing all
+    # draft years as a whole
     if setup_steps in ['dft']:
         cpd.create_player_drafts()
     # retrieving capfriendly ids for all players in database
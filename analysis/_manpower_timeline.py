@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reconstructs continuous manpower and score state timelines for games from
+penalties, goals and shifts and calculates situational time on ice for teams
+and players from these.
+"""
+import logging
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import and_
+
+from utils import get_game_id_range
+from db.common import session_scope
+from db.game import Game
+from db.event import Event
+from db.goal import Goal
+from db.penalty import Penalty
+from db.shift import Shift
+from db.goalie_game import GoalieGame
+
+logger = logging.getLogger(__name__)
+
+PERIOD_LENGTH = 1200
+# penalties (by penalty minutes) affecting the number of skaters on ice
+MINOR_PIMS = [2, 4]
+MAJOR_PIMS = [5]
+# maximum number of penalties concurrently affecting a team's manpower
+MAX_PENALTIES = 2
+# first season with 4-on-4 regular season overtime
+FIRST_4V4_OVERTIME_SEASON = 1999
+# first season with 3-on-3 regular season overtime
+FIRST_3V3_OVERTIME_SEASON = 2015
+
+# situations time on ice is calculated for, always from a team's perspective
+SITUATIONS = [
+    'all', '5v5', 'ev', 'pp', 'sh', 'leading', 'trailing', 'tied',
+    'goalie_pulled'
+]
+# components of a compact timeline, each stored as a separate array
+TIMELINE_KEYS = [
+    'start', 'end', 'home_skaters', 'road_skaters',
+    'home_score', 'road_score', 'home_goalie', 'road_goalie'
+]
+
+
+def to_game_seconds(period, time):
+    """
+    Converts period and time elapsed in period into seconds elapsed in game.
+    """
+    return (period - 1) * PERIOD_LENGTH + time.seconds
+
+
+def retrieve_penalty_intervals(penalties, goals):
+    """
+    Retrieves intervals in which penalties affected a team's manpower from
+    specified penalties, i.e. tuples of game second, home/road key and penalty
+    minutes, and goals, i.e. tuples of game second and home/road key. Regards
+    coincidental penalties, stacked penalties and minor penalties being
+    terminated by power play goals.
+    """
+    active = {'home': list(), 'road': list()}
+    pending = {'home': list(), 'road': list()}
+    intervals = list()
+
+    def start_penalty(key, pim, start):
+        active[key].append(
+            {'start': start, 'end': start + pim * 60, 'pim': pim})
+
+    def expire_penalties(until):
+        # expiring penalties one by one as each one may activate a pending one
+        while True:
+            expiring = [
+                (p['end'], key, p) for key in active for
+                p in active[key] if p['end'] <= until]
+            if not expiring:
+                return
+            end, key, penalty = min(expiring, key=lambda x: x[0])
+            active[key].remove(penalty)
+            intervals.append((key, penalty['start'], end))
+            # stacked penalties start as soon as a previous one expires
+            if pending[key]:
+                start_penalty(key, pending[key].pop(0), end)
+
+    penalties_by_second = defaultdict(list)
+    for second, key, pim in penalties:
+        if pim in MINOR_PIMS or pim in MAJOR_PIMS:
+            penalties_by_second[second].append((key, pim))
+    goals_by_second = defaultdict(list)
+    for second, key in goals:
+        goals_by_second[second].append(key)
+
+    for second in sorted(set(penalties_by_second).union(goals_by_second)):
+        expire_penalties(second)
+
+        # goals are regarded before penalties called at the same time
+        for key in goals_by_second[second]:
+            other_key = 'road' if key == 'home' else 'home'
+            if len(active[other_key]) <= len(active[key]):
+                continue
+            minors = [p for p in active[other_key] if p['pim'] in MINOR_PIMS]
+            if not minors:
+                continue
+            penalty = min(minors, key=lambda p: p['end'])
+            # a power play goal only terminates the current part of a double
+            # minor penalty
+            if penalty['pim'] == 4 and penalty['end'] - second > 120:
+                penalty['end'] = second + 120
+            else:
+                penalty['end'] = second
+            expire_penalties(second)
+
+        called = penalties_by_second[second]
+        home_pims = sorted([pim for key, pim in called if key == 'home'])
+        road_pims = sorted([pim for key, pim in called if key == 'road'])
+        # single coincidental minors at full strength result in four-on-four
+        if not (
+            home_pims == road_pims == [2] and
+            not active['home'] and not active['road']
+        ):
+            # otherwise coincidental penalties don't affect manpower at all
+            for pim in set(home_pims).intersection(road_pims):
+                cancelled = min(home_pims.count(pim), road_pims.count(pim))
+                for _ in range(cancelled):
+                    home_pims.remove(pim)
+                    road_pims.remove(pim)
+
+        for key, pims in (('home', home_pims), ('road', road_pims)):
+            for pim in pims:
+                if len(active[key]) < MAX_PENALTIES:
+                    start_penalty(key, pim, second)
+                else:
+                    pending[key].append(pim)
+
+    # expiring all penalties left
+    while active['home'] or active['road']:
+        expire_penalties(max(
+            [p['end'] for key in active for p in active[key]]))
+
+    return intervals
+
+
+def count_intervals(starts, ends, length):
+    """
+    Counts the number of specified intervals covering each second of a
+    timeline with the given length.
+    """
+    counts = np.zeros(length + 1, dtype=np.int32)
+    starts = np.clip(np.asarray(starts, dtype=np.int64), 0, length)
+    ends = np.clip(np.asarray(ends, dtype=np.int64), 0, length)
+    np.add.at(counts, starts, 1)
+    np.add.at(counts, ends, -1)
+    return np.cumsum(counts)[:-1]
+
+
+def build_game_state(game, penalties, goals, shifts, goalie_ids):
+    """
+    Builds per-second manpower, score and goalie state arrays for specified
+    game using the given penalties (tuples of period, time, team id and
+    penalty minutes), goals (tuples of period, time and team id) and shifts.
+    The ids of all goalies dressed for the game are necessary to identify
+    whether a team pulled its goaltender.
+    """
+    keys = {game.home_team_id: 'home', game.road_team_id: 'road'}
+
+    # shootouts are not part of the game's timeline
+    def in_game(period):
+        return not (game.type == 2 and period > 4)
+
+    shifts = [s for s in shifts if in_game(s.period) and s.team_id in keys]
+    shift_starts = np.array(
+        [to_game_seconds(s.period, s.start) for s in shifts], dtype=np.int64)
+    shift_ends = np.array(
+        [to_game_seconds(s.period, s.end) for s in shifts], dtype=np.int64)
+
+    penalties = [
+        (to_game_seconds(period, time), keys[team_id], pim) for
+        period, time, team_id, pim in penalties if
+        in_game(period) and team_id in keys]
+    goals = [
+        (to_game_seconds(period, time), keys[team_id]) for
+        period, time, team_id in goals if in_game(period) and team_id in keys]
+
+    # game is lasting at least three periods, or until the last shift ended
+    length = max(
+        [3 * PERIOD_LENGTH] + shift_ends.tolist() +
+        [second + 1 for second, _ in goals])
+
+    state = dict()
+    state['length'] = length
+
+    penalty_intervals = retrieve_penalty_intervals(penalties, goals)
+
+    for key in ['home', 'road']:
+        # counting penalties affecting manpower for each second
+        intervals = [(s, e) for k, s, e in penalty_intervals if k == key]
+        state["%s_penalties" % key] = count_intervals(
+            [s for s, _ in intervals], [e for _, e in intervals], length)
+        # accumulating score for each second
+        goal_seconds = [second for second, k in goals if k == key]
+        state["%s_score" % key] = count_intervals(
+            goal_seconds, [length] * len(goal_seconds), length)
+        # determining whether a goalie was on ice for each second
+        goalie_mask = np.array([
+            s.player_id in goalie_ids and keys[s.team_id] == key for
+            s in shifts], dtype=bool)
+        if goalie_mask.any():
+            state["%s_goalie" % key] = count_intervals(
+                shift_starts[goalie_mask], shift_ends[goalie_mask],
+                length) > 0
+        # assuming goalie was in net all the time if there are no shifts
+        else:
+            state["%s_goalie" % key] = np.ones(length, dtype=bool)
+
+    home_penalties = state['home_penalties']
+    road_penalties = state['road_penalties']
+    state['home_skaters'] = 5 - home_penalties
+    state['road_skaters'] = 5 - road_penalties
+    overtime = slice(3 * PERIOD_LENGTH, length)
+    penalty_diff = road_penalties[overtime] - home_penalties[overtime]
+    # regular season overtime is played three-on-three since 2015-16,
+    # penalties result in additional skaters for the other team
+    if game.type == 2 and game.season >= FIRST_3V3_OVERTIME_SEASON:
+        state['home_skaters'][overtime] = 3 + np.clip(penalty_diff, 0, 2)
+        state['road_skaters'][overtime] = 3 + np.clip(-penalty_diff, 0, 2)
+    # from 1999-00 to 2014-15 regular season overtime was played
+    # four-on-four, a first penalty takes the penalized team down to three
+    # skaters, a second one results in a fifth skater for the other team
+    elif game.type == 2 and game.season >= FIRST_4V4_OVERTIME_SEASON:
+        state['home_skaters'][overtime] = (
+            4 - np.clip(-penalty_diff, 0, 1) +
+            np.clip(penalty_diff - 1, 0, 1))
+        state['road_skaters'][overtime] = (
+            4 - np.clip(penalty_diff, 0, 1) +
+            np.clip(-penalty_diff - 1, 0, 1))
+
+    state['shifts'] = shifts
+    state['shift_starts'] = shift_starts
+    state['shift_ends'] = shift_ends
+
+    return state
+
+
+def compress_game_state(state):
+    """
+    Compresses per-second game state arrays into a compact timeline of
+    intervals with constant manpower, score and goalie state.
+    """
+    state_keys = TIMELINE_KEYS[2:]
+    changes = np.zeros(state['length'], dtype=bool)
+    changes[0] = True
+    for key in state_keys:
+        changes[1:] |= state[key][1:] != state[key][:-1]
+
+    starts = np.flatnonzero(changes)
+    timeline = dict()
+    timeline['start'] = starts
+    timeline['end'] = np.append(starts[1:], state['length'])
+    for key in state_keys:
+        timeline[key] = state[key][starts]
+
+    return timeline
+
+
+def lookup_situations(timeline, game_seconds):
+    """
+    Looks up indices of timeline intervals for all specified game seconds,
+    e.g. to retrieve manpower and score state for a number of events at once.
+    """
+    return np.searchsorted(
+        timeline['start'], np.asarray(game_seconds), side='right') - 1
+
+
+def retrieve_situation_masks(state, key):
+    """
+    Retrieves per-second masks for all situations from the perspective of the
+    team specified by its home/road key.
+    """
+    other_key = 'road' if key == 'home' else 'home'
+    own_skaters = state["%s_skaters" % key]
+    other_skaters = state["%s_skaters" % other_key]
+    own_score = state["%s_score" % key]
+    other_score = state["%s_score" % other_key]
+    own_goalie = state["%s_goalie" % key]
+    other_goalie = state["%s_goalie" % other_key]
+
+    masks = np.empty((len(SITUATIONS), state['length']), dtype=bool)
+    masks[SITUATIONS.index('all')] = True
+    masks[SITUATIONS.index('5v5')] = (
+        (own_skaters == 5) & (other_skaters == 5) & own_goalie & other_goalie)
+    masks[SITUATIONS.index('ev')] = own_skaters == other_skaters
+    masks[SITUATIONS.index('pp')] = own_skaters > other_skaters
+    masks[SITUATIONS.index('sh')] = own_skaters < other_skaters
+    masks[SITUATIONS.index('leading')] = own_score > other_score
+    masks[SITUATIONS.index('trailing')] = own_score < other_score
+    masks[SITUATIONS.index('tied')] = own_score == other_score
+    masks[SITUATIONS.index('goalie_pulled')] = ~own_goalie
+
+    return masks
+
+
+def calculate_situational_toi(game, state):
+    """
+    Calculates time on ice (in seconds) in all situations for both teams and
+    each player participating in the specified game. Returns a list of
+    dictionaries, one for each team (with a player id of None) and player.
+    """
+    keys = {game.home_team_id: 'home', game.road_team_id: 'road'}
+    team_ids = np.array([s.team_id for s in state['shifts']], dtype=np.int64)
+    player_ids = np.array(
+        [s.player_id for s in state['shifts']], dtype=np.int64)
+
+    toi_rows = list()
+
+    for team_id, key in keys.items():
+        masks = retrieve_situation_masks(state, key)
+        cumulated = np.zeros(
+            (len(SITUATIONS), state['length'] + 1), dtype=np.int64)
+        np.cumsum(masks, axis=1, out=cumulated[:, 1:])
+
+        team_row = {
+            'game_id': game.game_id, 'team_id': team_id, 'player_id': None}
+        for situation, toi in zip(SITUATIONS, cumulated[:, -1]):
+            team_row["toi_%s" % situation] = int(toi)
+        toi_rows.append(team_row)
+
+        # calculating time on ice in each situation for all shifts at once
+        team_mask = team_ids == team_id
+        if not team_mask.any():
+            continue
+        shift_toi = (
+            cumulated[:, state['shift_ends'][team_mask]] -
+            cumulated[:, state['shift_starts'][team_mask]])
+        # summing up shift time on ice for each player
+        team_player_ids, player_idx = np.unique(
+            player_ids[team_mask], return_inverse=True)
+        player_toi = np.vstack([
+            np.bincount(
+                player_idx, weights=situation_toi,
+                minlength=len(team_player_ids)) for
+            situation_toi in shift_toi])
+
+        for i, player_id in enumerate(team_player_ids):
+            player_row = {
+                'game_id': game.game_id, 'team_id': team_id,
+                'player_id': int(player_id)}
+            for situation, toi in zip(SITUATIONS, player_toi[:, i]):
+                player_row["toi_%s" % situation] = int(toi)
+            toi_rows.append(player_row)
+
+    return toi_rows
+
+
+def process_season(season, game_type=2):
+    """
+    Reconstructs manpower and score state timelines and calculates
+    situational time on ice for all games of the specified season and game
+    type. Retrieves all necessary data with one query per database table.
+    """
+    first_game_id, last_game_id = get_game_id_range(season, game_type)
+
+    with session_scope() as session:
+        games = session.query(
+            Game.game_id, Game.season, Game.type,
+            Game.home_team_id, Game.road_team_id
+        ).filter(
+            and_(
+                Game.game_id >= first_game_id,
+                Game.game_id <= last_game_id
+            )).all()
+        penalties = session.query(
+            Event.game_id, Event.period, Event.time,
+            Penalty.team_id, Penalty.pim
+        ).filter(
+            and_(
+                Penalty.event_id == Event.event_id,
+                Event.game_id >= first_game_id,
+                Event.game_id <= last_game_id
+            )).all()
+        goals = session.query(
+            Event.game_id, Event.period, Event.time, Goal.team_id
+        ).filter(
+            and_(
+                Goal.event_id == Event.event_id,
+                Event.game_id >= first_game_id,
+                Event.game_id <= last_game_id
+            )).all()
+        shifts = session.query(
+            Shift.game_id, Shift.player_id, Shift.team_id,
+            Shift.period, Shift.start, Shift.end
+        ).filter(
+            and_(
+                Shift.game_id >= first_game_id,
+                Shift.game_id <= last_game_id
+            )).all()
+        goalies = session.query(
+            GoalieGame.game_id, GoalieGame.player_id
+        ).filter(
+            and_(
+                GoalieGame.game_id >= first_game_id,
+                GoalieGame.game_id <= last_game_id
+            )).all()
+
+    # grouping retrieved data by game
+    penalties_by_game = defaultdict(list)
+    for game_id, period, time, team_id, pim in penalties:
+        penalties_by_game[game_id].append((period, time, team_id, pim))
+    goals_by_game = defaultdict(list)
+    for game_id, period, time, team_id in goals:
+        goals_by_game[game_id].append((period, time, team_id))
+    shifts_by_game = defaultdict(list)
+    for shift in shifts:
+        shifts_by_game[shift.game_id].append(shift)
+    goalies_by_game = defaultdict(set)
+    for game_id, player_id in goalies:
+        goalies_by_game[game_id].add(player_id)
+
+    timelines = dict()
+    toi_rows = list()
+
+    for game in sorted(games, key=lambda g: g.game_id):
+        state = build_game_state(
+            game, penalties_by_game[game.game_id], goals_by_game[game.game_id],
+            shifts_by_game[game.game_id], goalies_by_game[game.game_id])
+        timelines[game.game_id] = compress_game_state(state)
+        toi_rows.extend(calculate_situational_toi(game, state))
+
+    logger.info(
+        "+ Manpower and score state timelines reconstructed " +
+        "for %d games" % len(timelines))
+
+    return timelines, toi_rows
+
+
+def save_timelines(tgt_path, timelines):
+    """
+    Saves timelines of multiple games (by game id) in a single compressed
+    archive of concatenated arrays.
+    """
+    game_ids = sorted(timelines)
+    arrays = dict()
+    arrays['game_id'] = np.concatenate([
+        np.full(len(timelines[game_id]['start']), game_id, dtype=np.int64)
+        for game_id in game_ids] or [np.empty(0, dtype=np.int64)])
+    for key in TIMELINE_KEYS:
+        arrays[key] = np.concatenate([
+            timelines[game_id][key] for game_id in game_ids] or [
+                np.empty(0, dtype=np.int64)])
+    np.savez_compressed(tgt_path, **arrays)
+
+
+def load_timelines(src_path):
+    """
+    Loads timelines of multiple games previously saved to the specified
+    location.
+    """
+    arrays = np.load(src_path)
+    game_ids = arrays['game_id']
+    timelines = dict()
+    # timelines were saved in sorted game id order
+    unique_game_ids, first_idx = np.unique(game_ids, return_index=True)
+    last_idx = np.append(first_idx[1:], len(game_ids))
+    for game_id, first, last in zip(unique_game_ids, first_idx, last_idx):
+        timelines[int(game_id)] = {
+            key: arrays[key][first:last] for key in TIMELINE_KEYS}
+
+    return timelines
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import argparse
+from collections import defaultdict
+
+from dateutil.parser import parse
+
+from utils import retrieve_season
+from utils.season_archive import SeasonArchive, get_season_archive_path
+
+FILENAME_REGEX = re.compile(R'^\d{4}\-\d{2}\-\d{2}$')
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(
+        description='Collect daily zip files of downloaded NHL game ' +
+        'summary reports in seekable per-season archives.')
+    parser.add_argument(
+        '-d', '--src_dir', dest='src_dir', required=True,
+        metavar='summary data source directory',
+        help="Source directory for downloaded NHL game summary reports")
+    parser.add_argument(
+        '-t', '--tgt_dir', dest='tgt_dir', required=False,
+        metavar='season archive target directory',
+        help="Target directory for season archives, defaults to source " +
+        "directory")
+    parser.add_argument(
+        '-s', '--season', dest='season', required=False, type=int,
+        metavar='season to archive',
+        help="Season to archive summaries for, i.e. 2016 for 2016/17")
+
+    args = parser.parse_args()
+
+    tgt_dir = args.tgt_dir if args.tgt_dir else args.src_dir
+
+    # collecting daily zip files by season
+    zip_files = defaultdict(list)
+    for root, dirs, files in os.walk(args.src_dir):
+        for file in files:
+            fname, ext = os.path.splitext(file)
+            if ext.lower() != '.zip' or not re.search(FILENAME_REGEX, fname):
+                continue
+            game_date = parse(fname).date()
+            season = retrieve_season(game_date)
+            if args.season and season != args.season:
+                continue
+            zip_files[season].append((str(game_date), os.path.join(root, file)))
+
+    # appending contents of daily zip files to season archives, archives
+    # are only extended by files that have changed since the last run
+    for season in sorted(zip_files):
+        archive_path = get_season_archive_path(tgt_dir, season)
+        print("+ Archiving summaries for %d/%d in %s" % (
+            season, season + 1, archive_path))
+        with SeasonArchive(archive_path) as archive:
+            for game_date, zip_path in sorted(zip_files[season]):
+                appended = archive.append_zip(zip_path, game_date)
+                if appended:
+                    print("\t+ %s: %d files" % (game_date, appended))
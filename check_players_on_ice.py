@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from utils.on_ice_matcher import check_players_on_ice_for_season
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(
+        description='Validate players on ice for events using shift data.')
+    parser.add_argument(
+        '-s', '--season', dest='season', required=True, type=int,
+        metavar='season to validate players on ice for',
+        help="Season for which players on ice will be validated")
+    parser.add_argument(
+        '-t', '--type', dest='season_type', required=False,
+        metavar='season type', choices=['RS', 'PO'], default='RS',
+        help="Season type, e.g. regular season (RS) or playoffs (PO)")
+
+    args = parser.parse_args()
+
+    if args.season_type == 'PO':
+        game_type = 3
+    else:
+        game_type = 2
+
+    matches_by_game = check_players_on_ice_for_season(args.season, game_type)
+
+    print("+ Players on ice validated for %d games" % len(matches_by_game))
+
+    for game_id in sorted(matches_by_game):
+        discrepancies = [
+            m for m in matches_by_game[game_id] if
+            m.not_on_shift or m.not_on_ice]
+        if not discrepancies:
+            continue
+        print("\t+ %d: %d of %d events with discrepancies" % (
+            game_id, len(discrepancies), len(matches_by_game[game_id])))
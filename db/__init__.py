@@ -2,11 +2,18 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from collections import defaultdict
+
+from sqlalchemy import tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert
 
 from .common import session_scope
 
 logger = logging.getLogger()
 
+# maximum number of rows per multi-row statement when bulk loading items
+BULK_BATCH_SIZE = 1000
+
 
 def delete_db_item(db_item):
     with session_scope() as session:
@@ -43,6 +50,99 @@ def create_or_update_db_item(db_item, new_item):
         session.commit()
 
 
+def create_or_update_db_items(db_and_new_items):
+    """
+    Creates or updates multiple database items within a single transaction.
+    Expects pairs of existing (or None) and new database items. Returns
+    numbers of created and updated items.
+    """
+    created = updated = 0
+
+    with session_scope() as session:
+        for db_item, new_item in db_and_new_items:
+            if db_item is not None:
+                if db_item == new_item:
+                    continue
+                db_item.update(new_item)
+                session.merge(db_item)
+                updated += 1
+            else:
+                session.add(new_item)
+                created += 1
+        session.commit()
+
+    return created, updated
+
+
+def upsert_db_items(model, db_and_new_items, session=None):
+    """
+    Creates or updates multiple items of the specified model using multi-row
+    upserts keyed by primary key, all within a single transaction. Expects
+    pairs of existing (or None if unknown) and new items. Existing items are
+    updated from new items and only written if changed. Of new items only the
+    attributes actually set are written, rows with unchanged values remain
+    untouched. If a session is specified, statements are executed within it
+    and committing is up to the caller. Returns numbers of created and updated
+    rows.
+    """
+    table = model.__table__
+    pk_columns = [c.name for c in table.primary_key.columns]
+
+    # grouping rows by attributes set to allow for multi-row statements
+    rows_by_columns = defaultdict(list)
+    for db_item, new_item in db_and_new_items:
+        if db_item is None:
+            # leaving unset primary keys, i.e. serial ids, to the database
+            row = {
+                c.name: new_item.__dict__[c.name] for
+                c in table.columns if c.name in new_item.__dict__}
+            row = {
+                c: value for c, value in row.items() if
+                value is not None or c not in pk_columns}
+        elif db_item != new_item:
+            db_item.update(new_item)
+            row = {c.name: getattr(db_item, c.name) for c in table.columns}
+        else:
+            continue
+        rows_by_columns[tuple(row.keys())].append(row)
+
+    created = updated = 0
+
+    def execute(session):
+        nonlocal created, updated
+        for columns, rows in rows_by_columns.items():
+            value_columns = [c for c in columns if c not in pk_columns]
+            for i in range(0, len(rows), BULK_BATCH_SIZE):
+                stmt = insert(table).values(rows[i:i + BULK_BATCH_SIZE])
+                if value_columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=pk_columns,
+                        set_={c: stmt.excluded[c] for c in value_columns},
+                        where=tuple_(
+                            *[table.c[c] for c in value_columns]
+                        ).is_distinct_from(tuple_(
+                            *[stmt.excluded[c] for c in value_columns])))
+                else:
+                    stmt = stmt.on_conflict_do_nothing(
+                        index_elements=pk_columns)
+                # system column xmax is zero for freshly inserted rows only
+                stmt = stmt.returning(literal_column('xmax = 0'))
+                for row_created, in session.execute(stmt):
+                    if row_created:
+                        created += 1
+                    else:
+                        updated += 1
+
+    if session is not None:
+        execute(session)
+    else:
+        with session_scope() as session:
+            execute(session)
+            session.commit()
+
+    return created, updated
+
+
 def create_or_update_db_item_alternate(db_item, new_item):
     """
     Creates or updates a database item.
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from .common import Base, session_scope
 
@@ -37,6 +37,19 @@ class Event(Base):
                 events = list()
             return events
 
+    @classmethod
+    def find_last_in_game_event_cnt(cls, game_id):
+        with session_scope() as session:
+            try:
+                last_cnt = session.query(
+                    func.max(Event.in_game_event_cnt)
+                ).filter(
+                    Event.game_id == game_id
+                ).scalar()
+            except Exception:
+                last_cnt = None
+            return last_cnt or 0
+
     @classmethod
     def find(self, game_id, in_game_event_cnt):
         with session_scope() as session:
@@ -3,7 +3,7 @@
 
 import uuid
 
-from db.common import Base
+from db.common import Base, session_scope
 from db.specific_event import SpecificEvent
 from db.team import Team
 from db.player import Player
@@ -34,6 +34,19 @@ class Goal(Base, SpecificEvent):
                 else:
                     setattr(self, attr, None)
 
+    @classmethod
+    def find_for_game(cls, game_id):
+        with session_scope() as session:
+            try:
+                goals = session.query(Goal).join(
+                    Event, Event.event_id == Goal.event_id
+                ).filter(
+                    Event.game_id == game_id
+                ).order_by(Goal.in_game_cnt).all()
+            except Exception:
+                goals = list()
+            return goals
+
     # TODO: re-do this mess
     def __str__(self):
         event = Event.find_by_id(self.event_id)
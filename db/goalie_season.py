@@ -120,6 +120,17 @@ class GoalieSeason(Base):
                 goalie_seasons = None
             return goalie_seasons
 
+    @classmethod
+    def find_all_for_players(self, player_ids):
+        with session_scope() as session:
+            try:
+                goalie_seasons = session.query(GoalieSeason).filter(
+                    GoalieSeason.player_id.in_(player_ids)
+                ).all()
+            except Exception as e:
+                goalie_seasons = list()
+            return goalie_seasons
+
     def update(self, other):
         for attr in self.JSON_DB_MAPPING.values():
             if hasattr(other, attr):
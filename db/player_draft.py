@@ -46,6 +46,28 @@ class PlayerDraft(Base):
                 plr_draft = None
             return plr_draft
 
+    @classmethod
+    def find_by_player_ids(cls, player_ids):
+        with session_scope() as session:
+            try:
+                plr_drafts = session.query(PlayerDraft).filter(
+                    PlayerDraft.player_id.in_(player_ids)
+                ).all()
+            except Exception as e:
+                plr_drafts = list()
+            return plr_drafts
+
+    @classmethod
+    def find_by_year(cls, year):
+        with session_scope() as session:
+            try:
+                plr_drafts = session.query(PlayerDraft).filter(
+                    PlayerDraft.year == year
+                ).all()
+            except Exception as e:
+                plr_drafts = list()
+            return plr_drafts
+
     def update(self, other):
         for attr in ['team_id', 'year', 'round', 'overall', 'draft_type']:
             if hasattr(other, attr):
@@ -118,6 +118,17 @@ class PlayerSeason(Base):
                 player_seasons = None
             return player_seasons
 
+    @classmethod
+    def find_all_for_players(self, player_ids):
+        with session_scope() as session:
+            try:
+                player_seasons = session.query(PlayerSeason).filter(
+                    PlayerSeason.player_id.in_(player_ids)
+                ).all()
+            except Exception as e:
+                player_seasons = list()
+            return player_seasons
+
     def update(self, other):
         for attr in self.JSON_DB_MAPPING.values():
             if hasattr(other, attr):
@@ -44,6 +44,17 @@ class Shift(Base):
                 shift = None
             return shift
 
+    @classmethod
+    def find_for_game(cls, game_id):
+        with session_scope() as session:
+            try:
+                shifts = session.query(Shift).filter(
+                    Shift.game_id == game_id
+                ).all()
+            except Exception:
+                shifts = list()
+            return shifts
+
     def update(self, other):
         for attr in self.STANDARD_ATTRS:
             setattr(self, attr, getattr(other, attr))
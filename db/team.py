@@ -32,8 +32,10 @@ class Team(Base):
             return t
 
     @classmethod
-    def find_by_name(cls, name):
-
+    def normalize_name(cls, name):
+        """
+        Replaces alternative team names with the ones used in the database.
+        """
         if name.lower() in [
                 "canadiens montreal",
                 "montreal canadiens",
@@ -43,6 +45,13 @@ class Team(Base):
         if name.lower() == "anaheim mighty ducks":
                 name = "Anaheim Ducks"
 
+        return name
+
+    @classmethod
+    def find_by_name(cls, name):
+
+        name = cls.normalize_name(name)
+
         with session_scope() as session:
             try:
                 t = session.query(Team).filter(
@@ -52,6 +61,27 @@ class Team(Base):
                 t = None
             return t
 
+    @classmethod
+    def find_all_by_name(cls):
+        """
+        Finds all teams and returns them by lower-case name, omitting names
+        that are shared by multiple teams.
+        """
+        with session_scope() as session:
+            teams = session.query(Team).all()
+
+        teams_by_name = dict()
+        ambiguous_names = set()
+        for t in teams:
+            name = t.name.lower()
+            if name in teams_by_name:
+                ambiguous_names.add(name)
+            teams_by_name[name] = t
+        for name in ambiguous_names:
+            del teams_by_name[name]
+
+        return teams_by_name
+
     @classmethod
     def find_by_id(cls, id):
         with session_scope() as session:
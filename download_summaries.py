@@ -4,6 +4,8 @@
 import os
 import sys
 import argparse
+import threading
+from queue import Queue
 from datetime import datetime
 
 from dateutil.parser import parse
@@ -11,6 +13,10 @@ from dateutil.relativedelta import relativedelta
 
 from utils import get_target_directory_from_config_file
 from utils.summary_downloader import SummaryDownloader
+from parsers.main_parser import parse_games_from_queue
+
+# maximum number of downloaded games waiting to be parsed
+MAX_QUEUED_GAMES = 16
 
 if __name__ == '__main__':
 
@@ -33,6 +39,22 @@ if __name__ == '__main__':
         '--exclude', dest='exclude', required=False, nargs='+',
         choices=['game_feed', 'shift_chart', 'html_reports'],
         help="Exclude the specified datasets from downloading")
+    parser.add_argument(
+        '--minify', dest='minify', required=False, action='store_true',
+        help="Remove comments and whitespace from downloaded html reports")
+    parser.add_argument(
+        '--raw-json', dest='raw_json', required=False, action='store_true',
+        help="Store downloaded JSON data compactly (and compressed if possible)")
+    parser.add_argument(
+        '--restart', dest='restart', required=False, action='store_true',
+        help="Ignore dates completed in an interrupted previous run")
+    parser.add_argument(
+        '-p', '--parse', dest='parse', required=False, action='store_true',
+        help="Parse each game as soon as all of its data has been downloaded")
+    parser.add_argument(
+        '--parsers', dest='parsers', required=False, type=int, default=4,
+        metavar='number of parser threads',
+        help="Number of threads parsing downloaded games concurrently")
 
     args = parser.parse_args()
 
@@ -87,5 +109,28 @@ if __name__ == '__main__':
         else:
             to_date = (datetime.now() + relativedelta(days=-1)).strftime("%B %d, %Y")
 
-    downloader = SummaryDownloader(tgt_dir, from_date, to_date, workers=8, exclude=args.exclude)
-    downloader.run()
+    if not args.parse:
+        downloader = SummaryDownloader(tgt_dir, from_date, to_date, workers=8, exclude=args.exclude, minify=args.minify, raw_json=args.raw_json, resume=not args.restart)
+        downloader.run()
+        sys.exit()
+
+    # setting up bounded queue of downloaded games to be parsed concurrently
+    game_queue = Queue(maxsize=MAX_QUEUED_GAMES)
+    parser_threads = [
+        threading.Thread(target=parse_games_from_queue, args=(game_queue,))
+        for _ in range(args.parsers)]
+    for thread in parser_threads:
+        thread.start()
+
+    downloader = SummaryDownloader(
+        tgt_dir, from_date, to_date, workers=8, exclude=args.exclude,
+        minify=args.minify, raw_json=args.raw_json, game_queue=game_queue,
+        resume=not args.restart)
+    try:
+        downloader.run()
+    finally:
+        # signalling parser threads to finish
+        for _ in parser_threads:
+            game_queue.put(None)
+        for thread in parser_threads:
+            thread.join()
@@ -2,37 +2,42 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
+import argparse
 
 from db.common import session_scope
-from db.player import Player
+from utils.player_export import export_players
 
 if __name__ == '__main__':
 
-    player_export = dict()
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(
+        description='Export players from database.')
+    parser.add_argument(
+        '-o', '--output', dest='tgt_path', required=False,
+        metavar='target file',
+        help="Target file for exported players, JSON Lines if ending " +
+             "with '.jsonl', JSON otherwise")
+    parser.add_argument(
+        '--jsonl', dest='jsonl', required=False, action='store_true',
+        help="Export players as compact JSON Lines to default target file")
+    parser.add_argument(
+        '--delta', dest='delta', required=False, action='store_true',
+        help="Export only players changed since the last export to a " +
+             "separate delta file, i.e. 'nhl_players.delta.jsonl'")
+
+    args = parser.parse_args()
+
+    if args.tgt_path:
+        tgt_path = args.tgt_path
+    elif args.jsonl:
+        tgt_path = os.path.join('setup', 'nhl_players.jsonl')
+    else:
+        tgt_path = os.path.join('setup', 'nhl_players.json')
 
     with session_scope() as session:
-        players = session.query(Player).order_by(Player.player_id).all()
-
-        print("+ Exporting %d players from database" % len(players))
-
-    for plr in players[:]:
-        player_export[plr.player_id] = dict()
-        player_export[plr.player_id]['first_name'] = plr.first_name
-        player_export[plr.player_id]['last_name'] = plr.last_name
-        player_export[plr.player_id]['position'] = plr.position
-        if plr.alternate_first_names:
-            player_export[plr.player_id][
-                'alternate_first_names'] = plr.alternate_first_names
-        if plr.alternate_last_names:
-            player_export[plr.player_id][
-                'alternate_last_names'] = plr.alternate_last_names
-        if plr.alternate_positions:
-            player_export[plr.player_id][
-                'alternate_positions'] = plr.alternate_positions
-        if plr.capfriendly_id:
-            player_export[plr.player_id]['capfriendly_id'] = plr.capfriendly_id
-
-    tgt_path = os.path.join('setup', 'nhl_players.json')
-
-    open(tgt_path, 'w').write(json.dumps(player_export, indent=2))
+        out_path, exported, deleted = export_players(
+            session, tgt_path, args.delta)
+
+    print("+ %d players exported to %s" % (exported, out_path))
+    if deleted:
+        print("+ %d players deleted since last export" % deleted)
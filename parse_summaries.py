@@ -7,11 +7,14 @@ import sys
 import argparse
 
 from datetime import timedelta
+from zipfile import is_zipfile
 
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
 
 from parsers.main_parser import MainParser
+from utils.season_archive import SeasonArchive
+from utils.season_aggregator import SeasonAggregator
 
 FILENAME_REGEX = re.compile(R'^\d{4}\-\d{2}\-\d{2}$')
 
@@ -45,6 +48,10 @@ if __name__ == '__main__':
         '--exclude', dest='exclude', required=False, nargs='+',
         choices=['shifts', 'events'],
         help="Exclude the specified aspects from parsing")
+    parser.add_argument(
+        '--derive-seasons', dest='derive_seasons', required=False,
+        action='store_true',
+        help="Derive season statistics of all players in parsed games")
 
     args = parser.parse_args()
 
@@ -85,21 +92,83 @@ if __name__ == '__main__':
 
     # TODO: find data source file for specified date(s)
     src_files = list()
+    # dates of games played on specified dates by season archive
+    archived_games = dict()
+    # season archives by dates covered
+    archived_dates = dict()
+    iso_dates = set([str(date) for date in all_dates])
 
     for root, dirs, files in os.walk(src_dir):
         for file in files:
             fname, ext = os.path.splitext(file)
-            if re.search(FILENAME_REGEX, fname):
+            if ext == SeasonArchive.SUFFIX:
+                archive_path = os.path.join(root, file)
+                with SeasonArchive(archive_path) as archive:
+                    archived_games[archive_path] = {
+                        game_id: archive.game_info[game_id]['date'] for
+                        game_id in archive.get_game_ids(iso_dates)}
+                for game_date in archived_games[archive_path].values():
+                    archived_dates[game_date] = archive_path
+            elif re.search(FILENAME_REGEX, fname):
                 if parse(fname).date() in all_dates:
-                    print(os.path.join(root, file))
                     src_files.append(os.path.join(root, file))
 
-    for file in src_files[:]:
+    # preferring season archives to daily data sources for the same dates,
+    # unless daily zip files have been modified after archiving and contain
+    # corrections, i.e. files differing from archived ones
+    daily_src_files = list()
+    for file in src_files:
+        game_date = str(parse(
+            os.path.splitext(os.path.basename(file))[0]).date())
+        archive_path = archived_dates.get(game_date)
+        if archive_path is not None:
+            if not is_zipfile(file) or os.path.getmtime(
+                    file) <= os.path.getmtime(archive_path):
+                continue
+            with SeasonArchive(archive_path) as archive:
+                if archive.contains_zip(file):
+                    continue
+            print("+ Daily data source '%s' is newer than archive" % file)
+            archived_games[archive_path] = {
+                game_id: archived_date for game_id, archived_date in
+                archived_games[archive_path].items() if
+                archived_date != game_date}
+        daily_src_files.append((file, tgt_game_ids))
+    src_files = daily_src_files
+
+    # season archives along with ids of games played on specified dates
+    src_archives = list()
+    for archive_path, games in sorted(archived_games.items()):
+        game_ids = sorted(games)
+        if tgt_game_ids is not None:
+            game_ids = sorted(set(game_ids).intersection(tgt_game_ids))
+        if game_ids:
+            print(archive_path)
+            src_archives.append((archive_path, game_ids))
+    for file, _ in src_files:
+        print(file)
+
+    # full ids of all parsed games
+    parsed_game_ids = set()
+
+    for file, file_game_ids in src_archives + src_files:
         print("+ Using data source '%s'" % file)
 
-        mp = MainParser(file, tgt_game_ids)
+        mp = MainParser(file, file_game_ids)
         if sequential_parsing:
             mp.parse_games_sequentially(args.exclude)
         else:
             mp.parse_games_simultaneously(args.exclude)
+        parsed_game_ids.update([
+            parsed_data['game'].game_id for parsed_data in
+            mp.parsed_data.values() if parsed_data.get('game')])
         mp.dispose()
+
+    # re-calculating season statistics of players in parsed games only
+    if args.derive_seasons and parsed_game_ids:
+        print("+ Deriving season statistics from %d parsed games" % len(
+            parsed_game_ids))
+        created, updated, discrepancies = SeasonAggregator().derive_for_games(
+            parsed_game_ids)
+        print("\t+ %d season items created, %d updated, %d discrepancies" % (
+            created, updated, len(discrepancies)))
@@ -117,9 +117,11 @@ class EventParser():
         # class-wide variable to hold assistant information
         self.assistants = defaultdict(dict)
 
-    def create_events(self, game, rosters):
+    def create_events(self, game, rosters, last_event_cnt=0):
         """
-        Creates and specifies event items.
+        Creates and specifies event items. If a last in-game event count is
+        specified, only events following the corresponding event are
+        processed. Returns the in-game event count of the last event.
         """
         self.game = game
         self.rosters = rosters
@@ -132,7 +134,19 @@ class EventParser():
         # numerical situation
         self.cache_goals()
 
+        # restoring score and assistants from events processed previously
+        incremental = last_event_cnt > 0
+        if incremental:
+            self.restore_state()
+        goal_scored = False
+
         for event_data_item in self.event_data:
+            # skipping events that have been processed previously
+            in_game_event_cnt = int(event_data_item.xpath("td[1]/text()")[0])
+            if in_game_event_cnt <= last_event_cnt:
+                continue
+            last_event_cnt = in_game_event_cnt
+
             # setting event item with basic information
             event = self.get_event(event_data_item)
 
@@ -164,9 +178,37 @@ class EventParser():
                 # re-calculating score differential after a goal
                 if event.type == 'GOAL':
                     self.score_diff = self.score['home'] - self.score['road']
+                    goal_scored = True
+
+        # finally updating primary/secondary assists in player games (only
+        # necessary in incremental mode if a new goal has been scored)
+        if not incremental or goal_scored:
+            self.update_assists_in_player_games()
+
+        return last_event_cnt
+
+    def restore_state(self):
+        """
+        Restores current score and assistant information from goals already
+        registered in the database for the current game.
+        """
+        self.score = defaultdict(int)
+        self.assistants = defaultdict(dict)
+
+        for goal in Goal.find_for_game(self.game.game_id):
+            if goal.team_id == self.game.road_team_id:
+                self.score['road'] += 1
+            else:
+                self.score['home'] += 1
+            for assist_cnt, assistant in enumerate(
+                    [goal.assist_1, goal.assist_2], start=1):
+                if assistant is None:
+                    continue
+                if assistant not in self.assistants:
+                    self.assistants[assistant] = defaultdict(int)
+                self.assistants[assistant][assist_cnt] += 1
 
-        # finally updating primary/secondary assists in player games
-        self.update_assists_in_player_games()
+        self.score_diff = self.score['home'] - self.score['road']
 
     def specify_event(self, event):
         """
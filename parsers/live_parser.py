@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+from lxml import html
+
+from utils import adjust_html_document
+from utils.summary_downloader import SummaryDownloader
+from utils.summary_data_injector import add_nhl_ids_to_document
+from utils import http_client
+from parsers.team_parser import TeamParser
+from parsers.game_parser import GameParser
+from parsers.roster_parser import RosterParser
+from parsers.event_parser import EventParser
+from db.event import Event
+
+logger = logging.getLogger(__name__)
+
+
+class LiveGameParser():
+    """
+    Incrementally parses events of a game in progress. Each poll retrieves
+    updated play-by-play data only and processes events that have not been
+    stored in the database before.
+    """
+
+    def __init__(self, full_game_id):
+        # fully qualified game id, i.e. 2016020776
+        self.full_game_id = int(full_game_id)
+        self.season = self.full_game_id // 1000000
+        # partial game id as used in names of html reports, i.e. 020776
+        self.game_id = str(self.full_game_id)[4:]
+        # timestamps of last modification by report url
+        self.mod_timestamps = dict()
+        # structured raw data by report prefix
+        self.raw_data = dict()
+        self.game = None
+        self.rosters = None
+        self.last_event_cnt = 0
+
+    def get_report_url(self, prefix):
+        """
+        Gets url of html report with specified prefix for current game.
+        """
+        return "".join((
+            SummaryDownloader.HTML_REPORT_PREFIX,
+            "%d%d" % (self.season, self.season + 1), "/",
+            prefix, self.game_id, ".HTM"))
+
+    def fetch_report(self, prefix):
+        """
+        Retrieves html report with specified prefix unless it hasn't been
+        modified since the last retrieval. Returns whether the report has
+        been updated.
+        """
+        url = self.get_report_url(prefix)
+        headers = dict()
+        if url in self.mod_timestamps:
+            headers['If-Modified-Since'] = self.mod_timestamps[url]
+        req = http_client.get(url, headers=headers)
+
+        if req.status_code != 200:
+            return False
+
+        self.mod_timestamps[url] = req.headers.get('Last-Modified')
+        doc = html.document_fromstring(req.text)
+        adjust_html_document(doc, self.mod_timestamps[url])
+        if prefix == 'ES':
+            add_nhl_ids_to_document(url, doc)
+        self.raw_data[prefix] = doc
+
+        return True
+
+    def fetch_json_data(self):
+        """
+        Retrieves JSON game feed for current game.
+        """
+        url = SummaryDownloader.JSON_GAME_FEED_URL_TEMPLATE % (
+            self.full_game_id)
+        req = http_client.get(url)
+        if req.status_code == 200:
+            return req.json()
+
+    def setup(self):
+        """
+        Creates items for game, participating teams and rosters once and
+        retrieves the last in-game event count already stored in the
+        database.
+        """
+        for prefix in ['GS', 'ES', 'RO']:
+            self.fetch_report(prefix)
+
+        teams = TeamParser(self.raw_data['GS']).create_teams()
+        gp = GameParser(self.game_id, self.raw_data['GS'])
+        # existing game data (including events) is explicitly retained
+        self.game = gp.create_game(teams, delete_existing=False)
+        self.rosters = RosterParser(self.raw_data['ES']).create_roster(
+            self.game, teams, self.raw_data['RO'])
+
+        self.last_event_cnt = Event.find_last_in_game_event_cnt(
+            self.game.game_id)
+        logger.info(
+            "+ Tracking %s starting after event %d" % (
+                self.game.short(), self.last_event_cnt))
+
+    def poll(self):
+        """
+        Polls current game for new events and processes them. Returns number
+        of new events.
+        """
+        if self.game is None:
+            self.setup()
+
+        # bailing out if play-by-play data hasn't been updated
+        if not self.fetch_report('PL'):
+            return 0
+        # game summary is necessary to determine numerical situations of goals
+        self.fetch_report('GS')
+        json_data = self.fetch_json_data()
+        if json_data is None:
+            return 0
+
+        ep = EventParser(self.raw_data['PL'], json_data, self.raw_data['GS'])
+        last_event_cnt = ep.create_events(
+            self.game, self.rosters, self.last_event_cnt)
+        new_events = last_event_cnt - self.last_event_cnt
+        self.last_event_cnt = last_event_cnt
+
+        return new_events
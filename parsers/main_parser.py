@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import json
 import logging
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -15,10 +14,39 @@ from parsers.roster_parser import RosterParser
 from parsers.goalie_parser import GoalieParser
 from parsers.shift_parser import ShiftParser
 from parsers.event_parser import EventParser
+from utils.on_ice_matcher import check_players_on_ice
 
 logger = logging.getLogger(__name__)
 
 
+def parse_games_from_queue(game_queue, exclude=None):
+    """
+    Parses games retrieved from the specified queue until a sentinel (None)
+    is received. Each queue item consists of a game id, the directory
+    containing all of the game's downloaded data and (optionally) a callback
+    to be invoked after the game has been processed.
+    """
+    while True:
+        item = game_queue.get()
+        try:
+            if item is None:
+                break
+            game_id, src_dir = item[:2]
+            mp = MainParser(src_dir, [game_id])
+            try:
+                print(mp.parse_single_game(game_id, exclude))
+            finally:
+                mp.dispose()
+        except Exception as e:
+            logger.error("Unable to parse game %s: %s" % (item[0], e))
+        finally:
+            try:
+                if item is not None and len(item) > 2 and item[2]:
+                    item[2]()
+            finally:
+                game_queue.task_done()
+
+
 class MainParser():
     # data prefixes for official html datasets:
     #   ES ... event summary
@@ -128,6 +156,12 @@ class MainParser():
         if 'events' not in exclude:
             self.create_events(game_id)
 
+        # validating players on ice for all events using players' shifts
+        # (only if both have been parsed before), discrepancies are logged
+        # only as matched shifts aren't persisted
+        if 'shifts' not in exclude and 'events' not in exclude:
+            check_players_on_ice(self.parsed_data[game_id]['game'].game_id)
+
         # removing raw structured data from memory
         del self.raw_data[game_id]
 
@@ -243,12 +277,8 @@ class MainParser():
         """
         Reads JSON game feed or shift chart data for game with specified id.
         """
-        json_file = self.dh.get_game_json_data(game_id, data_type)
-
-        if json_file is None:
-            return
-
-        return json.loads(open(json_file).read())
+        # decoding (possibly compressed) data directly from data source
+        return self.dh.read_game_json_data(game_id, data_type)
 
     def read_on_demand(self, game_id, prefix):
         """
@@ -4,13 +4,17 @@
 import os
 import traceback
 
+from db import upsert_db_items
 from db.common import session_scope
 from db.team import Team
 from db.division import Division
 
 
 def create_divisions(div_src_file=None):
-
+    """
+    Creates divisions from specified configuration file. Existing divisions
+    are updated, obsolete ones removed, all within a single transaction.
+    """
     if not div_src_file:
         div_src_file = os.path.join(
             os.path.dirname(__file__), 'nhl_divisions_config.txt')
@@ -19,9 +23,17 @@ def create_divisions(div_src_file=None):
 
     with session_scope() as session:
 
-        session.query(Division).delete(synchronize_session=False)
+        # retrieving all teams and existing divisions at once
+        teams_by_abbr = dict()
+        for team in session.query(Team).all():
+            teams_by_abbr.setdefault(team.orig_abbr.strip().lower(), team)
+            teams_by_abbr[team.abbr.strip().lower()] = team
+        existing_divisions = {
+            (division.division_name, division.season): division.division_id
+            for division in session.query(Division).all()}
 
         try:
+            divisions = list()
             for line in lines:
                 if line.startswith("#"):
                     continue
@@ -30,7 +42,7 @@ def create_divisions(div_src_file=None):
                 team_abbrs = teams[1:-1].split(',')
                 teams = list()
                 for t in team_abbrs:
-                    team = Team.find(t)
+                    team = teams_by_abbr.get(t.lower())
                     teams.append(team)
                 else:
                     if conference:
@@ -39,12 +51,29 @@ def create_divisions(div_src_file=None):
                     else:
                         division = Division(
                             division_name, season, teams)
-                    session.add(division)
+                    # re-using ids of existing divisions
+                    if (division_name, season) in existing_divisions:
+                        division.division_id = existing_divisions.pop(
+                            (division_name, season))
+                    divisions.append(division)
 
                     print(division)
 
+            # removing divisions no longer configured
+            if existing_divisions:
+                session.query(Division).filter(
+                    Division.division_id.in_(existing_divisions.values())
+                ).delete(synchronize_session=False)
+
+            inserted, updated = upsert_db_items(Division, [
+                (None, division) for division in divisions], session)
             session.commit()
 
+            print(
+                "+ %d divisions created: %d inserted, %d updated, " % (
+                    len(divisions), inserted, updated) +
+                "%d removed" % len(existing_divisions))
+
         except Exception as e:
             session.rollback()
             traceback.print_exc()
@@ -7,45 +7,68 @@ from datetime import date
 
 from sqlalchemy import and_
 
+from db import create_or_update_db_items
 from db.common import session_scope
 from db.player import Player
 from db.team import Team
+from db.player_data_item import PlayerDataItem
+from db.player_draft import PlayerDraft
+from utils import retrieve_season
 from utils.player_finder import PlayerFinder
 from utils.player_data_retriever import PlayerDataRetriever
+from utils.player_data_retriever import retrieve_landing_data
 from utils.player_contract_retriever import PlayerContractRetriever
 from utils.player_draft_retriever import PlayerDraftRetriever
-from utils.capfriendly_utils import retrieve_capfriendly_ids
-from utils.capfriendly_utils import retrieve_capfriendly_id
+from utils.season_aggregator import SeasonAggregator
+from utils.draft_importer import DraftImporter, FIRST_DRAFT_YEAR
+from utils.capfriendly_utils import CapfriendlyIdResolver
 from utils.capfriendly_utils import retrieve_latest_signings
 
 
 logger = logging.getLogger(__name__)
 
+# number of players to retrieve and store data for at once
+REFRESH_BATCH_SIZE = 100
+
 
 def create_player_seasons():
     """
-    Creates player season database objects.
+    Creates player season database objects. Season items are retrieved
+    concurrently and stored for a whole batch of players at once.
     """
     data_retriever = PlayerDataRetriever()
     plr_season_count = 0
+    created = updated = 0
 
     with session_scope() as session:
         players = session.query(Player).all()[:]
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
-        future_tasks = {
-            threads.submit(
-                data_retriever.retrieve_player_seasons,
-                player.player_id
-            ): player for player in players
-        }
-        for future in concurrent.futures.as_completed(future_tasks):
-            try:
-                plr_season_count += len(future.result())
-            except Exception as e:
-                print("Concurrent task generated an exception: %s" % e)
+    for i in range(0, len(players), REFRESH_BATCH_SIZE):
+        batch = players[i:i + REFRESH_BATCH_SIZE]
+        plr_seasons = list()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
+            future_tasks = {
+                threads.submit(
+                    data_retriever.create_player_seasons,
+                    player.player_id
+                ): player for player in batch
+            }
+            for future in concurrent.futures.as_completed(future_tasks):
+                try:
+                    plr_seasons.extend(future.result())
+                except Exception as e:
+                    print("Concurrent task generated an exception: %s" % e)
+
+        plr_season_count += len(plr_seasons)
+        batch_created, batch_updated = data_retriever.store_player_seasons(
+            plr_seasons)
+        created += batch_created
+        updated += batch_updated
 
     logger.info("+ %d statistics items retrieved overall" % plr_season_count)
+    logger.info("+ %d items created, %d items updated overall" % (
+        created, updated))
 
 
 def create_player_data():
@@ -71,9 +94,124 @@ def create_player_data():
                 print("Concurrent task generated an exception: %s" % e)
 
 
+def refresh_players(player_ids=None):
+    """
+    Refreshes season statistics, personal data and draft information for
+    all (or the specified) players in database. Each player's landing
+    document is retrieved only once and all items derived from it are stored
+    in one transaction per batch of players.
+    """
+    data_retriever = PlayerDataRetriever()
+    draft_retriever = PlayerDraftRetriever()
+
+    def retrieve_player_items(player_id):
+        """
+        Retrieves landing data for player with specified id and derives
+        season, personal data and draft items from it.
+        """
+        landing_data = retrieve_landing_data(player_id)
+        if landing_data is None:
+            return list(), None, None
+        return (
+            data_retriever.create_player_seasons(player_id, landing_data),
+            data_retriever.create_player_data_item(player_id, landing_data),
+            draft_retriever.create_player_draft(player_id, landing_data))
+
+    with session_scope() as session:
+        players = sorted(session.query(Player).all())
+
+    if player_ids:
+        players = list(filter(lambda p: p.player_id in player_ids, players))
+
+    created = updated = 0
+
+    for i in range(0, len(players), REFRESH_BATCH_SIZE):
+        batch_ids = [
+            plr.player_id for plr in players[i:i + REFRESH_BATCH_SIZE]]
+        logger.info("+ Refreshing players %d to %d of %d" % (
+            i + 1, i + len(batch_ids), len(players)))
+
+        plr_seasons = list()
+        plr_data_items = list()
+        plr_drafts = list()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
+            future_tasks = {
+                threads.submit(
+                    retrieve_player_items, player_id
+                ): player_id for player_id in batch_ids
+            }
+            for future in concurrent.futures.as_completed(future_tasks):
+                try:
+                    seasons, data_item, draft = future.result()
+                except Exception as e:
+                    print("Concurrent task generated an exception: %s" % e)
+                    continue
+                plr_seasons.extend(seasons)
+                if data_item is not None:
+                    plr_data_items.append(data_item)
+                if draft is not None:
+                    plr_drafts.append(draft)
+
+        # retrieving existing items for the whole batch of players at once
+        existing_data_items = {
+            item.player_id: item for item in
+            PlayerDataItem.find_by_player_ids(batch_ids) or list()}
+        existing_drafts = {
+            (item.player_id, item.team_id, item.year): item for item in
+            PlayerDraft.find_by_player_ids(batch_ids)}
+
+        # storing season items of all players in batch at once
+        batch_created, batch_updated = data_retriever.store_player_seasons(
+            plr_seasons)
+        created += batch_created
+        updated += batch_updated
+
+        db_and_new_items = list()
+        for data_item in plr_data_items:
+            db_and_new_items.append((
+                existing_data_items.get(data_item.player_id), data_item))
+        for draft in plr_drafts:
+            db_and_new_items.append((existing_drafts.get(
+                (draft.player_id, draft.team_id, draft.year)), draft))
+
+        batch_created, batch_updated = create_or_update_db_items(
+            db_and_new_items)
+        created += batch_created
+        updated += batch_updated
+
+    logger.info("+ %d items created, %d items updated overall" % (
+        created, updated))
+
+
+def derive_player_seasons(season=None, player_ids=None, store=True):
+    """
+    Derives season statistics for all (or the specified) players in database
+    from the games parsed for the specified (or current) season. Derived
+    items are reconciled with the ones retrieved from the NHL API and, unless
+    otherwise specified, stored in the database.
+    """
+    if season is None:
+        season = retrieve_season()
+
+    if player_ids is None:
+        with session_scope() as session:
+            player_ids = [
+                player_id for player_id, in session.query(Player.player_id)]
+
+    created, updated, discrepancies = SeasonAggregator().derive(
+        player_ids, [season], store)
+
+    logger.info("+ %d items created, %d items updated overall" % (
+        created, updated))
+    logger.info("+ %d discrepancies to retrieved season statistics" % len(
+        discrepancies))
+
+
 def create_player_contracts(player_ids=None):
     """
-    Creates player contract items in database.
+    Creates player contract items in database. Contract data is retrieved
+    concurrently and stored for a whole batch of players at once.
     """
     data_retriever = PlayerContractRetriever()
 
@@ -83,18 +221,16 @@ def create_player_contracts(player_ids=None):
     if player_ids:
         players = list(filter(lambda p: p.player_id in player_ids, players))
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
-        future_tasks = {
-            threads.submit(
-                data_retriever.retrieve_player_contracts,
-                player.player_id
-            ): player for player in sorted(players)[:]
-        }
-        for future in concurrent.futures.as_completed(future_tasks):
-            try:
-                pass
-            except Exception as e:
-                print("Concurrent task generated an exception: %s" % e)
+    created = updated = 0
+
+    for i in range(0, len(players), REFRESH_BATCH_SIZE):
+        batch_created, batch_updated = store_player_contracts(
+            data_retriever, players[i:i + REFRESH_BATCH_SIZE])
+        created += batch_created
+        updated += batch_updated
+
+    logger.info("+ %d contract items created, %d updated overall" % (
+        created, updated))
 
 
 def create_player_contracts_by_team(teams=None):
@@ -120,67 +256,91 @@ def create_player_contracts_by_team(teams=None):
         print(
             "+ Retrieving contracts for players affiliated with the %s" % team)
         players = player_finder.get_contracted_players(team)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
-            future_tasks = {
-                threads.submit(
-                    data_retriever.retrieve_player_contracts, player.player_id
-                ): player for player in sorted(players)[:]
-            }
-            for future in concurrent.futures.as_completed(future_tasks):
-                try:
-                    pass
-                except Exception as e:
-                    print("Concurrent task generated an exception: %s" % e)
+        store_player_contracts(data_retriever, players)
 
 
-def create_player_drafts():
+def store_player_contracts(data_retriever, players):
     """
-    Creates player draft information for all players in database.
+    Retrieves contract data for specified players concurrently and stores it
+    for all of them at once, using one transaction per player. Returns
+    numbers of created and updated items.
     """
-    data_retriever = PlayerDraftRetriever()
-
-    with session_scope() as session:
-        players = session.query(Player).all()[:]
+    contract_graphs = dict()
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
         future_tasks = {
             threads.submit(
-                data_retriever.retrieve_draft_information,
-                player.player_id
+                data_retriever.create_contract_graph, player.player_id
             ): player for player in sorted(players)[:]
         }
         for future in concurrent.futures.as_completed(future_tasks):
             try:
-                pass
+                contract_graph = future.result()
             except Exception as e:
                 print("Concurrent task generated an exception: %s" % e)
+                continue
+            if contract_graph is not None:
+                contract_graphs[future_tasks[future].player_id] = (
+                    contract_graph)
+
+    if not contract_graphs:
+        return 0, 0
+
+    return data_retriever.store_contract_graphs(contract_graphs)
+
+
+def create_player_drafts(draft_years=None):
+    """
+    Creates player draft information for all players in database by importing
+    all (or the specified) draft years, retrieving each one as a whole.
+    """
+    if draft_years is None:
+        draft_years = range(FIRST_DRAFT_YEAR, date.today().year + 1)
+
+    importer = DraftImporter()
+    created = updated = unresolved = 0
+
+    for draft_year in draft_years:
+        year_created, year_updated, year_unresolved = (
+            importer.import_draft_year(draft_year))
+        created += year_created
+        updated += year_updated
+        unresolved += len(year_unresolved)
+
+    logger.info(
+        "+ %d draft items created, %d items updated, " % (created, updated) +
+        "%d picks unresolved overall" % unresolved)
 
 
 def create_capfriendly_ids():
     """
-    Creates capfriendly id attributes for players in database.
+    Creates capfriendly id attributes for players in database. Ids are
+    harvested from all team pages and latest signings first, only the
+    remaining players are looked up individually.
     """
-    with session_scope() as session:
-        players = session.query(Player).all()[:]
+    resolver = CapfriendlyIdResolver()
+    harvest_capfriendly_ids(resolver)
+    resolver.harvest_signings()
+    resolver.probe_unresolved()
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
-        future_tasks = {
-            threads.submit(
-                retrieve_capfriendly_id, player.player_id
-            ): player for player in sorted(players)
-        }
-        for future in concurrent.futures.as_completed(future_tasks):
-            try:
-                pass
-            except Exception as e:
-                print("Concurrent task generated an exception: %s" % e)
+    logger.info("+ %d capfriendly ids found" % resolver.store())
 
 
 def create_capfriendly_ids_by_team():
     """
     Creates capfriendly id attributes for all players of each team in database.
     """
+    resolver = CapfriendlyIdResolver()
+    harvest_capfriendly_ids(resolver)
+
+    logger.info("+ %d capfriendly ids found" % resolver.store())
+
+
+def harvest_capfriendly_ids(resolver):
+    """
+    Harvests capfriendly ids from the pages of all current teams using the
+    specified resolver.
+    """
     with session_scope() as session:
         teams = session.query(Team).filter(
             and_(
@@ -192,12 +352,12 @@ def create_capfriendly_ids_by_team():
     with concurrent.futures.ThreadPoolExecutor(max_workers=8) as threads:
         future_tasks = {
             threads.submit(
-                retrieve_capfriendly_ids, team.team_id
+                resolver.harvest_team, team
             ): team for team in sorted(teams)[:]
         }
         for future in concurrent.futures.as_completed(future_tasks):
             try:
-                pass
+                future.result()
             except Exception as e:
                 print("Concurrent task generated an exception: %s" % e)
 
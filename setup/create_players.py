@@ -2,51 +2,86 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from db import commit_db_item
+from db import commit_db_item, upsert_db_items
+from db.common import session_scope
 from db.player import Player
 from db.team import Team
 from utils.player_finder import PlayerFinder
 from utils.player_data_retriever import PlayerDataRetriever
+from utils.player_name_index import add_player_to_name_index
 from utils.eliteprospects_utils import retrieve_drafted_players_with_dobs
+from utils.draft_importer import DraftImporter
+from utils.player_export import read_player_export
 
 MAX_WORKERS = 8
+# number of players to upsert at once when migrating players
+MIGRATION_CHUNK_SIZE = 5000
 
 
 def migrate_players(plr_src_file=None):
     """
-    Migrates players from specified JSON file to currently connected database.
+    Migrates players from specified JSON (or JSON Lines) file to currently
+    connected database. All players are loaded by multi-row upserts within a
+    single transaction, JSON Lines files are streamed in chunks. Players
+    marked as deleted, i.e. in delta exports, are removed.
     """
     if not plr_src_file:
         plr_src_file = os.path.join(
             os.path.dirname(__file__), 'nhl_players.json')
 
-    migration_data = json.load(open(plr_src_file))
+    cnt = inserted = updated = 0
+    deleted_ids = list()
 
-    for player_id in sorted(migration_data.keys())[:]:
+    with session_scope() as session:
 
-        # populating mandatory attributes
-        last_name = migration_data[player_id]['last_name']
-        first_name = migration_data[player_id]['first_name']
-        position = migration_data[player_id]['position']
+        players = list()
 
-        # setting up and populating optional keyword attributes
-        kw_args = dict()
-        for key in [
-            'alternate_last_names', 'alternate_first_names',
-            'alternate_positions', 'capfriendly_id'
-        ]:
-            kw_args[key] = migration_data[player_id].get(key, None)
+        def upsert_players():
+            nonlocal inserted, updated
+            chunk_inserted, chunk_updated = upsert_db_items(
+                Player, [(None, plr) for plr in players], session)
+            inserted += chunk_inserted
+            updated += chunk_updated
+            del players[:]
 
-        plr = Player(
-            player_id, last_name, first_name, position, **kw_args)
+        for player_id, plr_data in read_player_export(plr_src_file):
 
-        print("Working on %s" % plr)
+            if plr_data.get('deleted'):
+                deleted_ids.append(int(player_id))
+                continue
 
-        commit_db_item(plr)
+            # populating mandatory attributes
+            last_name = plr_data['last_name']
+            first_name = plr_data['first_name']
+            position = plr_data['position']
+
+            # setting up and populating optional keyword attributes
+            kw_args = dict()
+            for key in [
+                'alternate_last_names', 'alternate_first_names',
+                'alternate_positions', 'capfriendly_id'
+            ]:
+                kw_args[key] = plr_data.get(key, None)
+
+            players.append(Player(
+                player_id, last_name, first_name, position, **kw_args))
+            cnt += 1
+
+            if len(players) >= MIGRATION_CHUNK_SIZE:
+                upsert_players()
+
+        upsert_players()
+        if deleted_ids:
+            session.query(Player).filter(
+                Player.player_id.in_(deleted_ids)
+            ).delete(synchronize_session=False)
+        session.commit()
+
+    print("+ %d players migrated: %d inserted, %d updated, %d deleted" % (
+        cnt, inserted, updated, len(deleted_ids)))
 
 
 def search_players(src_type, teams=None, season=None):
@@ -102,12 +137,14 @@ def create_players_by_unused_ids(min_id, max_id):
             print(plr)
 
 
-def create_players_for_draft_year(draft_year):
+def create_players_for_draft_year(draft_year, refresh=False):
     """
-    Uses specified draft year to create database items for each drafted player.
+    Uses specified draft year to create database items for each drafted player
+    before importing all picks of this draft year. Cached draft overview
+    pages are retrieved again if asked for.
     """
     # retrieving suggestions from nhl.com for all retrieved drafted players
-    suggested_plrs = get_suggestions_for_drafted_players(draft_year)
+    suggested_plrs = get_suggestions_for_drafted_players(draft_year, refresh)
 
     for suggested_plr in suggested_plrs:
         # exploding tuple
@@ -129,17 +166,25 @@ def create_players_for_draft_year(draft_year):
                 plr_id, last_name, first_name,
                 position, alternate_last_names=alt_last_name)
             commit_db_item(plr)
-            print("+ %s created" % Player.find_by_id(plr_id))
+            plr = Player.find_by_id(plr_id)
+            add_player_to_name_index(plr)
+            print("+ %s created" % plr)
+
+    # importing draft information for all (now existing) drafted players
+    created, updated, unresolved = DraftImporter().import_draft_year(
+        draft_year)
+    print("+ %d draft items created, %d updated, %d picks unresolved" % (
+        created, updated, len(unresolved)))
 
 
-def get_suggestions_for_drafted_players(draft_year):
+def get_suggestions_for_drafted_players(draft_year, refresh=False):
     """
     Retrieves player id suggestions from nhl.com for all players drafted in
     specified year.
     """
     # retrieving players (with date of births and alternate last names) drafted
     # in specified year
-    drafted_players = retrieve_drafted_players_with_dobs(draft_year)
+    drafted_players = retrieve_drafted_players_with_dobs(draft_year, refresh)
 
     print(
         "+ Basic information retrieved for " +
@@ -4,13 +4,17 @@
 import os
 import json
 
-import requests
-
-from db import commit_db_item
+from db import upsert_db_items
 from db.team import Team
+from utils import http_client
 
 
 def migrate_teams(team_src_file=None):
+    """
+    Migrates teams from team information retrieved from the NHL API combined
+    with the specified JSON file to currently connected database. All teams
+    are loaded by a single multi-row upsert.
+    """
 
     if not team_src_file:
         team_src_file = os.path.join(
@@ -22,13 +26,14 @@ def migrate_teams(team_src_file=None):
 
     unused_slot_count = 0
     i = 0
+    teams = list()
 
     while unused_slot_count < 20:
 
         i += 1
 
         url = "".join((url_template, str(i)))
-        response = requests.get(url)
+        response = http_client.get(url)
         raw_data = response.json()
 
         if 'teams' not in raw_data:
@@ -58,4 +63,9 @@ def migrate_teams(team_src_file=None):
                 if team_migration_data[item]:
                     setattr(t, item, team_migration_data[item])
 
-            commit_db_item(t)
+            teams.append(t)
+
+    inserted, updated = upsert_db_items(Team, [(None, t) for t in teams])
+
+    print("+ %d teams migrated: %d inserted, %d updated" % (
+        len(teams), inserted, updated))
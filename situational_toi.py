@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import argparse
+
+from analysis._manpower_timeline import process_season, save_timelines
+
+from utils import prepare_logging
+prepare_logging(log_types=['screen'])
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(
+        description='Calculate situational time on ice from manpower ' +
+                    'and score state timelines.')
+    parser.add_argument(
+        '-s', '--season', dest='season', required=True, type=int,
+        metavar='season to calculate situational time on ice for',
+        help="Season for which situational time on ice will be calculated")
+    parser.add_argument(
+        '-t', '--type', dest='season_type', required=False,
+        metavar='season type', choices=['RS', 'PO'], default='RS',
+        help="Season type, e.g. regular season (RS) or playoffs (PO)")
+    parser.add_argument(
+        '-d', '--tgt_dir', dest='tgt_dir', required=False, default='.',
+        metavar='target directory',
+        help="Target directory for timelines and situational time on ice")
+
+    args = parser.parse_args()
+
+    if args.season_type == 'PO':
+        game_type = 3
+    else:
+        game_type = 2
+
+    timelines, toi_rows = process_season(args.season, game_type)
+
+    file_prefix = os.path.join(
+        args.tgt_dir, "%d_%s" % (args.season, args.season_type))
+    save_timelines("_".join((file_prefix, "timelines.npz")), timelines)
+    json.dump(
+        toi_rows, open("_".join((file_prefix, "situational_toi.json")), 'w'),
+        indent=2)
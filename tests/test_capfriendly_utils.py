@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from types import SimpleNamespace
+
+from utils import capfriendly_utils
+from utils.capfriendly_utils import CapfriendlyIdResolver
+
+
+def create_player():
+    return SimpleNamespace(
+        player_id=8478402, first_name="Connor", last_name="McDavid",
+        name="Connor McDavid", alternate_first_names=None,
+        alternate_last_names=None, capfriendly_id=None)
+
+
+def test_probe_with_miss_cache(tmp_path, monkeypatch):
+
+    pages = {
+        # page of another player with the same name
+        'connor-mcdavid': ("Connor McDavid", date(1990, 1, 1)),
+        'connor-mcdavid1': ("Connor McDavid", date(1997, 1, 13)),
+    }
+    probed = list()
+
+    def retrieve_player_page_data(query_id):
+        probed.append(query_id)
+        return pages.get(query_id, (None, None))
+
+    monkeypatch.setattr(
+        capfriendly_utils, 'retrieve_player_page_data',
+        retrieve_player_page_data)
+
+    miss_cache_file = str(tmp_path / 'misses.json')
+    plr = create_player()
+
+    resolver = CapfriendlyIdResolver(miss_cache_file)
+    resolver.dobs[plr.player_id] = date(1997, 1, 13)
+    assert resolver.probe(plr) == 'connor-mcdavid1'
+    assert resolver.found[plr.player_id] == (plr, 'connor-mcdavid1')
+    resolver.save_misses()
+
+    # failed probes aren't repeated in subsequent runs
+    probed.clear()
+    resolver = CapfriendlyIdResolver(miss_cache_file)
+    resolver.dobs[plr.player_id] = date(1997, 1, 13)
+    assert resolver.probe(plr) == 'connor-mcdavid1'
+    assert probed == ['connor-mcdavid1']
+
+    # unless the page may belong to the player in question
+    other_plr = create_player()
+    other_plr.player_id = 8470000
+    resolver.dobs[other_plr.player_id] = date(1990, 1, 1)
+    assert resolver.probe(other_plr) == 'connor-mcdavid'
+
+
+def test_resolver_for_single_player(monkeypatch):
+
+    plr = create_player()
+    other_plr = create_player()
+    other_plr.player_id = 8470000
+    other_plr.capfriendly_id = 'connor-mcdavid'
+    queries = list()
+
+    class Query():
+        def __init__(self, *entities):
+            self.entities = entities
+            self.filtered = False
+            queries.append(self)
+
+        def filter(self, *criteria):
+            self.filtered = True
+            return self
+
+        def all(self):
+            return [other_plr]
+
+        def __iter__(self):
+            return iter([(plr.player_id, date(1997, 1, 13))])
+
+    class Session():
+        def query(self, *entities):
+            return Query(*entities)
+
+    class SessionScope():
+        def __enter__(self):
+            return Session()
+
+        def __exit__(self, *args):
+            return False
+
+    monkeypatch.setattr(capfriendly_utils, 'session_scope', SessionScope)
+
+    resolver = CapfriendlyIdResolver(None, [plr])
+    # neither all players nor all dates of birth are loaded
+    assert len(queries) == 2
+    assert all(query.filtered for query in queries)
+    assert resolver.unresolved == {plr.player_id: plr}
+    assert resolver.players_by_id == {'connor-mcdavid': other_plr}
+    assert resolver.dobs == {plr.player_id: date(1997, 1, 13)}
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from types import SimpleNamespace
+
 from db.contract import Contract
 from db.contract_year import ContractYear
 from db.buyout import Buyout
@@ -160,3 +162,48 @@ def test_find_buyout_year():
     assert buyout_year.season == 2014
     assert buyout_year.cap_hit == 833333
     assert buyout_year.cost == 1333333
+
+
+def test_contract_graph_diff():
+
+    player_id = 8467329  # Vincent Lecavalier
+
+    existing_contract = SimpleNamespace(
+        contract_id='existing', player_id=player_id, start_season=2008,
+        signing_team_id=14)
+    existing_year = SimpleNamespace(
+        player_id=player_id, contract_id='existing', season=2008)
+    existing_items = {
+        Contract: {(player_id, 2008, 14): existing_contract},
+        ContractYear: {(player_id, 'existing', 2008): existing_year},
+        Buyout: dict(), BuyoutYear: dict()}
+
+    contract = SimpleNamespace(
+        contract_id='new', player_id=player_id, start_season=2008,
+        signing_team_id=14)
+    contract_years = [
+        SimpleNamespace(player_id=player_id, contract_id='new', season=s)
+        for s in [2008, 2009]]
+    buyout = SimpleNamespace(buyout_id='new_buyout', contract_id='new')
+    buyout_year = SimpleNamespace(buyout_id='new_buyout', season=2013)
+    historical_year = SimpleNamespace(
+        player_id=player_id, contract_id=None, season=1998)
+    contract_graph = {
+        'contracts': [(contract, contract_years, buyout, [buyout_year])],
+        'historical': [historical_year]}
+
+    pcr = PlayerContractRetriever()
+    contract_pairs, buyout_pairs, year_pairs = pcr.diff_contract_graph(
+        contract_graph, existing_items)
+
+    # new items adopt ids of existing ones
+    assert contract_pairs == [(existing_contract, contract)]
+    assert contract.contract_id == 'existing'
+    assert buyout.contract_id == 'existing'
+    assert buyout_pairs == [(None, buyout)]
+    assert buyout_year.buyout_id == 'new_buyout'
+    assert [db_item for db_item, _ in year_pairs] == [
+        None, existing_year, None, None]
+    assert all(
+        contract_year.contract_id == 'existing' for
+        contract_year in contract_years)
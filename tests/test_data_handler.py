@@ -3,7 +3,9 @@
 
 import os
 import json
+from zipfile import ZipFile
 
+from utils import json_storage
 from utils.data_handler import DataHandler
 
 
@@ -63,3 +65,21 @@ def test_get_json_data():
     json_data = json.loads(open(json_data_po).read())
     assert str(json_data['gameData']['game']['pk'])[4:] == dh_po.game_ids[0]
     dh_po.clear_temp_files()
+
+
+def test_read_raw_json_data(tmp_path):
+    json_data = {'id': 2018020001, 'plays': [{'eventId': 1}]}
+    raw_data = json.dumps(json_data, separators=(',', ':')).encode('utf-8')
+
+    zip_path = str(tmp_path / '2018-10-03.zip')
+    with ZipFile(zip_path, 'w') as zip:
+        # pretty-printed, raw and (if possible) compressed data is readable
+        zip.writestr('020001.json', json.dumps(json_data, indent=2))
+        zip.writestr('020001_sc.json', json_storage.compress(raw_data))
+        zip.writestr('020002.json', raw_data)
+
+    dh = DataHandler(zip_path)
+    assert dh.read_game_json_data('020001') == json_data
+    assert dh.read_game_json_data('020001', 'shift_chart') == json_data
+    assert dh.read_game_json_data('020002') == json_data
+    assert dh.read_game_json_data('020002', 'shift_chart') is None
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from types import SimpleNamespace
+
+from utils.draft_importer import DraftImporter
+from utils.player_name_index import PlayerNameIndex
+
+
+def create_player(player_id, first_name, last_name):
+    return SimpleNamespace(
+        player_id=player_id, first_name=first_name, last_name=last_name,
+        position='D', alternate_first_names=None, alternate_last_names=None,
+        alternate_positions=None)
+
+
+def create_importer():
+    importer = DraftImporter()
+    importer.name_index = PlayerNameIndex([
+        create_player(8474818, "Jordie", "Benn"),
+        create_player(8478483, "Mitchell", "Marner"),
+        create_player(8470000, "Alex", "Smith"),
+        create_player(8470001, "Alex", "Smith"),
+        create_player(8476000, "Jake", "Walman"),
+    ])
+    importer.dobs = {
+        8470000: date(1990, 1, 1), 8470001: date(1992, 2, 2),
+        8476000: date(1996, 2, 20)}
+    importer.by_dob = {
+        date(1990, 1, 1): {8470000}, date(1992, 2, 2): {8470001},
+        date(1996, 2, 20): {8476000}}
+    return importer
+
+
+def test_resolve_player():
+    importer = create_importer()
+    # player id provided in draft data
+    assert importer.resolve_player(
+        {'playerId': 8478483}).player_id == 8478483
+    # identical names distinguished by date of birth
+    assert importer.resolve_player({
+        'firstName': 'Alex', 'lastName': 'Smith',
+        'birthDate': '1992-02-02'}).player_id == 8470001
+    # differently spelled first name
+    assert importer.resolve_player({
+        'firstName': 'Jacob', 'lastName': 'Walman',
+        'birthDate': '1996-02-20'}).player_id == 8476000
+    # unique name without known date of birth
+    assert importer.resolve_player({
+        'firstName': 'Jordie', 'lastName': 'Benn',
+        'birthDate': '1989-07-26'}).player_id == 8474818
+    # unique name of player with different date of birth
+    assert importer.resolve_player({
+        'firstName': 'Jake', 'lastName': 'Walman',
+        'birthDate': '1997-01-01'}) is None
+    assert importer.resolve_player({
+        'firstName': 'Alex', 'lastName': 'Smith',
+        'birthDate': '1995-05-05'}) is None
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import fetch_cache
+from utils.fetch_cache import FetchCache
+
+
+def test_fetch_cache(monkeypatch):
+    requested_urls = list()
+
+    def fake_get(url, **kwargs):
+        requested_urls.append(url)
+        return SimpleNamespace(status_code=200, text=url.upper())
+
+    monkeypatch.setattr(fetch_cache.http_client, 'get', fake_get)
+
+    cache = FetchCache()
+    urls = ["http://a/1", "http://a/2"] * 10
+
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        responses = list(threads.map(cache.get, urls))
+
+    assert [r.text for r in responses] == [url.upper() for url in urls]
+    assert sorted(requested_urls) == ["http://a/1", "http://a/2"]
+
+    cache.clear()
+    cache.get("http://a/1")
+    assert len(requested_urls) == 3
+
+
+def test_fetch_cache_ttl(monkeypatch):
+    requested_urls = list()
+
+    def fake_get(url, **kwargs):
+        requested_urls.append(url)
+        return SimpleNamespace(status_code=200, text=url.upper())
+
+    monkeypatch.setattr(fetch_cache.http_client, 'get', fake_get)
+
+    cache = FetchCache(ttl=60)
+    cache.get("http://a/1")
+    cache.get("http://a/1")
+    assert len(requested_urls) == 1
+
+    # expired responses are requested anew
+    cache.retrieved["http://a/1"] -= 61
+    cache.get("http://a/1")
+    assert len(requested_urls) == 2
+    # least recently retrieved responses are evicted first
+    cache = FetchCache(max_entries=2)
+    for url in ["http://a/1", "http://a/2", "http://a/3"]:
+        cache.get(url)
+    assert sorted(cache.responses) == ["http://a/2", "http://a/3"]
+
+
+def test_fetch_cache_failures(monkeypatch):
+    requested = list()
+    status_codes = [503, 200]
+
+    def fake_get(url, **kwargs):
+        requested.append((url, kwargs.get('params')))
+        return SimpleNamespace(status_code=status_codes.pop(0))
+
+    monkeypatch.setattr(fetch_cache.http_client, 'get', fake_get)
+
+    cache = FetchCache()
+    params = {'site': 'en_nhl'}
+    # unsuccessful responses are requested again
+    assert cache.get("http://a/1", params=params).status_code == 503
+    assert cache.get("http://a/1", params=params).status_code == 200
+    assert cache.get("http://a/1", params=params).status_code == 200
+    assert requested == [("http://a/1", params)] * 2
+    cache.discard("http://a/1", params)
+    assert not cache.responses
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from utils.http_client import HttpClient, TokenBucket
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers first request with throttling status, all further ones
+    successfully.
+    """
+    hits = 0
+
+    def do_GET(self):
+        StubHandler.hits += 1
+        if self.path == '/throttled' and StubHandler.hits == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+        elif self.path == '/error':
+            self.send_response(503)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stub_server():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_port
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    waited = sum(bucket.acquire() for _ in range(4))
+    # two tokens are available right away, two more take 0.05 s each
+    assert waited > 0.05
+    assert time.monotonic() - start < 1
+
+
+def test_retry_after_throttling():
+    server, base_url = run_stub_server()
+    StubHandler.hits = 0
+    client = HttpClient(backoff_base=0.01)
+    try:
+        response = client.get(base_url + "/throttled")
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 200
+    assert StubHandler.hits == 2
+    metrics = client.get_metrics()["127.0.0.1:%d" % server.server_port]
+    assert metrics['requests'] == 2
+    assert metrics['throttled'] == 1
+    assert metrics['retries'] == 1
+
+
+def test_give_up_on_server_errors():
+    server, base_url = run_stub_server()
+    StubHandler.hits = 0
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    try:
+        response = client.get(base_url + "/error")
+    finally:
+        server.shutdown()
+
+    # last response is returned after all retries have been used up
+    assert response.status_code == 503
+    assert StubHandler.hits == 3
+
+
+def test_adaptive_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.slow_down() == 5
+    assert bucket.slow_down() == 2.5
+    # throttled rate doesn't drop below a fraction of the configured one
+    for _ in range(10):
+        bucket.slow_down()
+    assert bucket.rate == 0.5
+    # configured rate is restored gradually, but never exceeded
+    bucket.speed_up()
+    assert bucket.rate == 1
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == 10
+
+
+def test_close_retried_responses(monkeypatch):
+    server, base_url = run_stub_server()
+    StubHandler.hits = 0
+    client = HttpClient(max_retries=2, backoff_base=0.01)
+    responses = list()
+    session_get = client.session.get
+
+    def get(url, **kwargs):
+        responses.append(session_get(url, **kwargs))
+        return responses[-1]
+
+    monkeypatch.setattr(client.session, 'get', get)
+    try:
+        response = client.get(base_url + "/throttled", stream=True)
+    finally:
+        server.shutdown()
+
+    assert response.status_code == 200
+    # connection of throttled response has been released before retrying
+    assert responses[0].raw.closed
+    assert not responses[1].raw.closed
+    # rate has been adapted to throttling
+    bucket = client.get_bucket("127.0.0.1:%d" % server.server_port)
+    assert bucket.rate < bucket.max_rate
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import hashlib
+from types import SimpleNamespace
+
+from utils import json_storage
+
+
+def test_compression_round_trip():
+    json_data = {
+        'id': 2016020776, 'plays': [{'eventId': i} for i in range(100)]}
+    raw_data = json.dumps(json_data).encode('utf-8')
+
+    compressed = json_storage.compress(raw_data)
+    if json_storage.compression_available():
+        assert compressed.startswith(json_storage.ZSTD_MAGIC)
+        assert len(compressed) < len(raw_data)
+    assert json_storage.decompress(compressed) == raw_data
+    assert json_storage.loads(compressed) == json_data
+    assert json_storage.loads(json.dumps(json_data, indent=2)) == json_data
+
+
+def test_read_response():
+    raw_data = b'{"plays": []}'
+    # delivering response in chunks of four bytes
+    response = SimpleNamespace(iter_content=lambda size: (
+        raw_data[i:i + 4] for i in range(0, len(raw_data), 4)))
+
+    data, data_hash = json_storage.read_response(response)
+    assert data == raw_data
+    assert data_hash == hashlib.md5(raw_data).hexdigest()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from analysis._manpower_timeline import retrieve_penalty_intervals
+from analysis._manpower_timeline import build_game_state
+from analysis._manpower_timeline import compress_game_state
+from analysis._manpower_timeline import calculate_situational_toi
+
+HOME, ROAD = 1, 2
+HOME_GOALIE, ROAD_GOALIE = 100, 200
+
+
+def create_shift(player_id, team_id, period, start, end):
+    return SimpleNamespace(
+        player_id=player_id, team_id=team_id, period=period,
+        start=timedelta(seconds=start), end=timedelta(seconds=end))
+
+
+def test_minor_terminated_by_power_play_goal():
+    intervals = retrieve_penalty_intervals([(100, 'road', 2)], [(160, 'home')])
+    assert intervals == [('road', 100, 160)]
+
+
+def test_major_not_terminated_by_power_play_goal():
+    intervals = retrieve_penalty_intervals([(100, 'road', 5)], [(160, 'home')])
+    assert intervals == [('road', 100, 400)]
+
+
+def test_double_minor_partially_terminated_by_power_play_goal():
+    intervals = retrieve_penalty_intervals([(100, 'road', 4)], [(160, 'home')])
+    assert intervals == [('road', 100, 280)]
+
+
+def test_coincidental_penalties():
+    # single coincidental minors at full strength result in four-on-four
+    intervals = retrieve_penalty_intervals(
+        [(100, 'road', 2), (100, 'home', 2)], [])
+    assert sorted(intervals) == [('home', 100, 220), ('road', 100, 220)]
+    # otherwise coincidental penalties cancel each other out
+    intervals = retrieve_penalty_intervals(
+        [(100, 'road', 5), (100, 'home', 5), (100, 'home', 2)], [])
+    assert intervals == [('home', 100, 220)]
+
+
+def test_stacked_penalties():
+    intervals = retrieve_penalty_intervals(
+        [(100, 'road', 2), (110, 'road', 2), (120, 'road', 2)], [])
+    assert intervals == [
+        ('road', 100, 220), ('road', 110, 230), ('road', 220, 340)]
+
+
+def test_situational_toi():
+    game = SimpleNamespace(
+        game_id=2016020001, season=2016, type=2,
+        home_team_id=HOME, road_team_id=ROAD)
+    shifts = [
+        create_shift(HOME_GOALIE, HOME, 1, 0, 1200),
+        create_shift(HOME_GOALIE, HOME, 2, 0, 1200),
+        create_shift(HOME_GOALIE, HOME, 3, 0, 1200),
+        create_shift(ROAD_GOALIE, ROAD, 1, 0, 1200),
+        create_shift(ROAD_GOALIE, ROAD, 2, 0, 1200),
+        # road goalie pulled for the final minute
+        create_shift(ROAD_GOALIE, ROAD, 3, 0, 1140),
+        create_shift(11, HOME, 1, 50, 150),
+        create_shift(11, HOME, 1, 300, 340),
+        create_shift(21, ROAD, 3, 1100, 1200),
+    ]
+    penalties = [(1, timedelta(seconds=100), ROAD, 2)]
+    goals = [(1, timedelta(seconds=130), HOME)]
+
+    state = build_game_state(
+        game, penalties, goals, shifts, set([HOME_GOALIE, ROAD_GOALIE]))
+    timeline = compress_game_state(state)
+
+    assert timeline['start'].tolist() == [0, 100, 130, 3540]
+    assert timeline['road_skaters'].tolist() == [5, 4, 5, 5]
+    assert timeline['home_score'].tolist() == [0, 0, 1, 1]
+    assert timeline['road_goalie'].tolist() == [True, True, True, False]
+
+    toi_rows = {
+        (r['team_id'], r['player_id']): r for
+        r in calculate_situational_toi(game, state)}
+
+    assert toi_rows[(HOME, None)]['toi_pp'] == 30
+    assert toi_rows[(ROAD, None)]['toi_sh'] == 30
+    assert toi_rows[(ROAD, None)]['toi_goalie_pulled'] == 60
+    assert toi_rows[(HOME, 11)]['toi_all'] == 140
+    assert toi_rows[(HOME, 11)]['toi_pp'] == 30
+    assert toi_rows[(HOME, 11)]['toi_5v5'] == 110
+    assert toi_rows[(HOME, 11)]['toi_tied'] == 80
+    assert toi_rows[(HOME, 11)]['toi_leading'] == 60
+    assert toi_rows[(ROAD, 21)]['toi_trailing'] == 100
+    assert toi_rows[(ROAD, 21)]['toi_goalie_pulled'] == 60
+
+
+def test_four_on_four_overtime():
+    game = SimpleNamespace(
+        game_id=2010020001, season=2010, type=2,
+        home_team_id=HOME, road_team_id=ROAD)
+    shifts = [create_shift(11, HOME, 4, 0, 300)]
+    # two home penalties in overtime, the second one overlapping the first
+    penalties = [
+        (4, timedelta(seconds=30), HOME, 2),
+        (4, timedelta(seconds=60), HOME, 2)]
+
+    state = build_game_state(game, penalties, list(), shifts, set())
+    timeline = compress_game_state(state)
+
+    assert timeline['start'].tolist() == [0, 3600, 3630, 3660, 3750, 3780]
+    assert timeline['home_skaters'].tolist() == [5, 4, 3, 3, 3, 4]
+    assert timeline['road_skaters'].tolist() == [5, 4, 4, 5, 4, 4]
+
+    # overtime was played five-on-five before 1999-00
+    game.season = 1998
+    state = build_game_state(game, penalties, list(), shifts, set())
+    assert state['home_skaters'][3600] == 5
+    assert state['road_skaters'][3600] == 5
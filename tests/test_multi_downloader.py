@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from zipfile import ZipFile
+
+from utils import json_storage
+from utils.multi_downloader import MultiFileDownloader
+
+
+def test_zip_index(tmpdir):
+    zip_path = os.path.join(tmpdir.strpath, "2016-10-12.zip")
+    with ZipFile(zip_path, mode='w') as zip:
+        zip.writestr("ES020001.HTM", b"<html></html>")
+
+    mfd = MultiFileDownloader(tmpdir.strpath)
+
+    assert mfd.check_for_file(zip_path, "ES020001.HTM")
+    assert not mfd.check_for_file(zip_path, "020001.json")
+    assert mfd.check_for_identical_file(
+        zip_path, "ES020001.HTM", b"<html></html>")
+    assert not mfd.check_for_identical_file(
+        zip_path, "ES020001.HTM", b"<html><body></body></html>")
+
+    mfd.register_file(zip_path, "020001.json", '{"plays": []}')
+    assert mfd.check_for_file(zip_path, "020001.json")
+    assert mfd.check_for_identical_file(
+        zip_path, "020001.json", '{"plays": []}')
+    # non-existing zip files result in an empty index
+    assert not mfd.check_for_file(
+        os.path.join(tmpdir.strpath, "missing.zip"), "ES020001.HTM")
+
+
+def test_zip_compressed_files(tmpdir, monkeypatch):
+    # compressed raw json data as written in raw json mode
+    raw_data = json_storage.compress(b'{"plays": []}')
+    html_data = "<html> </html>"
+
+    tmp_dir = tmpdir.mkdir("tmp").strpath
+    monkeypatch.setattr(MultiFileDownloader, 'TMP_DIR', tmp_dir)
+    mfd = MultiFileDownloader(tmpdir.strpath)
+
+    json_path = os.path.join(tmpdir.strpath, "020001.json")
+    with open(json_path, 'wb') as tgt:
+        tgt.write(raw_data)
+    mfd.downloaded_files.append(json_path)
+    mfd.zip_files("2016-10-12")
+
+    zip_path = os.path.join(tmpdir.strpath, "2016-10-12.zip")
+    with ZipFile(zip_path) as zip:
+        assert zip.read("020001.json") == raw_data
+
+    # zipping again with already zipped compressed file being extracted
+    html_path = os.path.join(tmpdir.strpath, "ES020001.HTM")
+    with open(html_path, 'w', encoding='utf-8') as tgt:
+        tgt.write(html_data)
+    mfd.downloaded_files = [html_path]
+    mfd.zip_files("2016-10-12")
+
+    with ZipFile(zip_path) as zip:
+        assert sorted(zip.namelist()) == ["020001.json", "ES020001.HTM"]
+        assert zip.read("020001.json") == raw_data
+        assert zip.read("ES020001.HTM").decode('utf-8') == html_data
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from utils.on_ice_matcher import join_events_with_shifts
+
+
+def create_event(cnt, period, seconds, home_on_ice, road_on_ice=None):
+    return SimpleNamespace(
+        event_id=20160200010000 + cnt, in_game_event_cnt=cnt, period=period,
+        time=timedelta(seconds=seconds), home_on_ice=home_on_ice,
+        road_on_ice=road_on_ice)
+
+
+def create_shift(shift_id, player_id, period, start, end):
+    return SimpleNamespace(
+        shift_id=shift_id, player_id=player_id, period=period,
+        start=timedelta(seconds=start), end=timedelta(seconds=end))
+
+
+def test_join_events_with_shifts():
+    shifts = [
+        create_shift(1, 10, 1, 0, 45),
+        create_shift(2, 11, 1, 0, 50),
+        create_shift(3, 10, 1, 90, 130),
+        create_shift(4, 12, 1, 45, 100),
+    ]
+    events = [
+        create_event(3, 1, 95, [10, 12]),
+        create_event(1, 1, 0, [10, 11]),
+        create_event(2, 1, 45, [10, 11, 12]),
+    ]
+
+    matches = join_events_with_shifts(events, shifts)
+
+    assert [m.event_id for m in matches] == [
+        20160200010001, 20160200010002, 20160200010003]
+    assert matches[0].shift_ids == {10: 1, 11: 2}
+    # players changing at the time of an event are on the ice for it
+    assert matches[1].shift_ids == {10: 1, 11: 2, 12: 4}
+    assert matches[2].shift_ids == {10: 3, 12: 4}
+    assert matches[2].shift_elapsed == {
+        10: timedelta(seconds=5), 12: timedelta(seconds=50)}
+    assert not any(m.not_on_shift or m.not_on_ice for m in matches)
+
+
+def test_join_events_with_shifts_discrepancies():
+    shifts = [
+        create_shift(1, 10, 1, 0, 45),
+        create_shift(2, 11, 1, 0, 50),
+    ]
+    events = [
+        create_event(1, 1, 20, [10, 12]),
+        # no shift data available for second period
+        create_event(2, 2, 20, [10, 12]),
+    ]
+
+    matches = join_events_with_shifts(events, shifts)
+
+    assert matches[0].not_on_shift == {12}
+    assert matches[0].not_on_ice == {11}
+    assert matches[1].shift_ids == {}
+    assert not matches[1].not_on_shift
+    assert not matches[1].not_on_ice
+
+
+def test_join_events_with_shifts_validation_only():
+    shifts = [create_shift(1, 10, 1, 0, 45)]
+    events = [create_event(1, 1, 20, [10, 12])]
+
+    matches = join_events_with_shifts(events, shifts, enrich=False)
+
+    assert matches[0].shift_ids is None
+    assert matches[0].shift_elapsed is None
+    assert matches[0].not_on_shift == {12}
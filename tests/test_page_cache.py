@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from types import SimpleNamespace
+
+from utils import page_cache
+from utils.page_cache import PageCache
+
+
+def test_page_cache(tmp_path, monkeypatch):
+
+    requested = list()
+
+    def get(url, **kwargs):
+        requested.append(url)
+        if url.endswith('missing'):
+            return SimpleNamespace(status_code=404, text='')
+        return SimpleNamespace(status_code=200, text="<html>%s</html>" % url)
+
+    monkeypatch.setattr(page_cache.http_client, 'get', get)
+
+    url = "https://www.eliteprospects.com/player/199898/auston-matthews"
+    cache = PageCache(str(tmp_path))
+    assert cache.get(url) == "<html>%s</html>" % url
+    # cached pages are retained across instances
+    assert PageCache(str(tmp_path)).get(url) == "<html>%s</html>" % url
+    assert requested == [url]
+    # unless a refresh is asked for
+    cache.get(url, refresh=True)
+    assert requested == [url, url]
+    # unavailable pages aren't cached
+    assert cache.get(url + 'missing') is None
+    assert cache.get(url + 'missing') is None
+    assert len(requested) == 4
+    # cached pages exceeding a maximum age are retrieved again
+    assert cache.get(url, max_age=60) is not None
+    assert len(requested) == 4
+    path = cache.get_path(url)
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert cache.get(url, max_age=60) is not None
+    assert len(requested) == 5
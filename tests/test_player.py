@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from db import upsert_db_items
 from db.player import Player
 
 
@@ -21,6 +22,13 @@ def test_find_by_id():
     assert plr.name == "Rory Fitzpatrick"
 
 
+def test_upsert_unchanged():
+    plr = Player.find_by_id(8459469)
+    # re-loading unchanged players leaves their rows untouched
+    assert upsert_db_items(Player, [(None, plr)]) == (0, 0)
+    assert upsert_db_items(Player, [(plr, plr)]) == (0, 0)
+
+
 def test_find_by_name():
     plr = Player.find_by_name("Jaromir", "Jagr")
     assert plr.player_id == 8448208
@@ -49,3 +49,24 @@ def test_comparison_operators():
 #     assert raw_player_data["hand"] == 'L'
 #     assert raw_player_data["date_of_birth"] == parse('1965-01-29').date()
 #     assert raw_player_data["place_of_birth"] == 'Pardubice, CZE'
+
+
+def test_player_data_from_landing():
+    landing_data = {
+        'playerId': 8447687, 'firstName': {'default': 'Dominik'},
+        'lastName': {'default': 'Hasek'}, 'position': 'G',
+        'sweaterNumber': 39, 'heightInInches': 73, 'weightInPounds': 166,
+        'shootsCatches': 'L', 'birthDate': '1965-01-29',
+        'birthCity': {'default': 'Pardubice'}, 'birthCountry': 'CZE'}
+
+    pdi = PlayerDataRetriever()
+    raw_player_data = pdi.retrieve_raw_player_data(8447687, landing_data)
+
+    assert raw_player_data['full_name'] == 'Dominik Hasek'
+    assert raw_player_data['position'] == 'G'
+    assert raw_player_data['number'] == 39
+    assert raw_player_data["height_metric"] == feet_to_m(6, 1)
+    assert raw_player_data["height_imperial"] == 6.01
+    assert raw_player_data["weight_metric"] == round(lbs_to_kg(166))
+    assert raw_player_data["date_of_birth"] == parse('1965-01-29').date()
+    assert raw_player_data["place_of_birth"] == 'Pardubice, CZE'
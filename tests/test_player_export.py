@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import json
+from collections import namedtuple
+
+from utils.player_export import get_export_item, write_json, write_jsonl
+from utils.player_export import read_player_export, get_delta_path
+from utils.player_export import get_state_path
+
+PlayerRow = namedtuple('PlayerRow', [
+    'player_id', 'first_name', 'last_name', 'position',
+    'alternate_first_names', 'alternate_last_names',
+    'alternate_positions', 'capfriendly_id'])
+
+ROWS = [
+    PlayerRow(
+        8471675, 'Sidney', 'Crosby', 'C', None, None, None, 'sidney-crosby'),
+    PlayerRow(
+        8474564, 'Steven', 'Stamkos', 'C', None, None, ['RW'], None),
+    PlayerRow(
+        8478402, 'Connor', 'McDavid', 'C', ['Connor'], None, None, None),
+]
+
+
+def test_write_json():
+    export_items = [get_export_item(row) for row in ROWS]
+    tgt_file = io.StringIO()
+    assert write_json(iter(export_items), tgt_file) == 3
+    # incremental output equals complete dump
+    assert tgt_file.getvalue() == json.dumps(dict(export_items), indent=2)
+
+    tgt_file = io.StringIO()
+    assert write_json(iter([]), tgt_file) == 0
+    assert json.loads(tgt_file.getvalue()) == dict()
+
+
+def test_jsonl_round_trip(tmpdir):
+    export_items = [get_export_item(row) for row in ROWS]
+    assert 'alternate_positions' not in export_items[0][1]
+    assert export_items[1][1]['alternate_positions'] == ['RW']
+
+    tgt_path = str(tmpdir.join('nhl_players.jsonl'))
+    with open(tgt_path, 'w', encoding='utf-8') as tgt_file:
+        assert write_jsonl(export_items, tgt_file) == 3
+    assert len(open(tgt_path).readlines()) == 3
+
+    json_path = str(tmpdir.join('nhl_players.json'))
+    with open(json_path, 'w', encoding='utf-8') as tgt_file:
+        write_json(export_items, tgt_file)
+
+    # both formats are read back identically
+    expected = [(str(player_id), data) for player_id, data in export_items]
+    assert list(read_player_export(tgt_path)) == expected
+    assert list(read_player_export(json_path)) == expected
+
+
+def test_delta_records(tmpdir):
+    tgt_path = str(tmpdir.join('nhl_players.json'))
+    delta_path = get_delta_path(tgt_path)
+    assert delta_path == str(tmpdir.join('nhl_players.delta.jsonl'))
+    # timestamps of last exports are kept per target file
+    assert get_state_path(tgt_path) != get_state_path(
+        str(tmpdir.join('nhl_players.jsonl')))
+
+    with open(delta_path, 'w', encoding='utf-8') as tgt_file:
+        write_jsonl([get_export_item(ROWS[0])], tgt_file, {8474564})
+    assert list(read_player_export(delta_path)) == [
+        ('8471675', get_export_item(ROWS[0])[1]),
+        ('8474564', {'deleted': True}),
+    ]
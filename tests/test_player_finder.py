@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from utils import player_finder
+from utils.player_finder import PlayerFinder
+
+
+def test_roster_discovery(monkeypatch):
+
+    team = SimpleNamespace(team_id=53, abbr='UTA', orig_abbr='ARI')
+    requested = list()
+
+    def get(url, **kwargs):
+        requested.append(url)
+        # current abbreviation only valid since 2024-25, original one until
+        # 2023-24, no rosters at all before 2000-01
+        if (
+            '/UTA/' in url and not url.endswith('20242025') or
+            '/ARI/' in url and url.endswith('20242025') or
+            url.endswith('19992000')
+        ):
+            return SimpleNamespace(status_code=404, json=lambda: dict())
+        return SimpleNamespace(status_code=200, json=lambda: {
+            'forwards': [{'id': 8478402}, {'id': 8480000}],
+            'goalies': [{'id': 8478403}]})
+
+    def create_player(plr_id, last_name, first_name, position):
+        plr = SimpleNamespace(player_id=plr_id, last_name=last_name)
+        pf.known_players[plr_id] = plr
+        return plr
+
+    landing_requests = list()
+
+    def retrieve_landing_data(plr_id):
+        landing_requests.append(plr_id)
+        return {
+            'firstName': {'default': 'New'}, 'lastName': {'default': 'Player'},
+            'position': 'C'}
+
+    monkeypatch.setattr(player_finder.http_client, 'get', get)
+    monkeypatch.setattr(
+        player_finder, 'retrieve_landing_data', retrieve_landing_data)
+    monkeypatch.setattr(player_finder.Player, 'find_by_id', lambda x: None)
+
+    pf = PlayerFinder()
+    pf.known_players = {
+        8478402: SimpleNamespace(player_id=8478402),
+        8478403: SimpleNamespace(player_id=8478403)}
+    monkeypatch.setattr(pf, 'create_player', create_player)
+
+    players = pf.get_roster_players_via_api(team, 2023)
+    assert [plr.player_id for plr in players] == [8478402, 8480000, 8478403]
+    # only unknown players are retrieved
+    assert landing_requests == [8480000]
+    assert len(requested) == 2
+
+    # fallback to original abbreviation is remembered
+    requested.clear()
+    pf.get_roster_players_via_api(team, 2023)
+    assert requested == ["https://api-web.nhle.com/v1/roster/ARI/20232024"]
+    assert landing_requests == [8480000]
+
+    # remembered abbreviation failing for another season is not final
+    requested.clear()
+    pf.get_roster_players_via_api(team, 2024)
+    assert requested == [
+        "https://api-web.nhle.com/v1/roster/ARI/20242025",
+        "https://api-web.nhle.com/v1/roster/UTA/20242025"]
+    assert pf.roster_abbrs[53] == 'UTA'
+
+    # no roster data from 404 responses
+    assert pf.retrieve_roster_data(team, '19992000') == dict()
+    assert pf.get_roster_players_via_api(team, 1999) == list()
@@ -40,3 +40,15 @@ def test_find_all_goalie_seasons():
     """
     goalie_seasons = GoalieSeason.find_all(8448382)
     assert len(goalie_seasons) == 33
+
+
+def test_find_all_for_players():
+    """
+    Tests retrieval of season items for multiple players at once.
+    """
+    plr_seasons = PlayerSeason.find_all_for_players([8446053, 8451774])
+    assert len(plr_seasons) == (
+        len(PlayerSeason.find_all(8446053)) +
+        len(PlayerSeason.find_all(8451774)))
+    goalie_seasons = GoalieSeason.find_all_for_players([8448382])
+    assert len(goalie_seasons) == 33
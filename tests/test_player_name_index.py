@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from utils.player_name_index import PlayerNameIndex, fold_name
+
+
+def create_player(player_id, first_name, last_name, position, **kwargs):
+    plr = SimpleNamespace(
+        player_id=player_id, first_name=first_name, last_name=last_name,
+        position=position, alternate_first_names=None,
+        alternate_last_names=None, alternate_positions=None)
+    for key, value in kwargs.items():
+        setattr(plr, key, value)
+    return plr
+
+
+PLAYERS = [
+    create_player(8471214, "Alex", "Ovechkin", "L"),
+    create_player(
+        8476453, "Nikita", "Kucherov", "R", alternate_positions=['L']),
+    create_player(
+        8478483, "Mitchell", "Marner", "R", alternate_first_names=['Mitch']),
+    create_player(
+        8476883, "Andrei", "Vasilevskiy", "G",
+        alternate_last_names=['Vasilevski']),
+    create_player(8470794, "Joe", "Pavelski", "C"),
+    create_player(8473994, "Jamie", "Benn", "L"),
+    create_player(8474818, "Jordie", "Benn", "D"),
+    create_player(8477956, "David", "Pastrňák", "R"),
+    create_player(8470000, "Erik", "Karlsson", "D"),
+    create_player(8474578, "Erik", "Karlsson", "D"),
+]
+
+
+def test_fold_name():
+    assert fold_name("David Pastrňák") == "david pastrnak"
+    assert fold_name("T.J.  Brodie") == "tj brodie"
+    assert fold_name("Pierre-Luc Dubois") == "pierre luc dubois"
+
+
+def test_exact_lookups():
+    idx = PlayerNameIndex(PLAYERS)
+    assert idx.find_by_name("ALEX", "OVECHKIN").player_id == 8471214
+    assert idx.find_by_name("David", "Pastrnak").player_id == 8477956
+    assert idx.find_by_name("Mitch", "Marner") is None
+    assert idx.find_by_name_extended("Mitch", "Marner").player_id == 8478483
+    assert idx.find_by_full_name(
+        "Andrei Vasilevski").player_id == 8476883
+    # positions include alternate positions
+    assert idx.find_by_full_name("Nikita Kucherov", "L").player_id == 8476453
+    assert idx.find_by_full_name("Nikita Kucherov", "C") is None
+    # ambiguous names are not resolved
+    assert idx.find_by_full_name("Erik Karlsson") is None
+
+
+def test_fuzzy_lookups():
+    idx = PlayerNameIndex(PLAYERS)
+    assert idx.find_fuzzy("Alexander Ovechkin").player_id == 8471214
+    assert idx.find_fuzzy("Joe Pavelsky").player_id == 8470794
+    assert idx.find_fuzzy("Wayne Gretzky") is None
+    # fuzzy fallback is only applied on request and with a position
+    assert idx.find("Jordy", "Benn", "D") is None
+    assert idx.find("Jordy", "Benn", fuzzy=True) is None
+    assert idx.find("Jordy", "Benn", "D", fuzzy=True).player_id == 8474818
+
+
+def test_add_player():
+    idx = PlayerNameIndex(PLAYERS)
+    assert idx.find_by_name("Connor", "McDavid") is None
+    idx.add(create_player(8478402, "Connor", "McDavid", "C"))
+    assert idx.find_by_name("Connor", "McDavid").player_id == 8478402
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from utils.season_aggregator import split_into_stints, get_goal_stats
+from utils.season_aggregator import aggregate_skater_stint
+from utils.season_aggregator import aggregate_goalie_stint, match_db_items
+from utils.season_aggregator import get_storable_pairs
+
+
+def create_game(game_id, home_score=3, road_score=2, shootout_game=False):
+    return SimpleNamespace(
+        game_id=game_id, season=2016, type=2, home_team_id=10,
+        road_team_id=6, home_score=home_score, road_score=road_score,
+        shootout_game=shootout_game)
+
+
+def create_plr_game(game_id, team_id, **kwargs):
+    plr_game = dict(
+        game_id=game_id, player_id=8471675, team_id=team_id, goals=0,
+        assists=0, points=0, plus_minus=0, pim=0, shots_on_goal=0,
+        faceoffs_won=0, faceoffs_lost=0, toi_overall=timedelta(minutes=20))
+    plr_game.update(kwargs)
+    return SimpleNamespace(**plr_game)
+
+
+def test_skater_stints():
+    games = [create_game(2016020001 + i) for i in range(4)]
+    plr_games = [
+        create_plr_game(games[0].game_id, 10, goals=1, points=1, shots_on_goal=3, faceoffs_won=6, faceoffs_lost=4),
+        create_plr_game(games[1].game_id, 10, assists=2, points=2, pim=2),
+        create_plr_game(games[2].game_id, 6, goals=1, points=1, shots_on_goal=2),
+        create_plr_game(games[3].game_id, 10, plus_minus=-1),
+    ]
+    stints = split_into_stints(list(zip(plr_games, games)))[(8471675, 2016, 'RS')]
+    # returning to a former team starts a new stint
+    assert [len(stint) for stint in stints] == [2, 1, 1]
+    assert [stint[0][0].team_id for stint in stints] == [10, 6, 10]
+
+    goals = [
+        # power play game-winner in first game
+        (SimpleNamespace(player_id=8471675, assist_1=8474564, assist_2=None, team_id=10, in_game_team_cnt=3),
+         SimpleNamespace(game_id=games[0].game_id, num_situation='PP', period=3)),
+        # short-handed assist in second game
+        (SimpleNamespace(player_id=8474564, assist_1=8471675, assist_2=None, team_id=10, in_game_team_cnt=1),
+         SimpleNamespace(game_id=games[1].game_id, num_situation='SH', period=1)),
+    ]
+    goal_stats = get_goal_stats(goals, {game.game_id: game for game in games})
+
+    season_data = aggregate_skater_stint(stints[0], goal_stats)
+    assert season_data['gamesPlayed'] == 2
+    assert season_data['points'] == 3
+    assert season_data['powerPlayGoals'] == 1
+    assert season_data['powerPlayPoints'] == 1
+    assert season_data['shorthandedGoals'] == 0
+    assert season_data['shorthandedPoints'] == 1
+    assert season_data['gameWinningGoals'] == 1
+    assert season_data['faceoffWinningPctg'] == 0.6
+    assert season_data['timeOnIce'] == "40:00"
+
+
+def test_goalie_stint():
+    games = [create_game(2016020001), create_game(2016020002, 0, 2)]
+    goalie_games = [
+        SimpleNamespace(
+            game_id=game.game_id, player_id=8471679, team_id=10,
+            starting=True, win=win, loss=not win, otl=False, tie=False,
+            shutout=False, shots_against=30, goals_against=ga,
+            toi_overall=timedelta(minutes=60))
+        for game, win, ga in zip(games, [True, False], [2, 2])]
+    stints = split_into_stints(list(zip(goalie_games, games)))[(8471679, 2016, 'RS')]
+    season_data = aggregate_goalie_stint(stints[0])
+    assert season_data['gamesStarted'] == 2
+    assert (season_data['wins'], season_data['losses']) == (1, 1)
+    assert season_data['shotsAgainst'] == 60
+    assert season_data['timeOnIce'] == "120:00"
+
+
+def test_match_db_items():
+    def create_item(team_id, sequence=None):
+        return SimpleNamespace(
+            player_id=8471675, season=2016, season_type='RS',
+            team_id=team_id, season_team_sequence=sequence)
+
+    db_items = [create_item(6, 2), create_item(10, 1)]
+    new_items = [create_item(10), create_item(6), create_item(10)]
+    pairs = match_db_items(new_items, db_items)
+    assert [db_item is None for db_item, _ in pairs] == [False, False, True]
+    assert [item.season_team_sequence for _, item in pairs] == [1, 2, 3]
+
+
+def test_storable_pairs():
+    def create_item(games_played):
+        return SimpleNamespace(games_played=games_played)
+
+    pairs = [
+        (None, create_item(10)),
+        (create_item(82), create_item(82)),
+        # partial game data doesn't replace complete retrieved totals
+        (create_item(82), create_item(40)),
+        (create_item(40), create_item(41)),
+    ]
+    assert get_storable_pairs(pairs) == [pairs[0], pairs[1], pairs[3]]
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+from zipfile import ZipFile
+
+from utils.data_handler import DataHandler
+from utils.season_archive import SeasonArchive, get_season_archive_path
+
+
+def create_zip(zip_path, game_ids):
+    with ZipFile(zip_path, 'w') as zip:
+        for game_id in game_ids:
+            zip.writestr("ES%s.HTM" % game_id, "<html>ES %s</html>" % game_id)
+            zip.writestr("GS%s.HTM" % game_id, "<html>GS %s</html>" % game_id)
+            zip.writestr("%s.json" % game_id, json.dumps({'id': game_id}))
+
+
+def test_append_and_read(tmp_path):
+    zip_path = str(tmp_path / '2016-10-12.zip')
+    create_zip(zip_path, ['020001', '020002'])
+    archive_path = get_season_archive_path(str(tmp_path), 2016)
+    assert archive_path.endswith('20162017.sar')
+
+    with SeasonArchive(archive_path) as archive:
+        assert archive.append_zip(zip_path, '2016-10-12') == 6
+        assert archive.read('GS020002.HTM') == b"<html>GS 020002</html>"
+        # identical files are not appended again
+        assert archive.append_zip(zip_path, '2016-10-12') == 0
+        size = os.path.getsize(archive_path)
+        # updated files are appended, existing data remains untouched
+        assert archive.append(
+            [('020001', 'ES020001.HTM', "<html>updated</html>")]) == 1
+        assert os.path.getsize(archive_path) > size
+
+    with SeasonArchive(archive_path) as archive:
+        assert archive.get_game_ids() == ['020001', '020002']
+        assert archive.get_game_ids(['2016-10-12']) == ['020001', '020002']
+        assert archive.get_game_ids(['2016-10-13']) == []
+        assert archive.read('ES020001.HTM', '020001') == b"<html>updated</html>"
+        # zip file differs from archive after update
+        assert not archive.contains_zip(zip_path)
+
+    zip_path = str(tmp_path / '2016-10-13.zip')
+    create_zip(zip_path, ['020003'])
+    with SeasonArchive(archive_path) as archive:
+        assert not archive.contains_zip(zip_path)
+        archive.append_zip(zip_path, '2016-10-13')
+        assert archive.contains_zip(zip_path)
+
+
+def test_data_handler(tmp_path):
+    zip_path = str(tmp_path / '2016-10-12.zip')
+    create_zip(zip_path, ['020001', '020002'])
+    archive_path = get_season_archive_path(str(tmp_path), 2016)
+    with SeasonArchive(archive_path) as archive:
+        archive.append_zip(zip_path, '2016-10-12')
+
+    dh = DataHandler(archive_path)
+    assert dh.game_ids == ['020001', '020002']
+    game_data = dh.get_game_data('020002', 'GS')
+    assert open(game_data['GS']).read() == "<html>GS 020002</html>"
+    assert dh.read_game_json_data('020001') == {'id': '020001'}
+    dh.clear_temp_files()
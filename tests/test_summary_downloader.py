@@ -3,8 +3,13 @@
 
 import os
 import itertools
+from queue import Queue
+from datetime import datetime, timedelta
 from zipfile import ZipFile
 
+from lxml import html
+
+from utils import minify_html_document
 from utils.summary_downloader import SummaryDownloader
 
 
@@ -57,3 +62,187 @@ def set_up_comparison_files():
     files.append("SO020082.HTM")
 
     return date, files
+
+
+def test_get_files_to_download_for_games(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016")
+    games = [
+        {'id': 2016020081, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF'},
+        {'id': 2016020082, 'season': 20162017, 'gameType': 2, 'gameState': 'LIVE'},
+        {'id': 2016020083, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF', 'archived': True},
+        {'id': 2016010001, 'season': 20162017, 'gameType': 1, 'gameState': 'OFF'},
+    ]
+    files = [os.path.basename(url) if tgt is None else tgt for url, tgt in sdl.get_files_to_download_for_games(games)]
+
+    # only final, not yet archived regular season or playoff games are used
+    assert all('020081' in f for f in files)
+    assert "020081.json" in files
+    assert "020081_sc.json" in files
+
+
+def test_final_schedule(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016")
+    sdl.schedule["2016-10-24"] = [{'id': 2016020081, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF'}]
+    sdl.schedule["2016-10-25"] = [{'id': 2016020082, 'season': 20162017, 'gameType': 2, 'gameState': 'FUT'}]
+    sdl.schedule["2016-10-26"] = list()
+    sdl.schedule["2016-10-27"] = list()
+    sdl.schedule_retrieved["2016-10-26"] = datetime(2016, 10, 26, 12).isoformat()
+    sdl.schedule_retrieved["2016-10-27"] = datetime(2016, 10, 28, 12).isoformat()
+
+    assert sdl.check_for_final_schedule("2016-10-24")
+    assert not sdl.check_for_final_schedule("2016-10-25")
+    # dates without games are final only if retrieved after they had passed
+    assert not sdl.check_for_final_schedule("2016-10-26")
+    assert sdl.check_for_final_schedule("2016-10-27")
+    assert not sdl.check_for_final_schedule("2016-10-28")
+
+
+def test_check_for_missing_report(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016")
+    game_date = datetime(2016, 10, 24)
+    url = "".join((sdl.HTML_REPORT_PREFIX, "20162017/SO020081.HTM"))
+
+    assert not sdl.check_for_missing_report(url, game_date)
+    # still missing a week after the game: permanently missing
+    sdl.missing_reports[url] = datetime(2016, 11, 1).isoformat()
+    assert sdl.check_for_missing_report(url, game_date)
+    # missing shortly after the game: checked again after a while
+    sdl.missing_reports[url] = datetime(2016, 10, 25).isoformat()
+    assert not sdl.check_for_missing_report(url, game_date)
+    sdl.register_missing_report(url)
+    assert sdl.check_for_missing_report(url, datetime.now() - timedelta(days=2))
+
+
+def test_archive_games_with_missing_reports(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016")
+    tgt_dir = tmpdir.mkdir('tgt').strpath
+    sdl.zip_path = os.path.join(tgt_dir, "2016-10-24.zip")
+    game = {'id': 2016020081, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF', 'gameOutcome': {'lastPeriodType': 'REG'}}
+    sdl.schedule["2016-10-24"] = [game]
+    for f in sdl.get_expected_files(game):
+        if f != "GS020081.HTM":
+            open(os.path.join(tgt_dir, f), 'w').write("<html></html>")
+    url = "".join((sdl.HTML_REPORT_PREFIX, "20162017/GS020081.HTM"))
+
+    # report of recent game found missing a few minutes ago isn't checked
+    # again yet, but it is missing only temporarily: game isn't archived
+    sdl.current_date = datetime.now() - timedelta(days=2)
+    sdl.schedule[sdl.get_formatted_date(sdl.current_date)] = [game]
+    sdl.register_missing_report(url)
+    assert sdl.check_for_missing_report(url, sdl.current_date)
+    sdl.mark_archived_games(tgt_dir)
+    assert not game.get('archived')
+
+    # report still missing a week after the game: game is archived
+    sdl.current_date = datetime(2016, 10, 24)
+    sdl.missing_reports[url] = datetime(2016, 11, 1).isoformat()
+    sdl.mark_archived_games(tgt_dir)
+    assert game['archived']
+
+
+def test_skip_shootout_report(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016")
+    games = [
+        {'id': 2016020081, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF', 'gameOutcome': {'lastPeriodType': 'REG'}},
+        {'id': 2016020082, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF', 'gameOutcome': {'lastPeriodType': 'SO'}},
+    ]
+    urls = [url for url, _ in sdl.get_files_to_download_for_games(games)]
+
+    assert not any(url.endswith("SO020081.HTM") for url in urls)
+    assert any(url.endswith("SO020082.HTM") for url in urls)
+
+
+def test_minify_keeps_nbsp_cells():
+    doc = html.document_fromstring(
+        "<html><body><!-- comment -->\n<table>\n<tr>\n"
+        "<td>12</td><td>&nbsp;</td><td>3</td>\n"
+        "</tr>\n</table></body></html>")
+    doc = minify_html_document(doc)
+    # empty cells still hold a non-breaking space to retain column positions
+    assert doc.xpath("//td/text()") == ['12', '\xa0', '3']
+    assert doc.xpath("//tr")[0].text is None
+    assert not doc.xpath("//comment()")
+
+
+def test_remove_extracted_files_per_game(tmpdir):
+
+    game_queue = Queue()
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016", game_queue=game_queue)
+    tgt_dir = tmpdir.mkdir('tgt').strpath
+    sdl.zip_path = os.path.join(tgt_dir, "2016-10-24.zip")
+    with ZipFile(sdl.zip_path, 'w') as zip:
+        for f in ["GS020081.HTM", "ES020081.HTM", "GS020082.HTM", "ES020082.HTM"]:
+            zip.writestr(f, "<html></html>")
+
+    # one new file per game, remaining files are extracted from zip file
+    for game_id in ["020081", "020082"]:
+        new_file = os.path.join(tgt_dir, "GS%s.HTM" % game_id)
+        open(new_file, 'w').write("<html></html>")
+        sdl.pending_game_files[sdl.get_full_game_id(game_id, sdl.current_date)] = 1
+        sdl.finish_game_file(tgt_dir, os.path.basename(new_file), new_file)
+
+    items = [game_queue.get(), game_queue.get()]
+    assert [item[0] for item in items] == ["020081", "020082"]
+    assert os.path.isfile(os.path.join(tgt_dir, "ES020081.HTM"))
+
+    # finishing one game only removes files extracted for this game
+    items[0][2]()
+    assert not os.path.isfile(os.path.join(tgt_dir, "ES020081.HTM"))
+    assert os.path.isfile(os.path.join(tgt_dir, "ES020082.HTM"))
+    assert os.path.isfile(os.path.join(tgt_dir, "GS020081.HTM"))
+
+
+def test_full_game_ids(tmpdir):
+
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016", "Oct 24, 2017")
+    sdl.schedule["2016-10-24"] = [{'id': 2016020081, 'season': 20162017, 'gameType': 2, 'gameState': 'OFF'}]
+
+    # games with same ids from different seasons are told apart
+    assert sdl.get_full_game_id("020081", datetime(2016, 10, 24)) == "2016020081"
+    assert sdl.get_full_game_id("020081", datetime(2017, 10, 24)) == "2017020081"
+    assert sdl.get_full_game_id("030111", datetime(2017, 4, 12)) == "2016030111"
+
+
+def test_checkpoint_for_overlapping_dates(tmpdir):
+
+    tgt_dir = tmpdir.mkdir('sdl').strpath
+    sdl = SummaryDownloader(tgt_dir, "Oct 12, 2016", "Oct 24, 2016")
+    sdl.save_state = lambda: None
+    sdl.schedule["2016-10-14"] = [{'id': 2016020040, 'season': 20162017, 'gameType': 2, 'gameState': 'LIVE'}]
+    for day in (12, 13, 14):
+        sdl.save_checkpoint(datetime(2016, 10, day))
+    # dates with games not final yet aren't completed
+    assert sdl.load_checkpoint() == set(["2016-10-12", "2016-10-13"])
+
+    # completed dates are reused by runs for other (overlapping) dates
+    assert SummaryDownloader(tgt_dir, "Oct 12, 2016", "Oct 31, 2016").load_checkpoint() == set(["2016-10-12", "2016-10-13"])
+    assert SummaryDownloader(tgt_dir, "Oct 12, 2016", "Oct 24, 2016", resume=False).load_checkpoint() == set()
+
+
+def test_wait_for_games_of_date(tmpdir):
+
+    game_queue = Queue()
+    sdl = SummaryDownloader(tmpdir.mkdir('sdl').strpath, "Oct 24, 2016", "Oct 25, 2016", game_queue=game_queue)
+    tgt_dir = tmpdir.mkdir('tgt').strpath
+    sdl.zip_path = os.path.join(tgt_dir, "2016-10-24.zip")
+
+    for day, game_id in [(24, "020081"), (25, "020090")]:
+        sdl.task_context.date = datetime(2016, 10, day)
+        new_file = os.path.join(tgt_dir, "GS%s.HTM" % game_id)
+        open(new_file, 'w').write("<html></html>")
+        sdl.pending_game_files[sdl.get_full_game_id(game_id, sdl.task_context.date)] = 1
+        sdl.finish_game_file(tgt_dir, os.path.basename(new_file), new_file)
+
+    items = [game_queue.get(), game_queue.get()]
+    # finalizing a date only waits for games of this date
+    items[0][2]()
+    sdl.wait_for_published_games(datetime(2016, 10, 24))
+    assert sdl.published_games == {"2016-10-25": 1}
+    items[1][2]()
+    sdl.wait_for_published_games(datetime(2016, 10, 25))
+    assert not sdl.published_games
@@ -36,6 +36,14 @@ def test_find_by_name_oakland():
     assert t.name == 'Oakland Seals'
 
 
+def test_find_all_by_name():
+    teams_by_name = Team.find_all_by_name()
+    assert teams_by_name['vancouver canucks'].name == 'Vancouver Canucks'
+    assert teams_by_name[
+        Team.normalize_name('Canadiens Montreal').lower()
+    ].name == 'Montréal Canadiens'
+
+
 # def test_constructor():
 #     url = "https://statsapi.web.nhl.com/api/v1/teams/10"
 #     response = requests.get(url)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import date, timedelta
+
+from toi_adjusted_age import aggregate_mean_ages
+
+
+def test_aggregate_mean_ages():
+    game_date = date(2019, 10, 2)
+    plr_games = [
+        # two players of home team in first game, the older one playing
+        # three times as much as the younger one
+        (2019020001, 10, timedelta(minutes=15), game_date, date(1989, 10, 2)),
+        (2019020001, 10, timedelta(minutes=5), game_date, date(1999, 10, 2)),
+        # road team player without time on ice
+        (2019020001, 6, None, game_date, date(1994, 10, 2)),
+        # home team player in second game
+        (2019020002, 10, timedelta(minutes=10), date(2019, 10, 4),
+         date(1989, 10, 4)),
+    ]
+    mean_ages = {
+        (m['game_id'], m['team_id']): m for
+        m in aggregate_mean_ages(plr_games)}
+
+    assert sorted(mean_ages) == [
+        (2019020001, 6), (2019020001, 10), (2019020002, 10)]
+    home = mean_ages[(2019020001, 10)]
+    assert home['players'] == 2
+    assert round(home['std_mean_age'], 1) == 25.0
+    # weighted by time on ice: 0.75 * 30 years + 0.25 * 20 years
+    assert round(home['weighted_mean_age'], 1) == 27.5
+    assert round(mean_ages[(2019020002, 10)]['weighted_mean_age'], 1) == 30.0
+    # weighted mean age is undefined without any time on ice
+    assert mean_ages[(2019020001, 6)]['weighted_mean_age'] != (
+        mean_ages[(2019020001, 6)]['weighted_mean_age'])
+    assert aggregate_mean_ages(list()) == list()
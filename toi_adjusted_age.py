@@ -2,13 +2,17 @@
 # -*- coding: utf-8 -*-
 
 # import math
+import os
 import numpy as np
 # import matplotlib.pyplot as plt
 
 from datetime import timedelta
 from operator import attrgetter
 
-# from db.common import session_scope
+from sqlalchemy import and_
+
+from utils import get_game_id_range
+from db.common import session_scope
 from db.game import Game
 from db.player_game import PlayerGame
 from db.player_data_item import PlayerDataItem
@@ -78,6 +82,84 @@ def calculate_mean_age(
         return (std_mean_age, weighted_mean_age)
 
 
+def calculate_mean_ages_for_season(
+        season, game_type=2, positions=None, toi_type='toi_ev'):
+    """
+    Calculates standard and time-on-ice-weighted mean ages (in years) for
+    each team in every game of the specified season and game type at once.
+    Returns a list of dictionaries, one for each team and game.
+    """
+    # using players of all skater positions by default
+    if positions is None:
+        positions = ["C", "L", "R", "D"]
+
+    first_game_id, last_game_id = get_game_id_range(season, game_type)
+
+    # retrieving players' time on ice, game dates and dates of birth for all
+    # games in a single query
+    with session_scope() as session:
+        plr_games = session.query(
+            PlayerGame.game_id, PlayerGame.team_id,
+            getattr(PlayerGame, toi_type),
+            Game.date, PlayerDataItem.date_of_birth
+        ).filter(
+            and_(
+                PlayerGame.game_id >= first_game_id,
+                PlayerGame.game_id <= last_game_id,
+                PlayerGame.position.in_(positions),
+                PlayerGame.game_id == Game.game_id,
+                PlayerGame.player_id == PlayerDataItem.player_id,
+                PlayerDataItem.date_of_birth.isnot(None)
+            )).all()
+
+    return aggregate_mean_ages(plr_games)
+
+
+def aggregate_mean_ages(plr_games):
+    """
+    Aggregates standard and time-on-ice-weighted mean ages (in years) for
+    each team and game from specified tuples of game id, team id, time on
+    ice, game date and player date of birth.
+    """
+    if not plr_games:
+        return list()
+
+    game_ids, team_ids, tois, game_dates, dobs = zip(*plr_games)
+
+    # calculating each player's age in days on the day of the game
+    ages = (
+        np.array(game_dates, dtype='datetime64[D]') -
+        np.array(dobs, dtype='datetime64[D]')).astype(np.float64)
+    tois = np.array(
+        [t.seconds if t is not None else 0 for t in tois], dtype=np.float64)
+
+    # grouping players by game and team
+    game_teams, idx = np.unique(
+        np.column_stack((game_ids, team_ids)), axis=0, return_inverse=True)
+    idx = idx.ravel()
+    plr_counts = np.bincount(idx)
+    toi_sums = np.bincount(idx, weights=tois)
+
+    std_mean_ages = np.bincount(idx, weights=ages) / plr_counts
+    weighted_mean_ages = np.full(len(game_teams), np.nan)
+    np.divide(
+        np.bincount(idx, weights=ages * tois), toi_sums,
+        out=weighted_mean_ages, where=toi_sums > 0)
+
+    mean_ages = list()
+    for (game_id, team_id), players, std_age, weighted_age in zip(
+            game_teams, plr_counts, std_mean_ages, weighted_mean_ages):
+        mean_ages.append({
+            'game_id': int(game_id),
+            'team_id': int(team_id),
+            'players': int(players),
+            'std_mean_age': float(std_age / 365.),
+            'weighted_mean_age': float(weighted_age / 365.),
+        })
+
+    return mean_ages
+
+
 # def plot_stuff(std_mean_age, weighted_mean_age):
 
 #     x = [v.days for v in std_mean_age]
@@ -119,11 +201,20 @@ if __name__ == '__main__':
     # team = Team.find('TOR')
     # games = Game.find_by_season_team(season, team)
 
-    for team in sorted(Team.find_teams_for_season(season))[:]:
-        if not team.abbr == 'CLB':
-            continue
-        print(team)
-        process_team(season, team)
+    teams = {t.team_id: t for t in Team.find_teams_for_season(season)}
+
+    output = list()
+    output.append("team,game_id,std_mean_age,weighted_mean_age")
+
+    for mean_age in calculate_mean_ages_for_season(season):
+        output.append(",".join((
+            teams[mean_age['team_id']].name, str(mean_age['game_id']),
+            "%.4f" % mean_age['std_mean_age'],
+            "%.4f" % mean_age['weighted_mean_age'])))
+
+    os.makedirs("results", exist_ok=True)
+    open(os.path.join(
+        "results", "%d.csv" % season), 'w').write("\n".join(output))
     # process_team(season, "NJD")
 
     # plt.show()
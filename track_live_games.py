@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.summary_downloader import SummaryDownloader
+from parsers.live_parser import LiveGameParser
+from utils import http_client
+
+from utils import prepare_logging
+prepare_logging(log_types=['screen'])
+
+# game states indicating games in progress
+LIVE_GAME_STATES = ['LIVE', 'CRIT']
+# game states indicating finished games
+FINAL_GAME_STATES = ['OFF', 'FINAL']
+
+
+def retrieve_game_states(game_dates):
+    """
+    Retrieves states of all regular season and playoff games scheduled for
+    the specified (consecutive) dates by game id. As the schedule is
+    retrieved for a whole week, a single request is sufficient.
+    """
+    game_dates = set(map(str, game_dates))
+    url = "/".join((SummaryDownloader.SCHEDULE_URL_BASE, min(game_dates)))
+    schedule = http_client.get(url).json()
+
+    game_states = dict()
+    for game_day in schedule['gameWeek']:
+        if game_day['date'] not in game_dates:
+            continue
+        for game in game_day['games']:
+            if game['gameType'] in SummaryDownloader.GAME_TYPES:
+                game_states[game['id']] = game['gameState']
+
+    return game_states
+
+
+def retrieve_game_state(game_id):
+    """
+    Retrieves state of the game with the specified id from its play-by-play
+    feed.
+    """
+    url = SummaryDownloader.JSON_GAME_FEED_URL_TEMPLATE % game_id
+    return http_client.get(url).json()['gameState']
+
+
+def update_game_states(game_states, tgt_game_ids=None):
+    """
+    Updates specified states of tracked games by game id with games of the
+    previous and current day, i.e. to include games still in progress after
+    midnight. Games not finished yet are tracked further regardless of the
+    current date.
+    """
+    today = date.today()
+    current_states = retrieve_game_states([today - timedelta(days=1), today])
+    if tgt_game_ids:
+        current_states = {
+            game_id: game_state for game_id, game_state in
+            current_states.items() if game_id in tgt_game_ids}
+
+    # retrieving states of unfinished games no longer in schedule range
+    for game_id, game_state in game_states.items():
+        if game_id in current_states or game_state in FINAL_GAME_STATES:
+            continue
+        try:
+            current_states[game_id] = retrieve_game_state(game_id)
+        except Exception as e:
+            print("+ Unable to retrieve state of game %d: %s" % (game_id, e))
+
+    game_states.update(current_states)
+    return game_states
+
+
+if __name__ == '__main__':
+
+    # retrieving arguments specified on command line
+    parser = argparse.ArgumentParser(
+        description='Track events of NHL games in progress.')
+    parser.add_argument(
+        '-i', '--interval', dest='interval', required=False, type=int,
+        default=30, metavar='polling interval',
+        help="Number of seconds between two polls of each game in progress")
+    parser.add_argument(
+        '-g', '--games', dest='tgt_game_ids', required=False, type=int,
+        nargs='+', metavar='list of ids of games to track',
+        help="Fully qualified ids of games to track, i.e. 2016020776")
+
+    args = parser.parse_args()
+
+    live_parsers = dict()
+    # states of tracked games by game id
+    game_states = dict()
+
+    while True:
+        poll_start = time.time()
+
+        update_game_states(game_states, args.tgt_game_ids)
+
+        # stopping when all games of interest are finished
+        if all(state in FINAL_GAME_STATES for state in game_states.values()):
+            print("+ No more games in progress")
+            break
+
+        for game_id, game_state in game_states.items():
+            if game_state in LIVE_GAME_STATES and game_id not in live_parsers:
+                live_parsers[game_id] = LiveGameParser(game_id)
+
+        live_game_ids = [
+            game_id for game_id in live_parsers if
+            game_states.get(game_id) in LIVE_GAME_STATES]
+
+        # polling all games in progress simultaneously
+        with ThreadPoolExecutor(max_workers=max(len(live_game_ids), 1)) as threads:
+            future_tasks = {
+                threads.submit(
+                    live_parsers[game_id].poll): game_id for
+                game_id in live_game_ids}
+            for future in as_completed(future_tasks):
+                game_id = future_tasks[future]
+                try:
+                    new_events = future.result()
+                    if new_events:
+                        print("+ %d new events in game %d" % (
+                            new_events, game_id))
+                except Exception as e:
+                    print("+ Unable to poll game %d: %s" % (game_id, e))
+
+        time.sleep(max(args.interval - (time.time() - poll_start), 0))
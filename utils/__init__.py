@@ -41,6 +41,16 @@ def retrieve_season(date_of_interest=None):
     return season
 
 
+def get_game_id_range(season, game_type=2):
+    """
+    Returns first and last possible game id for specified season and game
+    type, e.g. regular season or playoffs. Game ids are combinations of
+    season, game type and game number, i.e. 2016020776.
+    """
+    first_game_id = season * 1000000 + game_type * 10000
+    return first_game_id, first_game_id + 9999
+
+
 def reverse_num_situation(num_situation):
     """
     Returns opposing numerical situation for specified one.
@@ -61,7 +71,19 @@ def adjust_html_response(response):
     """
     # converting to document tree
     doc = html.document_fromstring(response.text)
+    # applying modifications to document tree
+    adjust_html_document(doc, response.headers.get('Last-Modified'))
 
+    # returning document tree dumped as string
+    return etree.tostring(doc, method='html')
+
+
+def adjust_html_document(doc, last_modified=None):
+    """
+    Applies modifications to the specified (already parsed) html document
+    tree in place, i.e. removes scripts and adds the specified timestamp of
+    last modification.
+    """
     # stripping all script elements in order to remove javascripts
     etree.strip_elements(doc, "script")
     # stripping arbitraty xmlfile tag
@@ -69,14 +91,33 @@ def adjust_html_response(response):
 
     # creating element to hold timestamp of last modification
     last_modified_element = etree.Element('p', id='last_modified')
-    last_modified_element.text = response.headers.get('Last-Modified')
+    last_modified_element.text = last_modified
 
     # adding timestamp to document tree
     body = doc.xpath("body").pop(0)
     body.append(last_modified_element)
 
-    # returning document tree dumped as string
-    return etree.tostring(doc, method='html')
+    return doc
+
+
+# ascii whitespace characters, i.e. excluding non-breaking spaces
+WHITESPACE = ' \t\r\n\f'
+
+
+def minify_html_document(doc):
+    """
+    Minifies the specified html document tree in place by removing comments
+    as well as whitespace-only text between elements. Non-breaking spaces
+    are retained as they denote empty (but existing) table cells.
+    """
+    etree.strip_elements(doc, etree.Comment, with_tail=False)
+    for element in doc.iter():
+        if element.text is not None and not element.text.strip(WHITESPACE):
+            element.text = None
+        if element.tail is not None and not element.tail.strip(WHITESPACE):
+            element.tail = None
+
+    return doc
 
 
 # unicode function
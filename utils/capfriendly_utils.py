@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import json
 import logging
+import tempfile
 import itertools
+import threading
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
 from lxml import html
 from dateutil.parser import parse
 
@@ -18,6 +23,8 @@ from db.player_data_item import PlayerDataItem
 from utils import remove_non_ascii_chars
 from utils.player_contract_retriever import PlayerContractRetriever
 from utils.player_finder import PlayerFinder
+from utils.player_name_index import get_player_name_index
+from utils import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -26,45 +33,311 @@ CAPFRIENDLY_TEAM_PREFIX = "http://www.capfriendly.com/teams/"
 
 LATEST_SIGNINGS_TEMPLATE_URL = "https://www.capfriendly.com/ajax/signings/?p=%d"
 
+# file to remember failed probes of player pages in
+MISS_CACHE_FILE = os.path.join(
+    tempfile.gettempdir(), 'capfriendly_misses.json')
+# failed probes are repeated after this period of time only
+MISS_TTL = timedelta(days=30)
+# maximum number of concurrent threads probing player pages
+MAX_PROBE_WORKERS = 4
+# number of pages of latest signings to harvest capfriendly ids from
+SIGNING_PAGES = 5
 
-def retrieve_capfriendly_ids(team_id):
+
+class CapfriendlyIdResolver():
     """
-    Retrieves ids from capfriendly.com for all players of the team with
-    the specified id
+    Resolves capfriendly ids for players in the database. Ids are harvested
+    from team roster pages and the latest signings first, only players left
+    unresolved are looked up by probing potential player pages. Failed probes
+    are remembered across runs to avoid requesting the same pages again.
+    If only specified players are to be resolved, only their dates of birth
+    and players already holding one of their potential capfriendly ids are
+    loaded.
     """
-    team = Team.find_by_id(team_id)
 
-    logger.info("+ Retrieving capfriendly ids for all players of the %s" % team)
+    def __init__(self, miss_cache_file=MISS_CACHE_FILE, players=None):
+        self.miss_cache_file = miss_cache_file
+        # players by capfriendly id, initially from database
+        self.players_by_id = dict()
+        # players without capfriendly id by player id
+        self.unresolved = dict()
+        # dates of birth by player id
+        self.dobs = dict()
+        # players along with newly found capfriendly ids by player id
+        self.found = dict()
+        # failed probes by (url) capfriendly id, each consisting of date of
+        # probing and date of birth found on page (if any)
+        self.misses = self.load_misses()
+        self.lock = threading.Lock()
+
+        with session_scope() as session:
+            if players is None:
+                plr_query = session.query(Player)
+                dob_query = session.query(
+                    PlayerDataItem.player_id, PlayerDataItem.date_of_birth)
+            else:
+                # collecting capfriendly ids that may be probed for players
+                potential_capfriendly_ids = set()
+                for plr in players:
+                    self.unresolved[plr.player_id] = plr
+                    potential_capfriendly_ids.update([
+                        pid.replace(" ", "-").replace(".", "").replace(
+                            "'", "") for
+                        pid in collect_potential_capfriendly_ids(plr)])
+                plr_query = session.query(Player).filter(
+                    Player.capfriendly_id.in_(potential_capfriendly_ids))
+                dob_query = session.query(
+                    PlayerDataItem.player_id, PlayerDataItem.date_of_birth
+                ).filter(PlayerDataItem.player_id.in_(
+                    [plr.player_id for plr in players]))
+            for plr in plr_query.all():
+                if plr.capfriendly_id is None:
+                    self.unresolved[plr.player_id] = plr
+                else:
+                    self.players_by_id[plr.capfriendly_id] = plr
+            for player_id, dob in dob_query:
+                self.dobs[player_id] = dob
+
+    def load_misses(self):
+        """
+        Loads failed probes from previous runs that haven't expired yet.
+        """
+        if not self.miss_cache_file or not os.path.isfile(
+                self.miss_cache_file):
+            return dict()
+        try:
+            misses = json.load(open(self.miss_cache_file))
+        except ValueError:
+            return dict()
+        earliest = str(date.today() - MISS_TTL)
+        return {
+            query_id: miss for query_id, miss in misses.items() if
+            miss[0] >= earliest}
+
+    def save_misses(self):
+        """
+        Saves failed probes for subsequent runs.
+        """
+        if not self.miss_cache_file:
+            return
+        with open(self.miss_cache_file, 'w') as miss_cache_file:
+            json.dump(self.misses, miss_cache_file, indent=2)
+
+    def add(self, plr, capfriendly_id):
+        """
+        Registers specified capfriendly id for given player.
+        """
+        with self.lock:
+            if plr.capfriendly_id is None:
+                logger.info("+ Found capfriendly id for %s: %s" % (
+                    plr.name, capfriendly_id))
+            else:
+                logger.info(
+                    "+ Found updated capfriendly id for %s: %s (was %s)" % (
+                        plr.name, capfriendly_id, plr.capfriendly_id))
+            self.found[plr.player_id] = (plr, capfriendly_id)
+            self.players_by_id[capfriendly_id] = plr
+            self.unresolved.pop(plr.player_id, None)
+
+    def harvest_team(self, team):
+        """
+        Harvests capfriendly ids of all players on specified team's roster
+        page.
+        """
+        logger.info(
+            "+ Retrieving capfriendly ids for all players of the %s" % team)
+        for capfriendly_id, first_name, last_name in (
+                retrieve_team_capfriendly_ids(team)):
+            if capfriendly_id in self.players_by_id:
+                continue
+            plr = get_player_name_index().find_by_name_extended(
+                first_name, last_name)
+            if plr is None:
+                logger.info(
+                    "+ No (unique) player for capfriendly id: " +
+                    "%s (%s %s)" % (capfriendly_id, first_name, last_name))
+                continue
+            self.add(plr, capfriendly_id)
+
+    def harvest_signings(self, pages=SIGNING_PAGES):
+        """
+        Harvests capfriendly ids of players listed in the specified number of
+        pages of latest signings.
+        """
+        name_index = get_player_name_index()
+        for page in range(1, pages + 1):
+            for signee, capfriendly_id, _, positions in (
+                    retrieve_signings_page(page)):
+                if capfriendly_id in self.players_by_id:
+                    continue
+                plr = None
+                for pos in positions:
+                    plr = name_index.find_by_full_name(signee, pos)
+                    if plr:
+                        break
+                if plr is not None:
+                    self.add(plr, capfriendly_id)
+
+    def probe(self, plr):
+        """
+        Finds capfriendly id for specified player by probing pages for all
+        potential capfriendly ids, skipping those known to belong to another
+        player or to not exist at all.
+        """
+        dob = self.dobs.get(plr.player_id)
+        if dob is None:
+            return
+
+        for potential_capfriendly_id in collect_potential_capfriendly_ids(
+                plr):
+            # creating actual capfriendly id used in url query
+            query_id = potential_capfriendly_id.replace(" ", "-")
+            capfriendly_id = query_id.replace(".", "").replace("'", "")
+            miss = self.misses.get(query_id)
+            if miss is not None and miss[1] != str(dob):
+                continue
+            if capfriendly_id in self.players_by_id:
+                continue
+
+            page_header, page_dob = retrieve_player_page_data(query_id)
+
+            # testing actual name (i.e. potential capfriendly id converted to
+            # upper case and stripped of *.* characters) contains page header
+            # (converted to upper) and comparing dates of birth
+            if (
+                page_header is not None and
+                page_header.upper() in potential_capfriendly_id.upper(
+                    ).replace(".", "") and page_dob == dob
+            ):
+                self.add(plr, capfriendly_id)
+                return capfriendly_id
+
+            with self.lock:
+                self.misses[query_id] = (
+                    str(date.today()), str(page_dob) if page_dob else None)
+
+        logger.warn("+ No capfriendly id found for %s" % plr.name)
 
-    url = "".join((CAPFRIENDLY_TEAM_PREFIX, team.team_name.replace(" ", "").lower()))
+    def probe_unresolved(self, player_ids=None, max_workers=MAX_PROBE_WORKERS):
+        """
+        Probes potential player pages for all (or the specified) players
+        still lacking a capfriendly id using a limited number of concurrent
+        threads.
+        """
+        players = [
+            plr for player_id, plr in sorted(self.unresolved.items()) if
+            player_ids is None or player_id in player_ids]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as threads:
+            future_tasks = {
+                threads.submit(self.probe, plr): plr for plr in players}
+            for future in as_completed(future_tasks):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warn(
+                        "+ Unable to probe capfriendly id for %s: %s" % (
+                            future_tasks[future].name, e))
+
+    def store(self):
+        """
+        Stores all newly found capfriendly ids in a single transaction and
+        saves failed probes. Returns number of stored capfriendly ids.
+        """
+        with session_scope() as session:
+            for plr, capfriendly_id in self.found.values():
+                plr.capfriendly_id = capfriendly_id
+                session.merge(plr)
+            session.commit()
+
+        self.save_misses()
+        return len(self.found)
+
+
+def retrieve_team_capfriendly_ids(team):
+    """
+    Retrieves capfriendly ids along with first and last names of all players
+    listed on specified team's page.
+    """
+    url = "".join((
+        CAPFRIENDLY_TEAM_PREFIX, team.team_name.replace(" ", "").lower()))
 
-    r = requests.get(url)
+    r = http_client.get(url)
     doc = html.fromstring(r.text)
 
     player_name_trs = doc.xpath("//table[contains(@class, 'teamProfileRosterSection')]/tbody/tr/td[1]/a/ancestor::tr")
 
+    team_capfriendly_ids = list()
     for tr in player_name_trs:
         player_name = tr.xpath("td/a/text()").pop(0)
         capfriendly_id = tr.xpath("td/a/@href").pop(0).split("/")[-1]
+        last_name, first_name = player_name.split(", ")
+        team_capfriendly_ids.append((capfriendly_id, first_name, last_name))
 
-        # trying to find player by capfriendly id first
-        plr = Player.find_by_capfriendly_id(capfriendly_id)
-        if plr:
-            continue
+    return team_capfriendly_ids
+
+
+def retrieve_signings_page(page):
+    """
+    Retrieves names, capfriendly ids, signing dates and positions of players
+    listed on specified page of latest signings.
+    """
+    url = LATEST_SIGNINGS_TEMPLATE_URL % page
+    r = http_client.get(url)
+    doc = html.fromstring(r.json()['data']['html'])
+
+    # retrieving links to pages of recently signed players
+    recently_signed_player_links = doc.xpath(
+        "tr/td/a[contains(@href, 'players')]/@href")
+    # retrieving names of recently signed players
+    recently_signed_player_names = doc.xpath("tr/td/a[2]/text()")
+    # retrieving positions of recently signed players, multiple positions
+    # are possible, i.e. "RW, C", using only first letter of each position,
+    # i.e. "R" instead of "RW"
+    recently_signed_player_positions = [
+        [p.strip()[0] for p in positions.split(",")] for
+        positions in doc.xpath("tr/td[3]/text()")]
+    # retrieving signing dates of recently signed players
+    recent_signing_dates = [
+        parse(x).date() for x in doc.xpath("tr/td[5]/text()")]
+
+    return list(zip(
+        recently_signed_player_names,
+        [link.split("/")[-1] for link in recently_signed_player_links],
+        recent_signing_dates,
+        recently_signed_player_positions
+    ))
+
+
+def retrieve_player_page_data(query_id):
+    """
+    Retrieves page header, i.e. player name, and date of birth from the
+    capfriendly page with the specified (url) id. Returns nothing if there
+    is no such page.
+    """
+    url = "".join((CAPFRIENDLY_PLAYER_PREFIX, query_id))
+    req = http_client.get(url)
+    doc = html.fromstring(req.text)
+    # retrieving page title (i.e. player name) from capfriendly page
+    page_header = doc.xpath("//h1/text()").pop(0).strip().replace(".", "")
+    # removing non-ascii characters from page title
+    page_header = remove_non_ascii_chars(page_header)
+    if page_header == 'Player not found':
+        return None, None
+    # retrieving player's date of birth from capfriendly page
+    page_dob = doc.xpath(
+        "//span[@class='l pld_l']/ancestor::div/text()")[0].strip()
+    return page_header, parse(page_dob).date()
 
-        last_name, first_name = player_name.split(", ")
-        plr = Player.find_by_name_extended(first_name, last_name)
-        # new capfriendly id
-        if plr and plr.capfriendly_id is None:
-            print("+ Found capfriendly id for %s: %s" % (plr, capfriendly_id))
-            add_capfriendly_id_to_player(plr, capfriendly_id)
-        # updated capfriendly id
-        if plr and plr.capfriendly_id != capfriendly_id:
-            print("+ Found updated capfriendly id for %s: %s (was %s)" % (plr, capfriendly_id, plr.capfriendly_id))
-            add_capfriendly_id_to_player(plr, capfriendly_id)
-        # no unique player found
-        if plr is None:
-            print("+ No (unique) player for capfriendly id: %s (%s %s)" % (capfriendly_id, first_name, last_name))
+
+def retrieve_capfriendly_ids(team_id):
+    """
+    Retrieves ids from capfriendly.com for all players of the team with
+    the specified id
+    """
+    resolver = CapfriendlyIdResolver()
+    resolver.harvest_team(Team.find_by_id(team_id))
+    resolver.store()
 
 
 def retrieve_capfriendly_id(player_id):
@@ -73,7 +346,6 @@ def retrieve_capfriendly_id(player_id):
     specified id.
     """
     plr = Player.find_by_id(player_id)
-    pdi = PlayerDataItem.find_by_player_id(player_id)
 
     if plr.capfriendly_id is not None:
         logger.info(
@@ -81,49 +353,11 @@ def retrieve_capfriendly_id(player_id):
                 plr.name, plr.capfriendly_id))
         return plr.capfriendly_id
 
-    # compiling all potential capfriendly ids from the player's name(s)
-    potential_capfriendly_ids = collect_potential_capfriendly_ids(plr)
-    capfriendly_id_found = False
-
-    while potential_capfriendly_ids and not capfriendly_id_found:
-        potential_capfriendly_id = potential_capfriendly_ids.pop(0)
-        # creating actual capfriendly id used in url query
-        query_id = potential_capfriendly_id.replace(" ", "-")
-        url = "".join((CAPFRIENDLY_PLAYER_PREFIX, query_id))
-        req = requests.get(url)
-        doc = html.fromstring(req.text)
-        # retrieving page title (i.e. player name) from capfriendly page
-        page_header = doc.xpath("//h1/text()").pop(0).strip().replace(".", "")
-        # removing non-ascii characters from page title
-        page_header = remove_non_ascii_chars(page_header)
-        if page_header == 'Player not found':
-            continue
-        # retrieving player's date of birth from capfriendly page
-        page_dob = doc.xpath(
-            "//span[@class='l pld_l']/ancestor::div/text()")[0].strip()
-        page_dob = parse(page_dob).date()
-
-        # testing actual name (i.e. potential capfriendly id converted to
-        # upper case and stripped of *.* characters) contains page header
-        # (converted to upper)
-        if page_header.upper() in potential_capfriendly_id.upper().replace(
-                ".", ""):
-            # comparing date of births
-            if page_dob == pdi.date_of_birth:
-                capfriendly_id_found = True
-                # removing dots from id used in query to create
-                # actual capfriendly id
-                found_capfriendly_id = query_id.replace(
-                    ".", "").replace("'", "")
-                logger.info(
-                    "+ Found capfriendly id for %s: %s" % (
-                        plr.name, found_capfriendly_id))
-                add_capfriendly_id_to_player(plr, found_capfriendly_id)
-
-    if not capfriendly_id_found:
-        logger.warn("+ No capfriendly id found for %s" % plr.name)
+    resolver = CapfriendlyIdResolver(players=[plr])
+    capfriendly_id = resolver.probe(plr)
+    resolver.store()
 
-    return plr.capfriendly_id
+    return capfriendly_id
 
 
 def collect_potential_capfriendly_ids(plr):
@@ -178,42 +412,19 @@ def retrieve_latest_signings(max_existing_contracts_found=5):
 
     # TODO: reduce complexity and length of this function
     while existing_contracts_found < max_existing_contracts_found:
-        url = LATEST_SIGNINGS_TEMPLATE_URL % page
-        r = requests.get(url)
-        doc = html.fromstring(r.json()['data']['html'])
-
-        # retrieving links to pages of recently signed players
-        recently_signed_player_links = doc.xpath(
-            "tr/td/a[contains(@href, 'players')]/@href")
-        # retrieving names of recently signed players
-        recently_signed_player_names = doc.xpath("tr/td/a[2]/text()")
-        # retrieving positions of recently signed players
-        recently_signed_player_positions = doc.xpath("tr/td[3]/text()")
-        # retrieving signing dates of recently signed players
-        recent_signing_dates = [
-            parse(x).date() for x in doc.xpath("tr/td[5]/text()")]
-        recent_signings = zip(
-            recently_signed_player_names,
-            recently_signed_player_links,
-            recent_signing_dates,
-            recently_signed_player_positions
-        )
+        recent_signings = retrieve_signings_page(page)
 
         pcr = PlayerContractRetriever()
+        name_index = get_player_name_index()
 
-        for signee, link, signing_date, positions in recent_signings:
-            # retrieving capfriendly id and subsequentially corresponding
-            # player
-            capfriendly_id = link.split("/")[-1]
+        for signee, capfriendly_id, signing_date, positions in (
+                recent_signings):
+            # retrieving player corresponding to capfriendly id
             plr = Player.find_by_capfriendly_id(capfriendly_id)
 
             if plr is None:
-                # multiple positions are possible, i.e. "RW, C"
-                # stripping and using only first letter of position, i.e. "R"
-                # instead of "RW"
-                positions = [p.strip()[0] for p in positions.split(",")]
                 for pos in positions:
-                    plr = Player.find_by_full_name(signee, pos)
+                    plr = name_index.find_by_full_name(signee, pos)
                     if plr:
                         break
 
@@ -225,7 +436,8 @@ def retrieve_latest_signings(max_existing_contracts_found=5):
                 name_tokens = signee.split()
                 if len(name_tokens) == 2:
                     first_name, last_name = name_tokens
-                    plr = Player.find_by_name_extended(first_name, last_name)
+                    plr = name_index.find_by_name_extended(
+                        first_name, last_name)
 
             if plr is None:
                 print(
@@ -8,6 +8,9 @@ import logging
 import tempfile
 from zipfile import ZipFile, ZIP_DEFLATED
 
+from utils import json_storage
+from utils.season_archive import SeasonArchive
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +23,9 @@ class DataHandler():
         if os.path.isdir(dir_or_zip):
             self.dir = dir_or_zip
             self.src_type = 'dir'
+        elif dir_or_zip.endswith(SeasonArchive.SUFFIX):
+            self.archive = SeasonArchive(dir_or_zip)
+            self.src_type = 'archive'
         elif os.path.isfile(dir_or_zip):
             self.zip = ZipFile(dir_or_zip, 'r', compression=ZIP_DEFLATED)
             self.src_type = 'zip'
@@ -56,7 +62,7 @@ class DataHandler():
 
         game_data = dict()
 
-        for item in self._get_contents():
+        for item in self._get_contents(game_id=game_id):
             # checking item for game id
             if item.find(game_id) != -1:
                 # checking item for data prefix
@@ -66,19 +72,32 @@ class DataHandler():
                     # a zipped file or
                     if self.src_type == 'zip':
                         game_data[abbr] = self._get_game_data_from_zip(item)
+                    # a season archive or
+                    elif self.src_type == 'archive':
+                        game_data[abbr] = self._get_game_data_from_archive(
+                            item, game_id)
                     # a given directory
                     elif self.src_type == 'dir':
                         game_data[abbr] = self._get_game_data_from_dir(item)
         else:
             return game_data
 
-    def _get_contents(self, file_type='HTM'):
+    def _get_contents(self, file_type='HTM', game_id=None):
         """
-        Retrieves all available files from either a zip file or a directory.
+        Retrieves all available files from either a zip file, a season
+        archive or a directory. Contents of season archives may be restricted
+        to the files of the specified game.
         """
         if self.src_type == 'zip':
             return [s for s in self.zip.namelist() if os.path.splitext(
                 s)[-1].lower().endswith(file_type.lower())]
+        elif self.src_type == 'archive':
+            if game_id is not None:
+                names = self.archive.index.get(game_id, dict())
+            else:
+                names = self.archive.namelist()
+            return [s for s in names if os.path.splitext(
+                s)[-1].lower().endswith(file_type.lower())]
         elif self.src_type == 'dir':
             return [s for s in os.listdir(self.dir) if os.path.splitext(
                 s)[-1].lower().endswith(file_type.lower())]
@@ -102,16 +121,47 @@ class DataHandler():
         elif data_type == 'shift_chart':
             file_name_regex = re.compile("%s_sc\.json" % nhl_game_id)
 
-        for item in self._get_contents('.json'):
+        for item in self._get_contents('.json', nhl_game_id):
             if re.search(file_name_regex, item):
                 if self.src_type == 'zip':
                     j_data = self._get_game_data_from_zip(item)
+                elif self.src_type == 'archive':
+                    j_data = self._get_game_data_from_archive(
+                        item, nhl_game_id)
                 elif self.src_type == 'dir':
                     j_data = self._get_game_data_from_dir(item)
                 break
 
         return j_data
 
+    def read_game_json_data(self, nhl_game_id, data_type='game_feed'):
+        """
+        Reads and decodes JSON game feed or shift chart data for specified
+        game id directly from data directory/zip file, i.e. without creating
+        a temporary file.
+        """
+        if self.game_ids and nhl_game_id not in self.game_ids:
+            logger.error("Game id {0} not found in contents of {1}".format(
+                nhl_game_id, self.src))
+            return None
+
+        if data_type == 'game_feed':
+            file_name = "%s.json" % nhl_game_id
+        elif data_type == 'shift_chart':
+            file_name = "%s_sc.json" % nhl_game_id
+
+        for item in self._get_contents('.json', nhl_game_id):
+            if os.path.basename(item) != file_name:
+                continue
+            if self.src_type == 'zip':
+                return json_storage.loads(self.zip.read(item))
+            elif self.src_type == 'archive':
+                return json_storage.loads(
+                    self.archive.read(item, nhl_game_id))
+            elif self.src_type == 'dir':
+                return json_storage.load_json_file(
+                    self._get_game_data_from_dir(item))
+
     def _get_game_data_from_zip(self, item):
         """
         Gets a game data item from a zip file.
@@ -124,6 +174,17 @@ class DataHandler():
         self.tmp_files.add(tmp_name)
         return tmp_name
 
+    def _get_game_data_from_archive(self, item, game_id):
+        """
+        Gets a game data item from a season archive.
+        """
+        # creating temporary file and returning location
+        fd, tmp_name = tempfile.mkstemp('.nhl')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(self.archive.read(item, game_id))
+        self.tmp_files.add(tmp_name)
+        return tmp_name
+
     def _get_game_data_from_dir(self, item):
         """
         Gets a game data item from a directory.
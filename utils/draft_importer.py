@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Import of complete NHL entry drafts. All picks of a draft year are retrieved
+in a single document and resolved to players in the database using an
+in-memory index of player names and dates of birth.
+"""
+import logging
+from collections import defaultdict
+
+from dateutil.parser import parse
+
+from db import upsert_db_items
+from db.common import session_scope
+from db.team import Team
+from db.player_data_item import PlayerDataItem
+from db.player_draft import PlayerDraft
+from utils import http_client
+from utils.player_name_index import PlayerNameIndex, fold_name
+
+logger = logging.getLogger(__name__)
+
+# all picks of a single draft year
+DRAFT_URL_TEMPLATE = (
+    "https://records.nhl.com/site/api/draft?cayenneExp=draftYear=%d")
+# year of first NHL entry draft
+FIRST_DRAFT_YEAR = 1963
+
+
+class DraftImporter():
+
+    def __init__(self):
+        # player name index, dates of birth by player id and player ids by
+        # date of birth, all built on first usage
+        self.name_index = None
+        self.dobs = None
+        self.by_dob = None
+        # teams by id and abbreviation
+        self.teams = dict()
+
+    def build_index(self):
+        """
+        Builds in-memory indexes of all players by name and date of birth
+        using one query each.
+        """
+        self.name_index = PlayerNameIndex()
+        self.dobs = dict()
+        self.by_dob = defaultdict(set)
+        with session_scope() as session:
+            for player_id, dob in session.query(
+                    PlayerDataItem.player_id, PlayerDataItem.date_of_birth):
+                if dob is not None:
+                    self.dobs[player_id] = dob
+                    self.by_dob[dob].add(player_id)
+
+    def import_draft_year(self, draft_year):
+        """
+        Imports all picks of specified draft year. Returns numbers of created
+        and updated draft items as well as the picks that couldn't be
+        resolved to a player in the database.
+        """
+        raw_picks = self.retrieve_draft_year(draft_year)
+        if not raw_picks:
+            return 0, 0, list()
+
+        if self.name_index is None:
+            self.build_index()
+
+        plr_drafts = dict()
+        unresolved = list()
+
+        for raw_pick in raw_picks:
+            plr = self.resolve_player(raw_pick)
+            team = self.get_team(raw_pick)
+            if plr is None or team is None:
+                unresolved.append(raw_pick)
+                continue
+            plr_drafts[plr.player_id] = PlayerDraft(
+                plr.player_id, team.team_id, draft_year,
+                raw_pick['roundNumber'], raw_pick['overallPickNumber'])
+
+        # retrieving existing draft items for the whole draft year at once
+        existing_drafts = {
+            plr_draft.player_id: plr_draft for plr_draft in
+            PlayerDraft.find_by_year(draft_year)}
+
+        created, updated = upsert_db_items(PlayerDraft, [
+            (existing_drafts.get(player_id), plr_draft) for
+            player_id, plr_draft in sorted(plr_drafts.items())])
+
+        logger.info(
+            "+ %d draft picks retrieved for %d: " % (
+                len(raw_picks), draft_year) +
+            "%d created, %d updated, %d unresolved" % (
+                created, updated, len(unresolved)))
+        for raw_pick in unresolved:
+            logger.debug("\t+ Unresolved pick #%d: %s (%s, %s)" % (
+                raw_pick['overallPickNumber'], raw_pick.get('playerName'),
+                raw_pick.get('birthDate'), raw_pick.get('triCode')))
+
+        return created, updated, unresolved
+
+    def retrieve_draft_year(self, draft_year):
+        """
+        Retrieves all picks of specified draft year.
+        """
+        url = DRAFT_URL_TEMPLATE % draft_year
+        try:
+            r = http_client.get(url)
+            r.raise_for_status()
+        except Exception as e:
+            logger.warn(
+                "+ Unable to retrieve draft data for %d: %s" % (draft_year, e))
+            return list()
+
+        return sorted(
+            r.json().get('data', list()),
+            key=lambda raw_pick: raw_pick['overallPickNumber'])
+
+    def resolve_player(self, raw_pick):
+        """
+        Resolves specified draft pick to a player in the database, either by
+        the player id provided or by name and date of birth.
+        """
+        player_id = raw_pick.get('playerId')
+        if player_id in self.name_index.players:
+            return self.name_index.players[player_id]
+
+        first_name = raw_pick.get('firstName', '')
+        last_name = raw_pick.get('lastName', '')
+        dob = raw_pick.get('birthDate')
+        if dob:
+            dob = parse(dob).date()
+        candidates = self.by_dob.get(dob, set()) if dob else set()
+        # players of same name (including alternate names) born on same date
+        plr_ids = self.name_index.by_name.get(
+            (fold_name(first_name), fold_name(last_name)), set()) & candidates
+        # players of same last name born on same date, i.e. to account for
+        # differently spelled first names
+        if not plr_ids:
+            plr_ids = set([
+                plr_id for plr_id in candidates if
+                plr_id in self.name_index.players and fold_name(
+                    self.name_index.players[plr_id].last_name) ==
+                fold_name(last_name)])
+        plr = self.name_index.get_unique_player(plr_ids)
+        if plr is not None:
+            return plr
+
+        # resorting to unique names if date of birth can't be matched, unless
+        # the player found is known to be born on a different date
+        plr = self.name_index.find_by_name_extended(first_name, last_name)
+        if plr is not None and dob and self.dobs.get(
+                plr.player_id, dob) != dob:
+            return
+        return plr
+
+    def get_team(self, raw_pick):
+        """
+        Gets team that made specified draft pick.
+        """
+        key = raw_pick.get('draftedByTeamId') or raw_pick.get('triCode')
+        if key not in self.teams:
+            if isinstance(key, int):
+                self.teams[key] = Team.find_by_id(key)
+            elif key:
+                self.teams[key] = Team.find_by_abbr(key)
+            else:
+                self.teams[key] = None
+        return self.teams[key]
+
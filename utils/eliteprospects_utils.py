@@ -1,40 +1,69 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import tempfile
+from datetime import date
 from urllib.parse import urlparse
 from collections import namedtuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-
-from lxml import html
+from lxml import html, etree
 
 from utils import remove_non_ascii_chars
+from utils.page_cache import PageCache
 
 # base url for eliteprospects.com
 BASE_URL = "https://www.eliteprospects.com"
 # url template for draft overview pages at eliteprospects.com
 DRAFT_URL_TEMPLATE = "draft/nhl-entry-draft/%d"
-# maximum worker count
+# maximum worker count, actual request rate is limited by the http client
 MAX_WORKERS = 8
+# directory for persistently cached eliteprospects pages
+PAGE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'eliteprospects_pages')
+# maximum age (in seconds) of cached draft overview pages for drafts that may
+# still be incomplete, i.e. of the current year
+RECENT_DRAFT_MAX_AGE = 24 * 60 * 60
+# compiled expressions to extract data from eliteprospects pages
+DOB_LINK_XPATH = etree.XPath("//a[contains(@href, '?dob=')]/@href")
+TITLE_XPATH = etree.XPath("//title/text()")
+ALT_NAME_XPATH = etree.XPath(
+    "//div[@class='ep-entity-header__alternative-name']/text()")
+DRAFTED_PLAYER_LINKS_XPATH = etree.XPath(
+    "//table[@data-sort-ajax-container='#drafted-players']//tbody//td" +
+    "[@class='player']//span[@class='txt-blue']/a/@href")
+
+page_cache = None
 # named tuple to contain basic player information
 Player = namedtuple(
     'Player', 'first_name last_name date_of_birth alt_last_name')
 
 
-def retrieve_drafted_players_with_dobs(draft_year):
+def get_page_cache():
+    """
+    Returns cache for eliteprospects pages, sets it up on first usage.
+    """
+    global page_cache
+    if page_cache is None:
+        page_cache = PageCache(PAGE_CACHE_DIR)
+    return page_cache
+
+
+def retrieve_drafted_players_with_dobs(draft_year, refresh=False):
     """
     Retrieves basic player data (first name, last name, date of birth,
-    alternate last name) from all player pages in the specified list.
+    alternate last name) from all player pages in the specified list. Pages
+    are retrieved concurrently using threads and cached persistently, the
+    draft overview page is retrieved again if asked for.
     """
     # retrieving links to pages of all drafted players first
-    player_urls = retrieve_drafted_player_links(draft_year)
+    player_urls = retrieve_drafted_player_links(draft_year, refresh)
     # setting up target list
     players_with_dobs = list()
 
-    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as processes:
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as threads:
         future_tasks = {
-            processes.submit(
+            threads.submit(
                 get_player_with_dob, url): url for url in player_urls[:]}
         for future in as_completed(future_tasks):
             try:
@@ -53,19 +82,21 @@ def get_player_with_dob(url):
     """
     Retrieves single player along with date of birth.
     """
-    req = requests.get(url)
     print("+ Retrieving player information from %s" % url)
-    doc = html.fromstring(req.text)
+    page = get_page_cache().get(url)
+    if page is None:
+        return
+    doc = html.fromstring(page)
 
     # retrieving date of birth
-    dob_url = doc.xpath("//a[contains(@href, '?dob=')]/@href").pop()
+    dob_url = DOB_LINK_XPATH(doc).pop()
     url_comps = urlparse(dob_url)
     for item in url_comps.query.split('&'):
         if 'dob' in item:
             dob = item.split("=")[-1]
 
     # retrieving first and last name
-    title = doc.xpath("//title/text()").pop()
+    title = TITLE_XPATH(doc).pop()
     full_name = title.replace("- Elite Prospects", "").replace(" - Stats, Contract, Salary & More", "").strip()
     first_name, last_name = full_name.split(maxsplit=1)
 
@@ -79,14 +110,20 @@ def get_player_with_dob(url):
         dob, alt_last_name)
 
 
-def retrieve_drafted_player_links(draft_year):
+def retrieve_drafted_player_links(draft_year, refresh=False):
     """
     Retrieves links to player pages for all players drafted in the specified
-    draft year.
+    draft year. Cached overview pages of recent drafts are only used for a
+    limited time as they may have been incomplete at retrieval.
     """
     url = "/".join((BASE_URL, DRAFT_URL_TEMPLATE % draft_year))
-    req = requests.get(url)
-    doc = html.fromstring(req.text)
+    max_age = None
+    if draft_year >= date.today().year:
+        max_age = RECENT_DRAFT_MAX_AGE
+    page = get_page_cache().get(url, refresh, max_age)
+    if page is None:
+        return list()
+    doc = html.fromstring(page)
 
     print(
         "+ Retrieving urls of Eliteprospects profiles " +
@@ -94,9 +131,7 @@ def retrieve_drafted_player_links(draft_year):
 
     # links to player pages are present at the specified position in the
     # main table
-    return doc.xpath(
-        "//table[@data-sort-ajax-container='#drafted-players']//tbody//td" +
-        "[@class='player']//span[@class='txt-blue']/a/@href")
+    return DRAFTED_PLAYER_LINKS_XPATH(doc)
 
 
 def get_alternate_last_name(doc, first_name, last_name):
@@ -105,7 +140,7 @@ def get_alternate_last_name(doc, first_name, last_name):
     and given player's first and last names.
     """
     alt_last_name = ''
-    aka_element = doc.xpath("//div[@class='ep-entity-header__alternative-name']/text()")
+    aka_element = ALT_NAME_XPATH(doc)
     if aka_element:
         aka = aka_element.pop().strip().replace("a.k.a.", "").replace('"', "").strip()
         # retrieving all available alternate names
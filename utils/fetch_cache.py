@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+from urllib.parse import urlencode
+
+from utils import http_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class FetchCache():
+    """
+    Caches responses of HTTP GET requests by url (and query parameters) to
+    make sure that each url is requested only once, even if it is asked for
+    by multiple concurrent threads. Only successful responses are cached.
+    Cached responses optionally expire after a time-to-live (in seconds), the
+    number of cached responses may be limited as well.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # responses by url
+        self.responses = dict()
+        # points in time of retrieval by url
+        self.retrieved = dict()
+        # locks by url to make concurrent requests for the same url wait for
+        # the first one to finish
+        self.locks = dict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(url, params=None):
+        """
+        Gets key to cache response for specified url and query parameters
+        with.
+        """
+        if not params:
+            return url
+        return "?".join((url, urlencode(sorted(params.items()))))
+
+    def get(self, url, params=None, **kwargs):
+        """
+        Returns response for specified url (and query parameters), requests
+        it only if it has not been requested successfully before.
+        """
+        key = self.get_key(url, params)
+        with self.lock:
+            url_lock = self.locks.setdefault(key, threading.Lock())
+
+        with url_lock:
+            response = self.responses.get(key)
+            if response is None or self.is_expired(key):
+                if params:
+                    kwargs['params'] = params
+                response = http_client.get(url, **kwargs)
+                # not caching unsuccessful responses, e.g. due to temporary
+                # server errors or throttling
+                if response.status_code != 200:
+                    return response
+                with self.lock:
+                    self.responses[key] = response
+                    # re-inserting to keep urls ordered by retrieval
+                    self.retrieved.pop(key, None)
+                    self.retrieved[key] = time.monotonic()
+                    self.evict()
+                return response
+            else:
+                logger.debug("+ Using cached response for %s" % url)
+                return response
+
+    def evict(self):
+        """
+        Removes responses retrieved longest ago if the maximum number of
+        cached responses has been exceeded.
+        """
+        if self.max_entries is None:
+            return
+        while len(self.retrieved) > self.max_entries:
+            url = next(iter(self.retrieved))
+            del self.retrieved[url]
+            self.responses.pop(url, None)
+
+    def is_expired(self, url):
+        """
+        Checks whether cached response for specified url has expired.
+        """
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self.retrieved.get(url, 0) > self.ttl
+
+    def discard(self, url, params=None):
+        """
+        Removes cached response for specified url and query parameters (if
+        available).
+        """
+        key = self.get_key(url, params)
+        with self.lock:
+            self.responses.pop(key, None)
+            self.retrieved.pop(key, None)
+            self.locks.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all cached responses.
+        """
+        with self.lock:
+            self.responses.clear()
+            self.retrieved.clear()
+            self.locks.clear()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shared HTTP client applying per-host rate limits, retries with jittered
+exponential backoff (respecting Retry-After headers), connection pooling
+and timeouts to all requests. Rate limits are adapted to throttling by the
+host, i.e. halved on each throttled request and gradually restored on
+successful ones.
+"""
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# rate limits, i.e. requests per second and maximum burst size, by host
+HOST_RATE_LIMITS = {
+    'api-web.nhle.com': (10, 20),
+    'api.nhle.com': (10, 20),
+    'www.nhl.com': (5, 10),
+    'www.capfriendly.com': (1, 2),
+    'www.eliteprospects.com': (2, 4),
+}
+DEFAULT_RATE_LIMIT = (5, 10)
+# connect and read timeouts (in seconds)
+DEFAULT_TIMEOUT = (10, 30)
+# maximum number of retries for a single request
+MAX_RETRIES = 5
+# base and maximum delay between retries (in seconds)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60
+# http status codes that are worth retrying
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# maximum number of pooled connections per host
+POOL_SIZE = 16
+# lowest fraction of the configured rate a throttled host is limited to
+MIN_RATE_FACTOR = 0.05
+# fraction of the configured rate restored after each successful request
+RATE_RECOVERY = 0.05
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+class TokenBucket():
+    """
+    Token bucket limiting the rate of requests to a single host.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        # configured rate that throttled rates are restored to
+        self.max_rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        # point in time before which no tokens are handed out at all
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token from the bucket, waits until one is available if
+        necessary. Returns the time waited (in seconds).
+        """
+        waited = 0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(
+                    self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def block(self, seconds):
+        """
+        Stops handing out tokens for the specified number of seconds, e.g.
+        after the host has signalled that it is throttling requests.
+        """
+        with self.lock:
+            self.blocked_until = max(
+                self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+    def slow_down(self):
+        """
+        Halves the current rate, e.g. after the host has throttled a
+        request. Returns the new rate.
+        """
+        with self.lock:
+            self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FACTOR)
+            return self.rate
+
+    def speed_up(self):
+        """
+        Gradually restores the configured rate after a successful request.
+        """
+        with self.lock:
+            self.rate = min(
+                self.rate + self.max_rate * RATE_RECOVERY, self.max_rate)
+
+
+class HttpClient():
+    """
+    Retrieves data via HTTP using pooled connections, per-host rate limits
+    and retries. Collects metrics on requests, retries and throttling by
+    host.
+    """
+
+    def __init__(
+            self, rate_limits=None, timeout=DEFAULT_TIMEOUT,
+            max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+            backoff_max=BACKOFF_MAX):
+        self.rate_limits = dict(HOST_RATE_LIMITS)
+        if rate_limits is not None:
+            self.rate_limits.update(rate_limits)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.buckets = dict()
+        self.metrics = defaultdict(lambda: defaultdict(float))
+        self.lock = threading.Lock()
+
+    def get_bucket(self, host):
+        """
+        Gets token bucket for specified host.
+        """
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(
+                    *self.rate_limits.get(host, DEFAULT_RATE_LIMIT))
+            return self.buckets[host]
+
+    def count(self, host, metric, value=1):
+        """
+        Increases specified metric for given host.
+        """
+        with self.lock:
+            self.metrics[host][metric] += value
+
+    def get_retry_delay(self, attempt, response=None):
+        """
+        Gets delay before next retry, either as specified by the response's
+        Retry-After header or by jittered exponential backoff.
+        """
+        if response is not None and 'Retry-After' in response.headers:
+            retry_after = response.headers['Retry-After']
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return min(max((
+                    retry_at - datetime.now(timezone.utc)
+                ).total_seconds(), 0), self.backoff_max)
+            except (TypeError, ValueError):
+                pass
+
+        delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+        return delay * random.uniform(0.5, 1.5)
+
+    def get(self, url, **kwargs):
+        """
+        Retrieves specified url, retries on connection errors, timeouts and
+        server errors or throttling. Returns the last response received or
+        raises the last exception encountered if all attempts failed.
+        """
+        host = urlsplit(url).netloc
+        bucket = self.get_bucket(host)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            if waited:
+                self.count(host, 'rate_limit_wait', waited)
+            self.count(host, 'requests')
+
+            response = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout
+            ) as e:
+                self.count(host, 'errors')
+                if attempt == self.max_retries:
+                    logger.warning(
+                        "+ Giving up on %s after %d attempts: %s" % (
+                            url, attempt + 1, e))
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    bucket.speed_up()
+                    return response
+                if response.status_code == 429:
+                    self.count(host, 'throttled')
+                if attempt == self.max_retries:
+                    logger.warning(
+                        "+ Giving up on %s after %d attempts: %d" % (
+                            url, attempt + 1, response.status_code))
+                    return response
+
+            delay = self.get_retry_delay(attempt, response)
+            if response is not None:
+                # throttling applies to all requests to the same host
+                if response.status_code == 429:
+                    bucket.block(delay)
+                    logger.debug("+ Limiting requests to %s to %.2f/s" % (
+                        host, bucket.slow_down()))
+                # releasing connection of discarded (streamed) response
+                response.close()
+            self.count(host, 'retries')
+            self.count(host, 'backoff_wait', delay)
+            logger.debug("+ Retrying %s in %.1f seconds" % (url, delay))
+            time.sleep(delay)
+
+    def get_metrics(self):
+        """
+        Returns copy of collected metrics by host.
+        """
+        with self.lock:
+            return {host: dict(m) for host, m in self.metrics.items()}
+
+    def log_metrics(self):
+        """
+        Logs collected metrics by host.
+        """
+        for host, m in sorted(self.get_metrics().items()):
+            logger.info(
+                "+ %s: %d requests, %d retries, %d throttled, " % (
+                    host, m.get('requests', 0), m.get('retries', 0),
+                    m.get('throttled', 0)) +
+                "%.1f s waited for rate limit, %.1f s backed off" % (
+                    m.get('rate_limit_wait', 0), m.get('backoff_wait', 0)))
+
+
+def get_http_client():
+    """
+    Returns HTTP client shared throughout the current process.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
+
+
+def get(url, **kwargs):
+    """
+    Retrieves specified url using the shared HTTP client.
+    """
+    return get_http_client().get(url, **kwargs)
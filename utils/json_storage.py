@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Storage of downloaded JSON data as raw, i.e. compact, response bytes that are
+optionally compressed using zstd. Readers recognize compressed data by its
+magic number, hence file names remain unchanged and stored data of both kinds
+may be mixed freely.
+"""
+import json
+import hashlib
+
+# zstd compression and fast JSON decoding are used if available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# magic number at the beginning of each zstd frame
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# zstd compression level
+ZSTD_LEVEL = 10
+# size of chunks when streaming responses
+CHUNK_SIZE = 64 * 1024
+
+
+def compression_available():
+    """
+    Checks whether zstd compression is available.
+    """
+    return zstandard is not None
+
+
+def read_response(response):
+    """
+    Reads raw bytes from specified (streamed) response while calculating
+    their MD5 hash. Returns raw bytes and hash.
+    """
+    data_hash = hashlib.md5()
+    chunks = list()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        data_hash.update(chunk)
+        chunks.append(chunk)
+
+    return b"".join(chunks), data_hash.hexdigest()
+
+
+def compress(raw_data):
+    """
+    Compresses specified raw bytes if zstd is available, returns them
+    unaltered otherwise.
+    """
+    if zstandard is None:
+        return raw_data
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw_data)
+
+
+def decompress(data):
+    """
+    Decompresses specified bytes if they represent zstd-compressed data.
+    """
+    if not data.startswith(ZSTD_MAGIC):
+        return data
+    if zstandard is None:
+        raise RuntimeError(
+            "Unable to read zstd-compressed data without zstandard package")
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def loads(data):
+    """
+    Decodes JSON data from specified (possibly compressed) bytes or string.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    data = decompress(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_json_file(path):
+    """
+    Reads JSON data from file at specified location, regardless of whether
+    it has been stored pretty-printed, raw or compressed.
+    """
+    with open(path, 'rb') as json_file:
+        return loads(json_file.read())
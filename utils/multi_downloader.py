@@ -7,8 +7,10 @@ locations at once.
 """
 import os
 import time
+import zlib
 import logging
 import tempfile
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
 
@@ -41,6 +43,11 @@ class MultiFileDownloader():
         else:
             self.workers = self.WORKERS
 
+        # crc and size of each file contained by already existing zip files,
+        # indexed by path of zip file and file name
+        self.zip_indexes = dict()
+        self.zip_index_lock = threading.Lock()
+
     def toggle_zipping(self, zip_downloaded_files):
         if zip_downloaded_files is True:
             self.zip_downloaded_files = True
@@ -98,20 +105,60 @@ class MultiFileDownloader():
         """
         raise NotImplementedError
 
+    def get_zip_index(self, zip_path):
+        """
+        Retrieves index of files contained by the zip file specified by its
+        path, i.e. a dictionary with crc and size for each file name. Reads
+        the zip file only once.
+        """
+        with self.zip_index_lock:
+            if zip_path not in self.zip_indexes:
+                zip_index = dict()
+                if zip_path and os.path.isfile(zip_path):
+                    with ZipFile(zip_path) as zip:
+                        for info in zip.infolist():
+                            zip_index[info.filename] = (
+                                info.CRC, info.file_size)
+                self.zip_indexes[zip_path] = zip_index
+            return self.zip_indexes[zip_path]
+
     def check_for_file(self, zip_path, file_name):
         """
         Checks whether the zip file specified by its path contains the given
         file name.
         """
-        if not zip_path or not os.path.isfile(zip_path):
+        if not zip_path:
             return False
 
-        zip = ZipFile(zip_path)
+        return file_name in self.get_zip_index(zip_path)
 
-        if file_name in zip.namelist():
-            return True
-        else:
+    def check_for_identical_file(self, zip_path, file_name, content):
+        """
+        Checks whether the zip file specified by its path contains a file with
+        the given name and exactly the specified content.
+        """
+        if not zip_path:
             return False
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        return self.get_zip_index(zip_path).get(file_name) == (
+            zlib.crc32(content), len(content))
+
+    def register_file(self, zip_path, file_name, content):
+        """
+        Registers file with specified name and content in index of the zip
+        file specified by its path, i.e. after the file has been written to
+        be zipped later on.
+        """
+        if not zip_path:
+            return
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        zip_index = self.get_zip_index(zip_path)
+        with self.zip_index_lock:
+            zip_index[file_name] = (zlib.crc32(content), len(content))
 
     def zip_files(self, zip_name, sub_dir=""):
         """
@@ -212,8 +259,10 @@ class MultiFileDownloader():
             info.compress_type = ZIP_DEFLATED
             # setting name of zipped file
             info.filename = os.path.basename(f)
-            # adding file to new zip file
-            new_zip.writestr(info, open(f).read())
+            # adding file to new zip file, reading it as bytes as stored
+            # data may be compressed
+            with open(f, 'rb') as zipped_file:
+                new_zip.writestr(info, zipped_file.read())
 
         new_zip.close()
 
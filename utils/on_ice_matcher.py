@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Joins in-game events with player shifts to validate the players on ice as
+registered in the play-by-play data. Shift ids and elapsed shift times for
+each event are only determined on demand as they aren't persisted.
+"""
+import heapq
+import logging
+from collections import namedtuple
+from itertools import groupby
+from operator import attrgetter
+
+from sqlalchemy import and_
+
+from utils import get_game_id_range
+from db.common import session_scope
+from db.event import Event
+from db.shift import Shift
+
+logger = logging.getLogger(__name__)
+
+# result of joining a single event with all shifts covering it:
+#   shift_ids ... shift ids of all players on a shift by player id (if
+#                 requested)
+#   shift_elapsed ... time elapsed in each player's shift by player id (if
+#                     requested)
+#   not_on_shift ... players listed on ice in play-by-play data but not on a
+#                    shift at the time of the event
+#   not_on_ice ... players on a shift at the time of the event but not listed
+#                  on ice in play-by-play data
+OnIceMatch = namedtuple('OnIceMatch', [
+    'event_id', 'shift_ids', 'shift_elapsed', 'not_on_shift', 'not_on_ice'])
+
+
+def join_events_with_shifts(events, shifts, enrich=True):
+    """
+    Joins specified events and shifts of a single game by sweeping once over
+    both sorted sequences. A shift covers an event if the event occurred
+    between start and end of the shift (both inclusive). Players changing
+    exactly at the time of an event are never flagged as discrepancies.
+    Shift ids and elapsed shift times are only collected if enrichment is
+    requested.
+    """
+    events = sorted(events, key=attrgetter(
+        'period', 'time', 'in_game_event_cnt'))
+    shifts = sorted(shifts, key=attrgetter('period', 'start', 'end'))
+
+    # shift data is not available for every period, e.g. shootouts
+    periods_with_shifts = set(map(attrgetter('period'), shifts))
+
+    matches = list()
+    # currently active shift by player id
+    active = dict()
+    # active shifts ordered by end of shift to allow for quick expiration,
+    # the shift count breaks ties between shifts ending simultaneously
+    active_by_end = list()
+    shift_idx = 0
+
+    for event in events:
+        event_key = (event.period, event.time)
+
+        # activating all shifts that started at or before the current event
+        while (
+            shift_idx < len(shifts) and
+            (shifts[shift_idx].period, shifts[shift_idx].start) <= event_key
+        ):
+            shift = shifts[shift_idx]
+            active[shift.player_id] = shift
+            heapq.heappush(
+                active_by_end, ((shift.period, shift.end), shift_idx, shift))
+            shift_idx += 1
+
+        # expiring all shifts that ended before the current event
+        while active_by_end and active_by_end[0][0] < event_key:
+            _, _, shift = heapq.heappop(active_by_end)
+            # a later shift of the same player may have replaced this one
+            if active.get(shift.player_id) is shift:
+                del active[shift.player_id]
+
+        shift_ids = shift_elapsed = None
+        if enrich:
+            shift_ids = dict()
+            shift_elapsed = dict()
+            for player_id, shift in active.items():
+                shift_ids[player_id] = shift.shift_id
+                shift_elapsed[player_id] = event.time - shift.start
+
+        not_on_shift = set()
+        not_on_ice = set()
+        on_ice = set(event.home_on_ice or list()).union(
+            event.road_on_ice or list())
+        # comparing only if there is something to compare
+        if on_ice and event.period in periods_with_shifts:
+            not_on_shift = on_ice.difference(active)
+            not_on_ice = set([
+                player_id for player_id, shift in active.items() if
+                shift.start < event.time < shift.end]).difference(on_ice)
+
+        matches.append(OnIceMatch(
+            event.event_id, shift_ids, shift_elapsed,
+            not_on_shift, not_on_ice))
+
+    return matches
+
+
+def check_players_on_ice(game_id, enrich=False):
+    """
+    Validates players on ice for all events of the game with the specified id
+    against the shifts registered for this game. Optionally retrieves shift
+    ids and elapsed shift times for each event.
+    """
+    matches = join_events_with_shifts(
+        Event.find_for_game(game_id), Shift.find_for_game(game_id), enrich)
+    log_discrepancies(game_id, matches)
+
+    return matches
+
+
+def check_players_on_ice_for_season(season, game_type=2, enrich=False):
+    """
+    Validates players on ice for all events of the specified season and game
+    type, e.g. regular season or playoffs. Retrieves all necessary events and
+    shifts with one query each. Optionally retrieves shift ids and elapsed
+    shift times for each event.
+    """
+    first_game_id, last_game_id = get_game_id_range(season, game_type)
+
+    with session_scope() as session:
+        events = session.query(
+            Event.event_id, Event.game_id, Event.in_game_event_cnt,
+            Event.period, Event.time, Event.home_on_ice, Event.road_on_ice
+        ).filter(
+            and_(
+                Event.game_id >= first_game_id,
+                Event.game_id <= last_game_id
+            )
+        ).order_by(Event.game_id).all()
+        shifts = session.query(
+            Shift.shift_id, Shift.game_id, Shift.player_id,
+            Shift.period, Shift.start, Shift.end
+        ).filter(
+            and_(
+                Shift.game_id >= first_game_id,
+                Shift.game_id <= last_game_id
+            )
+        ).order_by(Shift.game_id).all()
+
+    shifts_by_game = {
+        game_id: list(game_shifts) for game_id, game_shifts in groupby(
+            shifts, key=attrgetter('game_id'))}
+
+    matches_by_game = dict()
+
+    for game_id, game_events in groupby(events, key=attrgetter('game_id')):
+        matches = join_events_with_shifts(
+            game_events, shifts_by_game.get(game_id, list()), enrich)
+        log_discrepancies(game_id, matches)
+        matches_by_game[game_id] = matches
+
+    return matches_by_game
+
+
+def log_discrepancies(game_id, matches):
+    """
+    Logs discrepancies between players on ice retrieved from play-by-play data
+    and from shift data.
+    """
+    discrepancies = [m for m in matches if m.not_on_shift or m.not_on_ice]
+
+    for match in discrepancies:
+        logger.debug(
+            "Players on ice for event %d not matching shifts " % (
+                match.event_id) +
+            "(not on shift: %s, not on ice: %s)" % (
+                sorted(match.not_on_shift), sorted(match.not_on_ice)))
+
+    if discrepancies:
+        logger.warning(
+            "Players on ice not matching shifts for " +
+            "%d of %d events in game %d" % (
+                len(discrepancies), len(matches), game_id))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache of retrieved web pages keyed by url. Pages are stored as
+compressed files in a cache directory, hence they remain available across
+runs and allow for repeated (offline) processing without further requests.
+"""
+import os
+import time
+import gzip
+import hashlib
+import logging
+import tempfile
+
+from utils import http_client
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache():
+
+    SUFFIX = '.html.gz'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_path(self, url):
+        """
+        Gets path of cache file for specified url.
+        """
+        return os.path.join(
+            self.cache_dir,
+            hashlib.sha1(url.encode('utf-8')).hexdigest() + self.SUFFIX)
+
+    def get(self, url, refresh=False, max_age=None):
+        """
+        Returns text of page at specified url, retrieves it only if it hasn't
+        been cached yet, if the cached page is older than the specified
+        maximum age (in seconds) or if explicitly asked for. Returns nothing
+        if the page can't be retrieved.
+        """
+        path = self.get_path(url)
+        if not refresh and os.path.isfile(path) and (
+            max_age is None or
+            time.time() - os.path.getmtime(path) <= max_age
+        ):
+            logger.debug("+ Using cached page for %s" % url)
+            with gzip.open(path, 'rt', encoding='utf-8') as cached_page:
+                return cached_page.read()
+
+        r = http_client.get(url)
+        if r.status_code != 200:
+            logger.warning(
+                "+ Unable to retrieve %s: %d" % (url, r.status_code))
+            return
+
+        # writing to temporary file first to never leave incomplete cache
+        # files behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with gzip.open(os.fdopen(fd, 'wb'), 'wt', encoding='utf-8') as tmp:
+            tmp.write(r.text)
+        os.replace(tmp_path, path)
+
+        return r.text
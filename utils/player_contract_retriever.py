@@ -4,11 +4,9 @@
 import logging
 import re
 
-import requests
 from dateutil import parser
 from lxml import html
 
-# from db import create_or_update_db_item
 from db.common import session_scope
 from db.player import Player
 from db.team import Team
@@ -16,6 +14,7 @@ from db.contract import Contract
 from db.contract_year import ContractYear
 from db.buyout import Buyout
 from db.buyout_year import BuyoutYear
+from utils import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +34,21 @@ class PlayerContractRetriever():
     def retrieve_player_contracts(self, player_id):
         """
         Retrieves comprehensive contract information for player with specified
-        id, including buyouts and historical salary data.
+        id, including buyouts and historical salary data. All items are
+        stored in a single transaction.
+        """
+        contract_graph = self.create_contract_graph(player_id)
+        if contract_graph is None:
+            return
+
+        return self.store_contract_graphs({player_id: contract_graph})
+
+    def create_contract_graph(self, player_id):
+        """
+        Creates (yet unsaved) contract, contract year, buyout and buyout year
+        items for player with specified id from a single retrieval of the
+        player's page. Returns contracts, each along with its contract years,
+        buyout and buyout years, and historical salary years.
         """
         plr = Player.find_by_id(player_id)
 
@@ -45,81 +58,192 @@ class PlayerContractRetriever():
 
         logger.info("+ Retrieving player contracts for %s" % plr.name)
 
+        doc = self.retrieve_player_page(plr)
+        if doc is None:
+            return
+
         # retrieving raw, i.e. list of dictionaries, contract and historical
         # salary information
-        plr_contract_list = self.retrieve_raw_contract_data(player_id)
-        historical_salaries = self.retrieve_raw_historical_salary_data(player_id)
+        plr_contract_list = self.retrieve_raw_contract_data(player_id, doc)
+        historical_salaries = self.retrieve_raw_historical_salary_data(
+            player_id, doc)
+
+        contract_graph = {'contracts': list(), 'historical': list()}
+        buyout_dict = None
 
-        # creating or updating contract database item
         for plr_contract_dict in plr_contract_list:
             contract = Contract(player_id, plr_contract_dict)
-            contract_db = Contract.find_with_team(
-                player_id, plr_contract_dict['start_season'], plr_contract_dict['signing_team_id'])
-
-            contract_db = self.create_or_update_database_item(contract, contract_db)
 
-            # creating/retrieving buyout item in/from database (if applicable
-            # to current contract)
-            if contract_db.bought_out:
-                buyout = self.retrieve_buyout(player_id, contract_db)
-            else:
-                buyout = None
-
-            # creating or updating contract years in database
+            # setting up buyout item (if applicable to current contract)
+            buyout = None
+            buyout_years = list()
+            if contract.bought_out:
+                # buyout history is retrieved only once per player
+                if buyout_dict is None:
+                    buyout_dict = self.retrieve_raw_buyout_data(
+                        player_id, doc)
+                buyout = Buyout(player_id, contract.contract_id, buyout_dict)
+                for buyout_year_data_dict in buyout_dict['buyout_years']:
+                    buyout_years.append(BuyoutYear(
+                        player_id, buyout.buyout_id, buyout_year_data_dict))
+
+            contract_years = list()
             for contract_year_dict in plr_contract_dict['contract_years']:
                 # adding buyout flag to contract year if buyout happened in
                 # this or prior seasons
                 if buyout:
                     if contract_year_dict['season'] >= buyout.start_season:
                         contract_year_dict['bought_out'] = True
-                contract_year = ContractYear(player_id, contract_db.contract_id, contract_year_dict)
-                contract_year_db = ContractYear.find(player_id, contract_db.contract_id, contract_year_dict['season'])
-                self.create_or_update_database_item(contract_year, contract_year_db)
+                contract_years.append(ContractYear(
+                    player_id, contract.contract_id, contract_year_dict))
+
+            contract_graph['contracts'].append(
+                (contract, contract_years, buyout, buyout_years))
 
-        # creating or updating historical salary data in database
+        # setting up historical salary data, i.e. contract years without
+        # contract
         for hist_salary_year in historical_salaries:
-            contract_year = ContractYear(player_id, None, hist_salary_year)
-            contract_year_db = ContractYear.find(
-                player_id, None, hist_salary_year['season'])
-            self.create_or_update_database_item(
-                contract_year, contract_year_db)
-
-    def retrieve_buyout(self, player_id, contract):
-        """
-        Retrieves buyout information for specified player and contract.
-        """
-        # retrieving raw buyout data
-        buyout_dict = self.retrieve_raw_buyout_data(player_id)
-        # setting up buyout item
-        buyout = Buyout(player_id, contract.contract_id, buyout_dict)
-        # finding suitable buyout in database
-        buyout_db = Buyout.find(contract.contract_id)
-        # creating (or updating) buyout in database
-        buyout_db = self.create_or_update_database_item(buyout, buyout_db)
-        # adding buyout years to buyout
-        for buyout_year_data_dict in buyout_dict['buyout_years']:
-            # setting up buyout year item
-            buyout_year = BuyoutYear(
-                player_id, buyout_db.buyout_id, buyout_year_data_dict)
-            # finding suitable buyout year in database
-            buyout_year_db = BuyoutYear.find(
-                buyout_db.buyout_id, buyout_year_data_dict['season'])
-            # creating or updating buyout year
-            buyout_year_db = self.create_or_update_database_item(
-                buyout_year, buyout_year_db)
-        return buyout_db
-
-    def retrieve_raw_contract_data_by_capfriendly_id(self, capfriendly_id):
+            contract_graph['historical'].append(
+                ContractYear(player_id, None, hist_salary_year))
+
+        return contract_graph
+
+    def store_contract_graphs(self, contract_graphs):
+        """
+        Stores specified contract graphs by player id. Existing items of all
+        concerned players are retrieved at once, each player's changes are
+        applied within a single transaction. Returns numbers of created and
+        updated items.
+        """
+        existing_items = self.find_existing_items(list(contract_graphs.keys()))
+        created = updated = 0
+
+        with session_scope() as session:
+            for player_id in sorted(contract_graphs):
+                plr_created = plr_updated = 0
+                try:
+                    # adding items level by level, i.e. contracts before
+                    # buyouts before contract and buyout years
+                    for pairs in self.diff_contract_graph(
+                            contract_graphs[player_id], existing_items):
+                        for db_item, new_item in pairs:
+                            if db_item is None:
+                                session.add(new_item)
+                                plr_created += 1
+                            elif db_item != new_item:
+                                db_item.update(new_item)
+                                session.merge(db_item)
+                                plr_updated += 1
+                        session.flush()
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    logger.warn(
+                        "+ Unable to store contracts for player_id " +
+                        "%d: %s" % (player_id, e))
+                    continue
+                created += plr_created
+                updated += plr_updated
+
+        logger.info("\t+ %d contract items added, %d updated" % (
+            created, updated))
+
+        return created, updated
+
+    def find_existing_items(self, player_ids):
+        """
+        Finds existing contracts, contract years, buyouts and buyout years of
+        specified players, keyed by the attributes identifying them.
+        """
+        existing_items = dict()
+        with session_scope() as session:
+            existing_items[Contract] = {
+                (ct.player_id, ct.start_season, ct.signing_team_id): ct for
+                ct in session.query(Contract).filter(
+                    Contract.player_id.in_(player_ids))}
+            existing_items[ContractYear] = {
+                (cty.player_id, cty.contract_id, cty.season): cty for
+                cty in session.query(ContractYear).filter(
+                    ContractYear.player_id.in_(player_ids))}
+            existing_items[Buyout] = {
+                bo.contract_id: bo for bo in session.query(Buyout).filter(
+                    Buyout.player_id.in_(player_ids))}
+            existing_items[BuyoutYear] = {
+                (boy.buyout_id, boy.season): boy for
+                boy in session.query(BuyoutYear).filter(
+                    BuyoutYear.player_id.in_(player_ids))}
+        return existing_items
+
+    def diff_contract_graph(self, contract_graph, existing_items):
+        """
+        Matches items of specified contract graph with existing ones. New
+        items adopt the ids of their existing counterparts to keep references
+        intact. Returns lists of pairs of existing (or None) and new items by
+        level of dependency.
+        """
+        contract_pairs = list()
+        buyout_pairs = list()
+        year_pairs = list()
+
+        for contract, contract_years, buyout, buyout_years in (
+                contract_graph['contracts']):
+            contract_db = existing_items[Contract].get((
+                contract.player_id, contract.start_season,
+                contract.signing_team_id))
+            if contract_db is not None:
+                contract.contract_id = contract_db.contract_id
+            contract_pairs.append((contract_db, contract))
+
+            if buyout is not None:
+                buyout.contract_id = contract.contract_id
+                buyout_db = existing_items[Buyout].get(contract.contract_id)
+                if buyout_db is not None:
+                    buyout.buyout_id = buyout_db.buyout_id
+                buyout_pairs.append((buyout_db, buyout))
+                for buyout_year in buyout_years:
+                    buyout_year.buyout_id = buyout.buyout_id
+                    year_pairs.append((existing_items[BuyoutYear].get(
+                        (buyout.buyout_id, buyout_year.season)), buyout_year))
+
+            for contract_year in contract_years:
+                contract_year.contract_id = contract.contract_id
+                year_pairs.append((existing_items[ContractYear].get((
+                    contract_year.player_id, contract.contract_id,
+                    contract_year.season)), contract_year))
+
+        for contract_year in contract_graph['historical']:
+            year_pairs.append((existing_items[ContractYear].get((
+                contract_year.player_id, None, contract_year.season)),
+                contract_year))
+
+        return contract_pairs, buyout_pairs, year_pairs
+
+    def retrieve_player_page(self, plr):
+        """
+        Retrieves capfriendly page of specified player as html document.
+        """
+        if plr.capfriendly_id is None:
+            logger.warn("+ Unable to retrieve contract data for %s" % plr.name)
+            return
+
+        url = "".join((self.CAPFRIENDLY_PLAYER_PREFIX, plr.capfriendly_id))
+        r = http_client.get(url)
+        return html.fromstring(r.text)
+
+    def retrieve_raw_contract_data_by_capfriendly_id(
+            self, capfriendly_id, doc=None):
         """
         Retrieves raw contract information for player with specified
-        capfriendly id as a list of dictionary objects.
+        capfriendly id as a list of dictionary objects, optionally from the
+        previously retrieved player page.
         """
         # setting up list of contracts for current player
         contract_list = list()
 
-        url = "".join((self.CAPFRIENDLY_PLAYER_PREFIX, capfriendly_id))
-        r = requests.get(url)
-        doc = html.fromstring(r.text)
+        if doc is None:
+            url = "".join((self.CAPFRIENDLY_PLAYER_PREFIX, capfriendly_id))
+            r = http_client.get(url)
+            doc = html.fromstring(r.text)
 
         contract_elements = doc.xpath("//div[@class='cf_playerContract']")
 
@@ -193,7 +317,7 @@ class PlayerContractRetriever():
             elif raw_data.startswith('Expiry Status'):
                 contract_dict['expiry_status'] = re.search(self.EXPIRY_STATUS_REGEX, raw_data).group(0).upper()
 
-    def retrieve_raw_contract_data(self, player_id):
+    def retrieve_raw_contract_data(self, player_id, doc=None):
         """
         Retrieves raw contract information for player with specified database
         id as a list of dictionary objects.
@@ -204,9 +328,9 @@ class PlayerContractRetriever():
             return list()
 
         return self.retrieve_raw_contract_data_by_capfriendly_id(
-            plr.capfriendly_id)
+            plr.capfriendly_id, doc)
 
-    def retrieve_raw_historical_salary_data(self, player_id):
+    def retrieve_raw_historical_salary_data(self, player_id, doc=None):
         """
         Retrieves historical salary, i.e. predominantly pre salary cap
         information for player with specified id as a list of dictionary
@@ -222,9 +346,8 @@ class PlayerContractRetriever():
                 "data for %s" % plr.name)
             return historical_salaries
 
-        url = "".join((self.CAPFRIENDLY_PLAYER_PREFIX, plr.capfriendly_id))
-        r = requests.get(url)
-        doc = html.fromstring(r.text)
+        if doc is None:
+            doc = self.retrieve_player_page(plr)
 
         hist_elements = doc.xpath(
             "//div[@class='rel navc column_head3 cntrct']")
@@ -274,7 +397,7 @@ class PlayerContractRetriever():
 
         return seasons, contract_years
 
-    def retrieve_raw_buyout_data(self, player_id):
+    def retrieve_raw_buyout_data(self, player_id, doc=None):
         """
         Retrieves buyout information for player with specified id as a
         dictionary object.
@@ -286,9 +409,8 @@ class PlayerContractRetriever():
             logger.warn("+ Unable to retrieve contract data for %s" % plr.name)
             return buyout_dict
 
-        url = "".join((self.CAPFRIENDLY_PLAYER_PREFIX, plr.capfriendly_id))
-        r = requests.get(url)
-        doc = html.fromstring(r.text)
+        if doc is None:
+            doc = self.retrieve_player_page(plr)
 
         # retrieving raw length, value, team, date and type of buyout
         # TODO: add buyout type to data model
@@ -434,29 +556,3 @@ class PlayerContractRetriever():
         except ValueError:
             logger.warn("+ Unable to parse date from '%s'" % sign_date_info)
             return None
-
-    def create_or_update_database_item(self, new_item, db_item):
-        # TODO: switch to usage of application-wide utility method
-        """
-        Creates or updates a database item.
-        """
-        plr = Player.find_by_id(new_item.player_id)
-        cls_name = new_item.HUMAN_READABLE
-
-        with session_scope() as session:
-            if not db_item or db_item is None:
-                logger.debug(
-                    "\t+ Adding %s item for %s" % (cls_name, plr.name))
-                session.add(new_item)
-                return_item = new_item
-            else:
-                if db_item != new_item:
-                    logger.info(
-                        "\t+ Updating %s item for %s" % (cls_name, plr.name))
-                    db_item.update(new_item)
-                    return_item = session.merge(db_item)
-                else:
-                    return_item = db_item
-            session.commit()
-
-        return return_item
@@ -3,11 +3,10 @@
 
 import logging
 import threading
-import re
 
-import requests
 from dateutil import parser
 
+from db import upsert_db_items
 from db.common import session_scope
 from db.team import Team
 from db.player import Player
@@ -15,28 +14,54 @@ from db.player_season import PlayerSeason
 from db.goalie_season import GoalieSeason
 from db.player_data_item import PlayerDataItem
 from utils import feet_to_m, lbs_to_kg
+from utils.fetch_cache import FetchCache
 
 logger = logging.getLogger(__name__)
 
+# url template for player landing documents containing personal data, draft
+# information and season statistics
+LANDING_URL_TEMPLATE = "https://api-web.nhle.com/v1/player/%s/landing"
+# number of seconds to keep retrieved player landing documents and maximum
+# number of documents kept
+LANDING_TTL = 6 * 60 * 60
+LANDING_CACHE_SIZE = 1000
+
+# cache for player landing documents shared by all retrievers
+landing_cache = FetchCache(ttl=LANDING_TTL, max_entries=LANDING_CACHE_SIZE)
+
+
+def retrieve_landing_data(player_id):
+    """
+    Retrieves (possibly cached) landing document for player with specified
+    id from nhl.com.
+    """
+    url = LANDING_URL_TEMPLATE % str(player_id)
+    r = landing_cache.get(url)
+    if r.status_code != 200:
+        logger.warning(
+            "+ Unable to retrieve landing data for player_id %d: %d" % (
+                player_id, r.status_code))
+        return
+    return r.json()
 
-class PlayerDataRetriever():
 
-    NHL_SITE_PREFIX = "http://statsapi.web.nhl.com/api/v1/people/"
+class PlayerDataRetriever():
 
-    # input player data json keys
+    # input player data json keys (as used in player landing documents)
     JSON_KEY_FIRST_NAME = "firstName"
     JSON_KEY_LAST_NAME = "lastName"
-    JSON_KEY_FULL_NAME = "fullName"
-    JSON_KEY_POSITION = "primaryPosition"
-    JSON_KEY_POSITION_CODE = "code"
-    JSON_KEY_NUMBER = "primaryNumber"
-    JSON_KEY_HEIGHT = "height"
-    JSON_KEY_WEIGHT = "weight"
+    JSON_KEY_POSITION = "position"
+    JSON_KEY_NUMBER = "sweaterNumber"
+    JSON_KEY_HEIGHT = "heightInInches"
+    JSON_KEY_WEIGHT = "weightInPounds"
     JSON_KEY_HAND = "shootsCatches"
     JSON_KEY_DATE_OF_BIRTH = "birthDate"
     JSON_KEY_PLACE_OF_BIRTH_CITY = "birthCity"
     JSON_KEY_PLACE_OF_BIRTH_STATE_PROVINCE = "birthStateProvince"
     JSON_KEY_PLACE_OF_BIRTH_COUNTRY = "birthCountry"
+    JSON_KEY_CURRENT_TEAM = "fullTeamName"
+    # key of default, i.e. English, value of localized json items
+    JSON_KEY_DEFAULT = "default"
 
     # database player data keys
     DB_KEY_FIRST_NAME = "first_name"
@@ -52,22 +77,53 @@ class PlayerDataRetriever():
     DB_KEY_DATE_OF_BIRTH = "date_of_birth"
     DB_KEY_PLACE_OF_BIRTH = "place_of_birth"
 
-    FT_IN_REGEX = re.compile(R"(\d+)'\s(\d+)")
-
     def __init__(self):
         self.lock = threading.Lock()
+        # teams by lower-case name, loaded on first use
+        self.teams_by_name = None
 
-    def retrieve_player_seasons(self, player_id):
+    def get_team_by_name(self, name):
+        """
+        Gets team with specified name from in-memory map of all teams.
+        """
+        with self.lock:
+            if self.teams_by_name is None:
+                self.teams_by_name = Team.find_all_by_name()
+            name = Team.normalize_name(name).lower()
+            if name not in self.teams_by_name:
+                # looking up names unknown so far only once
+                self.teams_by_name[name] = Team.find_by_name(name)
+            return self.teams_by_name[name]
+
+    def retrieve_player_seasons(self, player_id, landing_data=None):
         """
         Retrieves player season statistics for player with specified id.
         """
         plr = Player.find_by_id(player_id)
         logger.info("+ Retrieving player season statistics for %s" % plr.name)
 
+        plr_seasons = self.create_player_seasons(player_id, landing_data)
+
+        self.store_player_seasons(
+            [plr_season for plr_season in plr_seasons if
+             plr_season.season == 2023])
+
+        logger.info(
+            "+ %d season statistics items retrieved for %s" % (
+                len(plr_seasons), plr.name))
+
+        return plr_seasons
+
+    def create_player_seasons(self, player_id, landing_data=None):
+        """
+        Creates (yet unsaved) player or goalie season items for player with
+        specified id, optionally from previously retrieved landing data.
+        """
         plr_seasons = list()
 
         # retrieving raw season data for player_id
-        plr_season_dict = self.retrieve_raw_season_data(player_id)
+        plr_season_dict = self.retrieve_raw_season_data(
+            player_id, landing_data)
 
         if not plr_season_dict:
             return plr_seasons
@@ -84,27 +140,58 @@ class PlayerDataRetriever():
                 plr_season = GoalieSeason(
                     player_id, season, season_type, team,
                     season_team_sequence, season_data)
-                plr_season_db = GoalieSeason.find(
-                    player_id, team, season, season_type, season_team_sequence)
             else:
                 plr_season = PlayerSeason(
                     player_id, season, season_type, team,
                     season_team_sequence, season_data)
-                plr_season_db = PlayerSeason.find(
-                    player_id, team, season, season_type, season_team_sequence)
 
             plr_seasons.append(plr_season)
 
-            if season == 2023:
-                self.create_or_update_database_item(plr_season, plr_season_db)
+        return plr_seasons
 
-        logger.info(
-            "+ %d season statistics items retrieved for %s" % (
-                len(plr_seasons), plr.name))
+    def store_player_seasons(self, plr_seasons):
+        """
+        Creates or updates specified player and goalie season items, usually
+        for a whole batch of players. Existing items of all concerned players
+        are retrieved at once, all changes are written by one multi-row
+        statement per type of season item. Returns numbers of created and
+        updated items.
+        """
+        created = updated = 0
 
-        return plr_seasons
+        for season_cls in [PlayerSeason, GoalieSeason]:
+            new_items = [
+                plr_season for plr_season in plr_seasons if
+                isinstance(plr_season, season_cls)]
+            if not new_items:
+                continue
+
+            # retrieving existing items of all concerned players at once
+            player_ids = set([plr_season.player_id for plr_season in new_items])
+            db_items = {
+                self.get_season_key(db_item): db_item for db_item in
+                season_cls.find_all_for_players(player_ids)}
 
-    def retrieve_player_data(self, player_id):
+            cls_created, cls_updated = upsert_db_items(season_cls, [(
+                db_items.get(self.get_season_key(plr_season)), plr_season
+            ) for plr_season in new_items])
+
+            logger.info("\t+ %d %s items added, %d updated" % (
+                cls_created, season_cls.HUMAN_READABLE, cls_updated))
+            created += cls_created
+            updated += cls_updated
+
+        return created, updated
+
+    def get_season_key(self, plr_season):
+        """
+        Gets key identifying specified player or goalie season item.
+        """
+        return (
+            plr_season.player_id, plr_season.team_id, plr_season.season,
+            plr_season.season_type, plr_season.season_team_sequence)
+
+    def retrieve_player_data(self, player_id, landing_data=None):
         """
         Retrieves personal data for player with specified id.
         """
@@ -116,19 +203,32 @@ class PlayerDataRetriever():
 
         logger.info("+ Retrieving player data for %s" % plr.name)
 
-        plr_data_dict = self.retrieve_raw_player_data(player_id)
-
-        plr_data_item = PlayerDataItem(player_id, plr_data_dict)
+        plr_data_item = self.create_player_data_item(player_id, landing_data)
+        if plr_data_item is None:
+            return
         plr_data_item_db = PlayerDataItem.find_by_player_id(player_id)
 
-        self.create_or_update_database_item(plr_data_item, plr_data_item_db)
+        self.create_or_update_database_item(
+            plr_data_item, plr_data_item_db, plr)
+
+    def create_player_data_item(self, player_id, landing_data=None):
+        """
+        Creates (yet unsaved) personal data item for player with specified
+        id, optionally from previously retrieved landing data.
+        """
+        plr_data_dict = self.retrieve_raw_player_data(player_id, landing_data)
+        if not plr_data_dict:
+            return
+
+        return PlayerDataItem(player_id, plr_data_dict)
 
-    def create_or_update_database_item(self, new_item, db_item):
+    def create_or_update_database_item(self, new_item, db_item, plr=None):
         # TODO: switch to usage of application-wide utility method
         """
         Creates or updates a database item.
         """
-        plr = Player.find_by_id(new_item.player_id)
+        if plr is None:
+            plr = Player.find_by_id(new_item.player_id)
         cls_name = new_item.__class__.HUMAN_READABLE
 
         with session_scope() as session:
@@ -149,24 +249,25 @@ class PlayerDataRetriever():
 
         return return_item
 
-    def retrieve_raw_season_data(self, player_id):
+    def retrieve_raw_season_data(self, player_id, landing_data=None):
         """
-        Retrieves raw season statistics for specified player id from nhl.com.
+        Retrieves raw season statistics for specified player id from nhl.com
+        unless previously retrieved landing data is provided.
         """
-        PLR_URL_TPL = "https://api-web.nhle.com/v1/player/%s/landing"
-
-        url = PLR_URL_TPL % str(player_id)
-        logger.debug(
-            "+ Retrieving raw season statistics for player_id " +
-            "%d from %s" % (player_id, url))
-        r = requests.get(url)
-        plr_json = r.json()
+        if landing_data is None:
+            logger.debug(
+                "+ Retrieving raw season statistics for player_id %d" % (
+                    player_id))
+            landing_data = retrieve_landing_data(player_id)
+        if landing_data is None:
+            return
+        plr_json = landing_data
 
         plr_season_dict = dict()
 
         plr_season_dict['position'] = plr_json['position']
 
-        for plr_season in plr_json['seasonTotals']:
+        for plr_season in plr_json.get('seasonTotals', list()):
             if plr_season['leagueAbbrev'] != 'NHL':
                 continue
 
@@ -179,7 +280,7 @@ class PlayerDataRetriever():
 
             # retrieving season and team of current statline
             season = int(str(plr_season['season'])[:4])
-            team = Team.find_by_name(plr_season['teamName']['default'])
+            team = self.get_team_by_name(plr_season['teamName']['default'])
             # retrieving sequence number of current statline,
             # important in case of a player playing for multiple teams
             # in one season
@@ -192,81 +293,79 @@ class PlayerDataRetriever():
 
         return plr_season_dict
 
-    def retrieve_raw_player_data(self, player_id):
+    def retrieve_raw_player_data(self, player_id, landing_data=None):
         """
-        Retrieves raw personal data for specified player id from nhl.com.
+        Retrieves raw personal data for specified player id from nhl.com
+        unless previously retrieved landing data is provided.
         """
-        # retrieving player json page
-        url = "".join((self.NHL_SITE_PREFIX, str(player_id)))
-        r = requests.get(url)
-        plr_json = r.json()
+        if landing_data is None:
+            landing_data = retrieve_landing_data(player_id)
+        if landing_data is None:
+            return
+        person = landing_data
 
         plr_data_dict = dict()
 
-        for person in plr_json['people']:
-            # retrieving basic data (should be known already)
-            plr_data_dict[
-                self.DB_KEY_FIRST_NAME] = person[self.JSON_KEY_FIRST_NAME]
-            plr_data_dict[
-                self.DB_KEY_LAST_NAME] = person[self.JSON_KEY_LAST_NAME]
-            plr_data_dict[
-                self.DB_KEY_FULL_NAME] = person[self.JSON_KEY_FULL_NAME]
-            plr_data_dict[
-                self.DB_KEY_POSITION] = person[
-                    self.JSON_KEY_POSITION][self.JSON_KEY_POSITION_CODE]
-
-            # retrieving jersey number,...
-            if self.JSON_KEY_NUMBER in person:
-                plr_data_dict[
-                    self.DB_KEY_NUMBER] = person[self.JSON_KEY_NUMBER]
-            # height,...
-            if self.JSON_KEY_HEIGHT in person:
-                orig_height = person[self.JSON_KEY_HEIGHT]
-                ft_in_regex_match = re.search(self.FT_IN_REGEX, orig_height)
-                if ft_in_regex_match is not None:
-                    feet = ft_in_regex_match.group(1)
-                    inches = ft_in_regex_match.group(2)
-                    height_metric = feet_to_m(feet, inches)
-                    height_imperial = float(
-                        "%d.%02d" % (int(feet), int(inches)))
-                else:
-                    height_metric = None
-                    height_imperial = None
-                plr_data_dict[self.DB_KEY_HEIGHT_METRIC] = height_metric
-                plr_data_dict[self.DB_KEY_HEIGHT_IMPERIAL] = height_imperial
-            # weight,...
-            if self.JSON_KEY_WEIGHT in person:
-                plr_data_dict[self.DB_KEY_WEIGHT_IMPERIAL] = person[
-                    self.JSON_KEY_WEIGHT]
-                # integer of rounded float value with zero decimals
-                plr_data_dict[self.DB_KEY_WEIGHT_METRIC] = int(
-                    round(lbs_to_kg(person[self.JSON_KEY_WEIGHT]), 0))
-            # handedness,...
-            if self.JSON_KEY_HAND in person:
-                plr_data_dict[self.DB_KEY_HAND] = person[self.JSON_KEY_HAND]
-            # date of birth,...
-            if self.JSON_KEY_DATE_OF_BIRTH in person:
-                plr_data_dict[self.DB_KEY_DATE_OF_BIRTH] = parser.parse(person[
-                    self.JSON_KEY_DATE_OF_BIRTH]).date()  # just date component
-            # place of birth
-            if (
-                self.JSON_KEY_PLACE_OF_BIRTH_CITY in person and
-                self.JSON_KEY_PLACE_OF_BIRTH_COUNTRY in person
-            ):
-                if self.JSON_KEY_PLACE_OF_BIRTH_STATE_PROVINCE in person:
-                    place_of_birth = ", ".join((
-                        person[self.JSON_KEY_PLACE_OF_BIRTH_CITY],
-                        person[self.JSON_KEY_PLACE_OF_BIRTH_STATE_PROVINCE],
-                        person[self.JSON_KEY_PLACE_OF_BIRTH_COUNTRY]))
-                else:
-                    place_of_birth = ", ".join((
-                        person[self.JSON_KEY_PLACE_OF_BIRTH_CITY],
-                        person[self.JSON_KEY_PLACE_OF_BIRTH_COUNTRY]))
-                plr_data_dict[self.DB_KEY_PLACE_OF_BIRTH] = place_of_birth
-
-            # TODO: image retrieval
-
-            if 'currentTeam' in person:
-                plr_data_dict['current_team'] = person['currentTeam']['name']
+        # retrieving basic data (should be known already)
+        plr_data_dict[self.DB_KEY_FIRST_NAME] = self.get_localized(
+            person, self.JSON_KEY_FIRST_NAME)
+        plr_data_dict[self.DB_KEY_LAST_NAME] = self.get_localized(
+            person, self.JSON_KEY_LAST_NAME)
+        plr_data_dict[self.DB_KEY_FULL_NAME] = " ".join((
+            plr_data_dict[self.DB_KEY_FIRST_NAME],
+            plr_data_dict[self.DB_KEY_LAST_NAME]))
+        plr_data_dict[self.DB_KEY_POSITION] = person[self.JSON_KEY_POSITION]
+
+        # retrieving jersey number,...
+        if self.JSON_KEY_NUMBER in person:
+            plr_data_dict[self.DB_KEY_NUMBER] = person[self.JSON_KEY_NUMBER]
+        # height,...
+        if person.get(self.JSON_KEY_HEIGHT):
+            feet, inches = divmod(person[self.JSON_KEY_HEIGHT], 12)
+            plr_data_dict[self.DB_KEY_HEIGHT_METRIC] = feet_to_m(feet, inches)
+            plr_data_dict[self.DB_KEY_HEIGHT_IMPERIAL] = float(
+                "%d.%02d" % (feet, inches))
+        # weight,...
+        if person.get(self.JSON_KEY_WEIGHT):
+            plr_data_dict[self.DB_KEY_WEIGHT_IMPERIAL] = person[
+                self.JSON_KEY_WEIGHT]
+            # integer of rounded float value with zero decimals
+            plr_data_dict[self.DB_KEY_WEIGHT_METRIC] = int(
+                round(lbs_to_kg(person[self.JSON_KEY_WEIGHT]), 0))
+        # handedness,...
+        if self.JSON_KEY_HAND in person:
+            plr_data_dict[self.DB_KEY_HAND] = person[self.JSON_KEY_HAND]
+        # date of birth,...
+        if self.JSON_KEY_DATE_OF_BIRTH in person:
+            plr_data_dict[self.DB_KEY_DATE_OF_BIRTH] = parser.parse(person[
+                self.JSON_KEY_DATE_OF_BIRTH]).date()  # just date component
+        # place of birth
+        if (
+            self.JSON_KEY_PLACE_OF_BIRTH_CITY in person and
+            self.JSON_KEY_PLACE_OF_BIRTH_COUNTRY in person
+        ):
+            place_of_birth = [
+                self.get_localized(person, self.JSON_KEY_PLACE_OF_BIRTH_CITY)]
+            if self.JSON_KEY_PLACE_OF_BIRTH_STATE_PROVINCE in person:
+                place_of_birth.append(self.get_localized(
+                    person, self.JSON_KEY_PLACE_OF_BIRTH_STATE_PROVINCE))
+            place_of_birth.append(person[self.JSON_KEY_PLACE_OF_BIRTH_COUNTRY])
+            plr_data_dict[self.DB_KEY_PLACE_OF_BIRTH] = ", ".join(
+                place_of_birth)
+
+        # TODO: image retrieval
+
+        if self.JSON_KEY_CURRENT_TEAM in person:
+            plr_data_dict['current_team'] = self.get_localized(
+                person, self.JSON_KEY_CURRENT_TEAM)
 
         return plr_data_dict
+
+    def get_localized(self, json_data, key):
+        """
+        Gets default value of localized item with specified key.
+        """
+        value = json_data[key]
+        if isinstance(value, dict):
+            return value[self.JSON_KEY_DEFAULT]
+        return value
@@ -2,83 +2,78 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import re
-
-import requests
-from lxml import html
 
 from db import commit_db_item
 from db.team import Team
 from db.player import Player
 from db.player_draft import PlayerDraft
+from utils.player_data_retriever import retrieve_landing_data
 
 logger = logging.getLogger(__name__)
 
 
 class PlayerDraftRetriever():
 
-    NHL_PLAYER_DRAFT_PREFIX = "https://www.nhl.com/player"
-    DRAFT_INFO_REGEX = re.compile(R"(\d{4})\s(.+),\s(\d+).+\srd,.+\((\d+).+\soverall\)")
-
     def __init__(self):
         pass
 
-    def retrieve_draft_information(self, player_id):
+    def retrieve_draft_information(self, player_id, landing_data=None):
         """
         Retrieves draft information for player with specified id.
         """
         plr = Player.find_by_id(player_id)
         logger.info("+ Retrieving draft information for %s" % plr.name)
 
-        raw_draft_info = self.retrieve_raw_draft_data(player_id)
+        draft_info = self.create_player_draft(player_id, landing_data)
 
-        if raw_draft_info is None:
+        if draft_info is None:
             logger.info("+ No draft information retrievable for %s" % plr.name)
             return
 
-        logger.debug(
-            "+ Raw draft information for %s: %s" % (plr.name, raw_draft_info))
+        draft_info_db = PlayerDraft.find(
+            player_id, draft_info.team_id, draft_info.year)
 
-        match = re.search(self.DRAFT_INFO_REGEX, raw_draft_info)
-        if match:
-            dft_year = int(match.group(1))
-            dft_team = Team.find_by_abbr(match.group(2))
-            dft_round = int(match.group(3))
-            dft_overall = int(match.group(4))
+        if draft_info_db:
+            logger.info(
+                "+ Draft information for %s already in database" % (
+                    plr.name))
+            return
 
-            draft_info_db = PlayerDraft.find(
-                player_id, dft_team.team_id, dft_year)
+        commit_db_item(draft_info)
 
-            if draft_info_db:
-                logger.info(
-                    "+ Draft information for %s already in database" % (
-                        plr.name))
-                return
+    def create_player_draft(self, player_id, landing_data=None):
+        """
+        Creates (yet unsaved) draft item for player with specified id,
+        optionally from previously retrieved landing data.
+        """
+        raw_draft_info = self.retrieve_raw_draft_data(player_id, landing_data)
 
-            draft_info = PlayerDraft(
-                player_id, dft_team.team_id, dft_year, dft_round, dft_overall)
+        if raw_draft_info is None:
+            return
 
-            commit_db_item(draft_info)
+        logger.debug(
+            "+ Raw draft information for player_id %d: %s" % (
+                player_id, raw_draft_info))
 
-        else:
+        dft_team = Team.find_by_abbr(raw_draft_info['teamAbbrev'])
+        if dft_team is None:
             logger.info(
-                "+ No draft information for %s decodable from %s" % (
-                    plr.name, raw_draft_info))
+                "+ No team found for draft information of player_id " +
+                "%d: %s" % (player_id, raw_draft_info))
+            return
 
-    def retrieve_raw_draft_data(self, player_id):
+        return PlayerDraft(
+            player_id, dft_team.team_id, raw_draft_info['year'],
+            raw_draft_info['round'], raw_draft_info['overallPick'])
+
+    def retrieve_raw_draft_data(self, player_id, landing_data=None):
         """
-        Retrieves raw draft information from profile page of
-        player with specified id.
+        Retrieves raw draft information from landing document of player with
+        specified id unless previously retrieved landing data is provided.
         """
-        url = "/".join((self.NHL_PLAYER_DRAFT_PREFIX, str(player_id)))
-        r = requests.get(url)
-        doc = html.fromstring(r.text)
-
-        raw_draft_info = doc.xpath(
-            "//li[@class='player-bio__item']/span[text() = " +
-            "'Draft:']/parent::li/text()")
-
-        if not raw_draft_info:
+        if landing_data is None:
+            landing_data = retrieve_landing_data(player_id)
+        if landing_data is None:
             return
-        else:
-            return raw_draft_info.pop()
+
+        return landing_data.get('draftDetails')
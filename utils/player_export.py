@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming export of players from the database. Players are retrieved as
+projected columns using a server-side cursor and written incrementally either
+as a single JSON object keyed by player id or as compact JSON Lines. Exports
+may be restricted to players changed since the previous export as recorded in
+the audit trail.
+"""
+import os
+import json
+import logging
+
+from dateutil.parser import parse
+from sqlalchemy import table, column, func, Integer
+
+from db.player import Player
+
+logger = logging.getLogger(__name__)
+
+# number of rows to fetch from server-side cursor at once
+EXPORT_CHUNK_SIZE = 1000
+# mandatory and optional attributes to export for each player
+MANDATORY_KEYS = ['first_name', 'last_name', 'position']
+OPTIONAL_KEYS = [
+    'alternate_first_names', 'alternate_last_names',
+    'alternate_positions', 'capfriendly_id']
+# suffix of file holding time of last export, located next to the export file
+STATE_SUFFIX = '.last_export'
+# suffix of file holding players changed since last export
+DELTA_SUFFIX = '.delta.jsonl'
+
+# audit trail populated by database triggers, original and new rows are
+# stored in their text representation, i.e. '(8471675,Crosby,Sidney,...)'
+logged_actions = table(
+    'logged_actions',
+    column('table_name'), column('action_tstamp'),
+    column('original_data'), column('new_data'), schema='nhl')
+# regular expression to extract primary key from text representation of row
+ROW_ID_REGEX = r'^\((\d+),'
+
+
+def get_state_path(tgt_path):
+    """
+    Gets path of file holding time of last export to specified file.
+    """
+    tgt_dir, tgt_file = os.path.split(os.path.abspath(tgt_path))
+    return os.path.join(tgt_dir, ".%s%s" % (tgt_file, STATE_SUFFIX))
+
+
+def get_delta_path(tgt_path):
+    """
+    Gets path of file holding players changed since last export to specified
+    file.
+    """
+    return os.path.splitext(tgt_path)[0] + DELTA_SUFFIX
+
+
+def load_last_export(tgt_path):
+    """
+    Loads time of last export to specified file, returns nothing if no export
+    has been recorded yet.
+    """
+    state_path = get_state_path(tgt_path)
+    if not os.path.isfile(state_path):
+        return
+    with open(state_path) as state_file:
+        return parse(state_file.read().strip())
+
+
+def save_last_export(tgt_path, export_tstamp):
+    """
+    Saves time of specified export to specified file.
+    """
+    with open(get_state_path(tgt_path), 'w') as state_file:
+        state_file.write(export_tstamp.isoformat())
+
+
+def find_changed_player_ids(session, since):
+    """
+    Finds ids of all players inserted, updated or deleted since specified
+    time using the audit trail.
+    """
+    row_data = func.coalesce(
+        logged_actions.c.new_data, logged_actions.c.original_data)
+    row_id = func.substring(row_data, ROW_ID_REGEX).cast(Integer)
+    query = session.query(row_id).filter(
+        logged_actions.c.table_name == Player.__tablename__,
+        logged_actions.c.action_tstamp > since).distinct()
+    return set([player_id for player_id, in query if player_id is not None])
+
+
+def stream_players(session, player_ids=None):
+    """
+    Streams projected player attributes ordered by player id using a
+    server-side cursor, optionally restricted to specified player ids.
+    """
+    columns = [getattr(Player, key) for key in (
+        ['player_id'] + MANDATORY_KEYS + OPTIONAL_KEYS)]
+    query = session.query(*columns).order_by(Player.player_id)
+    if player_ids is not None:
+        query = query.filter(Player.player_id.in_(sorted(player_ids)))
+    return query.execution_options(
+        stream_results=True).yield_per(EXPORT_CHUNK_SIZE)
+
+
+def get_export_item(row):
+    """
+    Converts specified row of player attributes to an export item, i.e. a
+    pair of player id and attribute dictionary. Optional attributes are only
+    included if set.
+    """
+    row = row._asdict() if hasattr(row, '_asdict') else dict(row)
+    plr_data = {key: row[key] for key in MANDATORY_KEYS}
+    for key in OPTIONAL_KEYS:
+        if row.get(key):
+            plr_data[key] = row[key]
+    return row['player_id'], plr_data
+
+
+def write_json(export_items, tgt_file):
+    """
+    Incrementally writes specified export items as a single JSON object keyed
+    by player id, formatted identically to a complete indented dump. Returns
+    number of items written.
+    """
+    cnt = 0
+    tgt_file.write("{")
+    for player_id, plr_data in export_items:
+        # stripping enclosing braces from dump of single-item object
+        tgt_file.write(
+            ("\n" if not cnt else ",\n") +
+            json.dumps({str(player_id): plr_data}, indent=2)[2:-2])
+        cnt += 1
+    tgt_file.write("\n}" if cnt else "}")
+    return cnt
+
+
+def write_jsonl(export_items, tgt_file, deleted_ids=()):
+    """
+    Writes specified export items as compact JSON Lines, i.e. one JSON object
+    including the player id per line. Ids of deleted players are written as
+    explicit delete records. Returns number of items written.
+    """
+    cnt = 0
+    for player_id, plr_data in export_items:
+        tgt_file.write(json.dumps(
+            dict(player_id=player_id, **plr_data),
+            separators=(',', ':'), ensure_ascii=False) + "\n")
+        cnt += 1
+    for player_id in sorted(deleted_ids):
+        tgt_file.write(json.dumps(
+            dict(player_id=player_id, deleted=True),
+            separators=(',', ':')) + "\n")
+    return cnt
+
+
+def read_player_export(src_path):
+    """
+    Reads player export items from specified file. JSON Lines files are read
+    line by line, whereas regular JSON files are loaded completely. Delete
+    records are yielded with attribute dictionaries only containing a
+    'deleted' flag.
+    """
+    if src_path.endswith('.jsonl'):
+        with open(src_path, encoding='utf-8') as src_file:
+            for line in src_file:
+                if not line.strip():
+                    continue
+                plr_data = json.loads(line)
+                yield str(plr_data.pop('player_id')), plr_data
+    else:
+        with open(src_path, encoding='utf-8') as src_file:
+            migration_data = json.load(src_file)
+        for player_id in sorted(migration_data.keys()):
+            yield player_id, migration_data[player_id]
+
+
+def export_players(session, tgt_path, delta=False):
+    """
+    Exports players to specified file, JSON Lines if the file name ends with
+    '.jsonl', JSON otherwise. In delta mode the complete export remains
+    untouched, instead players changed since it was written are written to a
+    separate JSON Lines file that includes delete records for players no
+    longer existing. Hence each delta is relative to the complete export and
+    supersedes previous deltas. Returns path of written file as well as
+    numbers of exported and deleted players.
+    """
+    # using database time to not miss changes made while exporting
+    export_tstamp = session.query(func.now()).scalar()
+
+    player_ids = None
+    if delta:
+        last_export = load_last_export(tgt_path)
+        if last_export is None:
+            logger.warning(
+                "+ No previous export to %s found, " % tgt_path +
+                "exporting all players")
+        else:
+            player_ids = find_changed_player_ids(session, last_export)
+            logger.info("+ %d players changed since %s" % (
+                len(player_ids), last_export))
+
+    # changed players not retrieved anymore have been deleted
+    exported_ids = set()
+
+    def export_items():
+        for row in stream_players(session, player_ids):
+            player_id, plr_data = get_export_item(row)
+            exported_ids.add(player_id)
+            yield player_id, plr_data
+
+    if player_ids is None:
+        out_path = tgt_path
+    else:
+        out_path = get_delta_path(tgt_path)
+
+    # writing to temporary file first to never leave incomplete exports
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as tgt_file:
+        if out_path.endswith('.jsonl'):
+            cnt = write_jsonl(export_items(), tgt_file)
+        else:
+            cnt = write_json(export_items(), tgt_file)
+        if player_ids is not None:
+            deleted_ids = player_ids - exported_ids
+            write_jsonl([], tgt_file, deleted_ids)
+        else:
+            deleted_ids = set()
+    os.replace(tmp_path, out_path)
+
+    # only recording time of complete exports to base deltas upon
+    if out_path == tgt_path:
+        save_last_export(tgt_path, export_tstamp)
+
+    return out_path, cnt, len(deleted_ids)
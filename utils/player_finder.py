@@ -3,15 +3,21 @@
 
 import json
 import logging
+import threading
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 from lxml import html
 
 from db import commit_db_item
+from db.common import session_scope
 from db.player import Player
 from db.team import Team
 from utils import retrieve_season
+from utils.player_name_index import add_player_to_name_index
+from utils.player_data_retriever import retrieve_landing_data
+from utils import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +42,30 @@ class PlayerFinder():
         "http://suggest.svc.nhl.com/svc/suggest/v1/minplayers/")
     # maximum number of suggestions
     SUGGEST_SITE_SUFFIX = "/99999"
+    # url prefix for team rosters
+    TEAM_ROSTER_URL_TPL = "https://api-web.nhle.com/v1/roster"
+    # maximum number of concurrent threads retrieving unknown players
+    MAX_WORKERS = 8
 
     def __init__(self):
-        # nothing to do here
-        pass
+        # players already in database by player id, retrieved on first usage
+        self.known_players = None
+        # abbreviations that are valid for team rosters by team id
+        self.roster_abbrs = dict()
+        self.lock = threading.Lock()
+
+    def get_known_players(self):
+        """
+        Gets all players already in database (by player id) using a single
+        query on first usage.
+        """
+        with self.lock:
+            if self.known_players is None:
+                with session_scope() as session:
+                    self.known_players = {
+                        plr.player_id: plr for
+                        plr in session.query(Player).all()}
+            return self.known_players
 
     def find_players_for_team(self, team, src='roster', season=None):
         """
@@ -73,26 +99,55 @@ class PlayerFinder():
 
         season = f"{season}{season + 1}"
 
-        TEAM_ROSTER_URL_TPL = "https://api-web.nhle.com/v1/roster"
+        team_data = self.retrieve_roster_data(team, season)
+
+        plr_ids = [plr['id'] for plrs in team_data.values() for plr in plrs]
+        known_players = self.get_known_players()
+
+        # retrieving players not yet in database concurrently
+        unknown_plr_ids = [
+            plr_id for plr_id in plr_ids if plr_id not in known_players]
+        if unknown_plr_ids:
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as threads:
+                future_tasks = {
+                    threads.submit(
+                        self.search_player_by_id, plr_id
+                    ): plr_id for plr_id in unknown_plr_ids}
+                for future in as_completed(future_tasks):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.warn(
+                            "+ Unable to retrieve player with id %d: %s" % (
+                                future_tasks[future], e))
+
+        for plr_id in plr_ids:
+            if plr_id in known_players:
+                players.append(known_players[plr_id])
 
-        # creating stats api url with optional season parameter
-        url = "/".join((TEAM_ROSTER_URL_TPL, str(team.abbr), str(season)))
-        r = requests.get(url)
-        if r.status_code == 404:
-            url = "/".join((TEAM_ROSTER_URL_TPL, str(team.orig_abbr), str(season)))
-            r = requests.get(url)
+        return players
 
-        team_data = r.json()
+    def retrieve_roster_data(self, team, season):
+        """
+        Retrieves roster data for specified team and season (as a string,
+        i.e. '20232024'). Falls back to the team's original abbreviation if
+        the current one yields no roster. The abbreviation last found valid
+        for the team is tried first, but the other one is still tried if it
+        fails for another season. Returns no roster data if both fail.
+        """
+        abbrs = [team.abbr, team.orig_abbr]
+        if team.team_id in self.roster_abbrs:
+            abbrs.insert(0, self.roster_abbrs[team.team_id])
 
-        for plrs in team_data.values():
-            # retrieving player if of current player in roster
-            for plr in plrs:
-                plr_id = plr['id']
-                # searching and optionally creating player with found player id
-                plr = self.search_player_by_id(plr_id)
-                players.append(plr)
+        for abbr in sorted(set(abbrs), key=abbrs.index):
+            url = "/".join((self.TEAM_ROSTER_URL_TPL, str(abbr), season))
+            r = http_client.get(url)
+            if r.status_code != 404:
+                self.roster_abbrs[team.team_id] = abbr
+                return r.json()
 
-        return players
+        logger.warning("+ No roster found for %s in %s" % (team, season))
+        return dict()
 
     def get_system_players(self, team):
         """
@@ -117,11 +172,8 @@ class PlayerFinder():
         for url in urls:
             # retrieving nhl id from player page url
             plr_id = int(urlparse(url).path.split("/")[-1])
-            # trying to find player in database
-            plr = Player.find_by_id(plr_id)
-            # creating player if not already in database
-            if plr is None:
-                plr = self.search_player_by_id(plr_id)
+            # searching and optionally creating player with found player id
+            plr = self.search_player_by_id(plr_id)
 
             players.append(plr)
 
@@ -249,7 +301,7 @@ class PlayerFinder():
             name = last_name
 
         search_url = f"https://search.d3.nhle.com/api/v1/search/player?culture=en-us&q={name}"
-        req = requests.get(search_url)
+        req = http_client.get(search_url)
         suggestions_json = req.json()
 
         suggested_players = list()
@@ -277,7 +329,7 @@ class PlayerFinder():
             self.SUGGEST_SITE_PREFIX,
             name.lower(),
             self.SUGGEST_SITE_SUFFIX))
-        req = requests.get(url)
+        req = http_client.get(url)
         suggestions_json = json.loads(req.text)
 
         suggested_players = list()
@@ -296,12 +348,18 @@ class PlayerFinder():
         """
         Searches a player in database and on nhl.com using the official id.
         """
-        plr = Player.find_by_id(plr_id)
+        plr = self.get_known_players().get(plr_id)
 
+        # making sure player hasn't been created in the meantime
         if plr is None:
-            url = f"https://api-web.nhle.com/v1/player/{plr_id}/landing"
-            req = requests.get(url)
-            plr_json = req.json()
+            plr = Player.find_by_id(plr_id)
+
+        if plr is None:
+            # using (cached) landing document that is subsequently used to
+            # retrieve player data, too
+            plr_json = retrieve_landing_data(plr_id)
+            if plr_json is None:
+                return
 
             plr = self.create_player(
                 plr_id, plr_json['lastName']['default'], plr_json['firstName']['default'], plr_json['position'])
@@ -328,7 +386,14 @@ class PlayerFinder():
 
         commit_db_item(plr, True)
 
-        return Player.find_by_id(plr_id)
+        plr = Player.find_by_id(plr_id)
+        # registering new player with name index to make it resolvable by name
+        add_player_to_name_index(plr)
+        with self.lock:
+            if self.known_players is not None:
+                self.known_players[plr_id] = plr
+
+        return plr
 
     def get_html_document(self, team, src_type, season=None):
         """
@@ -366,7 +431,7 @@ class PlayerFinder():
                 self.CAPFRIENDLY_SITE_PREFIX, team_url_component))
 
         try:
-            req = requests.get(team_url)
+            req = http_client.get(team_url)
         except requests.exceptions.ConnectionError:
             # TODO: returning empty document tree
             return None
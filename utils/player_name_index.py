@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+In-memory index to resolve player names (including alternate first and last
+names as well as alternate positions) to player items without querying the
+database for each single lookup.
+"""
+import re
+import logging
+import threading
+from collections import defaultdict
+
+from utils import remove_non_ascii_chars
+from db.common import session_scope
+from db.player import Player
+
+logger = logging.getLogger(__name__)
+
+# minimum trigram similarity for fuzzy name matches
+FUZZY_CUTOFF = 0.5
+
+# regular expression to remove punctuation from names, i.e. 'T.J.' -> 'TJ'
+PUNCTUATION_REGEX = re.compile(r"[\.\'\,]")
+# regular expression to collapse hyphens and whitespace into single blanks
+WHITESPACE_REGEX = re.compile(r"[\s\-]+")
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def fold_name(name):
+    """
+    Folds specified name into a normalized form, i.e. lower-case ascii
+    characters without punctuation separated by single blanks.
+    """
+    if not name:
+        return ''
+    name = remove_non_ascii_chars(name).lower()
+    name = PUNCTUATION_REGEX.sub("", name)
+    return WHITESPACE_REGEX.sub(" ", name).strip()
+
+
+def get_trigrams(folded_name):
+    """
+    Retrieves set of trigrams for specified (folded) name.
+    """
+    padded = "  %s " % folded_name
+    return set([padded[i:i + 3] for i in range(len(padded) - 2)])
+
+
+class PlayerNameIndex():
+    """
+    Resolves player names by exact and fuzzy lookups in dictionaries built
+    once from all player items.
+    """
+
+    def __init__(self, players=None):
+        # player items by player id
+        self.players = dict()
+        # player ids by folded full name
+        self.by_full_name = defaultdict(set)
+        # player ids by tuple of folded first and last name
+        self.by_name = defaultdict(set)
+        # player ids by tuple of folded primary first and last name
+        self.by_primary_name = defaultdict(set)
+        # folded full names by trigram
+        self.by_trigram = defaultdict(set)
+        # lock to allow for additions from concurrent threads
+        self.lock = threading.Lock()
+
+        if players is None:
+            players = self.load_players()
+        for plr in players:
+            self.add(plr)
+
+        logger.debug(
+            "+ Player name index built for %d players" % len(self.players))
+
+    @staticmethod
+    def load_players():
+        """
+        Loads all players from database with a single query.
+        """
+        with session_scope() as session:
+            return session.query(Player).all()
+
+    def add(self, plr):
+        """
+        Adds specified player item to index, e.g. after it has been created.
+        """
+        first_names = [plr.first_name] + list(
+            plr.alternate_first_names or list())
+        last_names = [plr.last_name] + list(
+            plr.alternate_last_names or list())
+
+        with self.lock:
+            self.players[plr.player_id] = plr
+            self.by_primary_name[(
+                fold_name(plr.first_name),
+                fold_name(plr.last_name))].add(plr.player_id)
+            for first_name in set(map(fold_name, first_names)):
+                for last_name in set(map(fold_name, last_names)):
+                    full_name = " ".join((first_name, last_name))
+                    self.by_name[(first_name, last_name)].add(plr.player_id)
+                    self.by_full_name[full_name].add(plr.player_id)
+                    for trigram in get_trigrams(full_name):
+                        self.by_trigram[trigram].add(full_name)
+
+    def has_position(self, plr_id, position):
+        """
+        Checks whether player with specified id has played the specified
+        position, either as primary or alternate position.
+        """
+        plr = self.players[plr_id]
+        position = position.upper()
+        return plr.position == position or position in (
+            plr.alternate_positions or list())
+
+    def get_unique_player(self, plr_ids, position=None):
+        """
+        Returns player item if specified player ids (optionally filtered by
+        position) identify exactly one player.
+        """
+        if position:
+            plr_ids = [
+                plr_id for plr_id in plr_ids if
+                self.has_position(plr_id, position)]
+        if len(plr_ids) == 1:
+            return self.players[next(iter(plr_ids))]
+        return None
+
+    def find_by_name(self, first_name, last_name, position=None):
+        """
+        Finds player by primary first and last name (and optionally
+        position).
+        """
+        return self.get_unique_player(self.by_primary_name.get(
+            (fold_name(first_name), fold_name(last_name)), set()), position)
+
+    def find_by_name_extended(self, first_name, last_name, position=None):
+        """
+        Finds player by first and last name with alternate names taken into
+        account, too.
+        """
+        return self.get_unique_player(self.by_name.get(
+            (fold_name(first_name), fold_name(last_name)), set()), position)
+
+    def find_by_full_name(self, full_name, position=None):
+        """
+        Finds player by full name, i.e. first and last name separated by a
+        blank, with alternate names taken into account.
+        """
+        return self.get_unique_player(
+            self.by_full_name.get(fold_name(full_name), set()), position)
+
+    def find_fuzzy(self, full_name, position=None, cutoff=FUZZY_CUTOFF):
+        """
+        Finds player with the full name most similar to the specified one by
+        comparing the trigrams of both names. Returns nothing if the best
+        match is not unique.
+        """
+        folded = fold_name(full_name)
+        trigrams = get_trigrams(folded)
+
+        # counting trigrams shared with each candidate name
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for candidate in self.by_trigram.get(trigram, ()):
+                shared[candidate] += 1
+
+        best_score = cutoff
+        best_plr_ids = set()
+        for candidate, cnt in shared.items():
+            # jaccard similarity of both trigram sets
+            score = cnt / (len(trigrams) + len(get_trigrams(candidate)) - cnt)
+            if score < best_score:
+                continue
+            plr_ids = set(self.by_full_name[candidate])
+            if position:
+                plr_ids = set([
+                    plr_id for plr_id in plr_ids if
+                    self.has_position(plr_id, position)])
+            if not plr_ids:
+                continue
+            if score > best_score:
+                best_score = score
+                best_plr_ids = plr_ids
+            else:
+                best_plr_ids.update(plr_ids)
+
+        return self.get_unique_player(best_plr_ids)
+
+    def find(self, first_name, last_name, position=None, fuzzy=False):
+        """
+        Finds player by trying exact lookups of primary and alternate names.
+        Optionally falls back to a fuzzy lookup that requires a position to
+        be specified, as similar names may well belong to different players.
+        """
+        plr = self.find_by_name(first_name, last_name)
+        if plr is None:
+            plr = self.find_by_name(first_name, last_name, position)
+        if plr is None:
+            plr = self.find_by_name_extended(first_name, last_name)
+        if plr is None and position:
+            plr = self.find_by_name_extended(first_name, last_name, position)
+        if plr is None and fuzzy and position:
+            plr = self.find_fuzzy(
+                " ".join((first_name, last_name)), position)
+            if plr is not None:
+                logger.warning(
+                    "+ Fuzzy match for %s %s (%s): %s %s (%d)" % (
+                        first_name, last_name, position, plr.first_name,
+                        plr.last_name, plr.player_id))
+        return plr
+
+
+def get_player_name_index():
+    """
+    Returns player name index shared throughout the current process, builds
+    it on first usage.
+    """
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = PlayerNameIndex()
+        return _shared_index
+
+
+def add_player_to_name_index(plr):
+    """
+    Adds specified player item to shared player name index (if it has already
+    been built).
+    """
+    if _shared_index is not None:
+        _shared_index.add(plr)
@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Derivation of player and goalie season statistics from game-level data, i.e.
+from player and goalie games that have been parsed into the database. Totals
+are calculated for each stint with a team during a season, hence every
+resulting item corresponds to a single player or goalie season item as
+otherwise retrieved from the NHL API.
+"""
+import logging
+from datetime import timedelta
+from collections import defaultdict
+
+from sqlalchemy import or_
+
+from db import upsert_db_items
+from db.common import session_scope
+from db.team import Team
+from db.game import Game
+from db.goal import Goal
+from db.event import Event
+from db.player_game import PlayerGame
+from db.goalie_game import GoalieGame
+from db.player_season import PlayerSeason
+from db.goalie_season import GoalieSeason
+
+logger = logging.getLogger(__name__)
+
+# season types by game type
+SEASON_TYPES = {2: 'RS', 3: 'PO'}
+# number of players to derive season statistics for at once
+BATCH_SIZE = 250
+# attributes compared with season statistics retrieved from the NHL API
+SKATER_RECONCILE_ATTRS = [
+    "games_played", "goals", "assists", "points", "plus_minus", "pim",
+    "shots", "ppg", "pp_pts", "shg", "sh_pts", "gwg", "otg", "toi"]
+GOALIE_RECONCILE_ATTRS = [
+    "games_played", "games_started", "wins", "losses", "ties", "otl", "so",
+    "sa", "ga", "toi"]
+
+
+class SeasonAggregator():
+
+    def __init__(self):
+        # teams by id, only retrieved once per team
+        self.teams = dict()
+
+    def derive_for_games(self, game_ids, store=True):
+        """
+        Derives season statistics for all players and goalies participating
+        in the games with the specified (full) ids, e.g. the games parsed
+        most recently.
+        """
+        with session_scope() as session:
+            seasons = set([season for season, in session.query(
+                Game.season).filter(Game.game_id.in_(game_ids)).distinct()])
+            player_ids = set()
+            for plr_game_cls in [PlayerGame, GoalieGame]:
+                player_ids.update([player_id for player_id, in session.query(
+                    plr_game_cls.player_id).filter(
+                        plr_game_cls.game_id.in_(game_ids)).distinct()])
+
+        return self.derive(player_ids, seasons, store)
+
+    def derive(self, player_ids, seasons, store=True):
+        """
+        Derives season statistics for specified players in the given seasons
+        and reconciles them with existing, i.e. previously retrieved, items.
+        Derived items are stored in the database unless otherwise specified,
+        existing items covering more games than available in the database
+        are retained though. Returns numbers of created and updated items as well as a list of
+        discrepancies between existing and derived items.
+        """
+        player_ids = sorted(player_ids)
+        seasons = sorted(seasons)
+        created = updated = 0
+        discrepancies = list()
+
+        for i in range(0, len(player_ids), BATCH_SIZE):
+            batch = player_ids[i:i + BATCH_SIZE]
+
+            with session_scope() as session:
+                plr_games = self.retrieve_games(
+                    session, PlayerGame, batch, seasons)
+                goalie_games = self.retrieve_games(
+                    session, GoalieGame, batch, seasons)
+                goals = self.retrieve_goals(session, batch, seasons)
+
+            # goalies show up in player games as well
+            plr_games = [
+                (plr_game, game) for plr_game, game in plr_games if
+                plr_game.position != 'G']
+            goal_stats = get_goal_stats(
+                goals, {game.game_id: game for _, game in plr_games})
+
+            for season_cls, games, aggregate in [
+                (PlayerSeason, plr_games,
+                    lambda stint: aggregate_skater_stint(stint, goal_stats)),
+                (GoalieSeason, goalie_games, aggregate_goalie_stint),
+            ]:
+                new_items = list()
+                for (player_id, season, season_type), plr_games_stints in (
+                        sorted(split_into_stints(games).items())):
+                    for stint in plr_games_stints:
+                        new_items.append(season_cls(
+                            player_id, season, season_type,
+                            self.get_team(stint[0][0].team_id), None,
+                            aggregate(stint)))
+                if not new_items:
+                    continue
+
+                db_items = [
+                    db_item for db_item in
+                    season_cls.find_all_for_players(batch) if
+                    db_item.season in seasons and
+                    db_item.season_type in SEASON_TYPES.values()]
+                pairs = match_db_items(new_items, db_items)
+                discrepancies.extend(reconcile(pairs))
+
+                if store:
+                    storable_pairs = get_storable_pairs(pairs)
+                    cls_created, cls_updated = upsert_db_items(
+                        season_cls, storable_pairs)
+                    logger.info(
+                        "\t+ %d %s items derived, %d updated, " % (
+                            cls_created, season_cls.HUMAN_READABLE,
+                            cls_updated) +
+                        "%d retained due to incomplete game data" % (
+                            len(pairs) - len(storable_pairs)))
+                    created += cls_created
+                    updated += cls_updated
+
+        for discrepancy in discrepancies:
+            logger.warning(
+                "+ Derived %s for player %d (%d %s, team %d) differs " % (
+                    discrepancy[4], discrepancy[0], discrepancy[1],
+                    discrepancy[2], discrepancy[3]) +
+                "from retrieved value: %s (retrieved: %s)" % (
+                    discrepancy[6], discrepancy[5]))
+
+        return created, updated, discrepancies
+
+    def retrieve_games(self, session, plr_game_cls, player_ids, seasons):
+        """
+        Retrieves player or goalie games for specified players in the given
+        seasons along with the according games ordered by date.
+        """
+        return session.query(plr_game_cls, Game).join(
+            Game, plr_game_cls.game_id == Game.game_id).filter(
+                plr_game_cls.player_id.in_(player_ids),
+                Game.season.in_(seasons),
+                Game.type.in_(list(SEASON_TYPES.keys()))
+            ).order_by(Game.date, Game.game_id).all()
+
+    def retrieve_goals(self, session, player_ids, seasons):
+        """
+        Retrieves goals scored or assisted by specified players in the given
+        seasons along with the according events.
+        """
+        return session.query(Goal, Event).join(
+            Event, Goal.event_id == Event.event_id).join(
+            Game, Event.game_id == Game.game_id).filter(
+                or_(
+                    Goal.player_id.in_(player_ids),
+                    Goal.assist_1.in_(player_ids),
+                    Goal.assist_2.in_(player_ids)),
+                Game.season.in_(seasons),
+                Game.type.in_(list(SEASON_TYPES.keys()))
+            ).all()
+
+    def get_team(self, team_id):
+        if team_id not in self.teams:
+            self.teams[team_id] = Team.find_by_id(team_id)
+        return self.teams[team_id]
+
+
+def split_into_stints(games):
+    """
+    Splits specified pairs of player (or goalie) games and games, ordered by
+    date, into stints with a single team. Returns lists of stints keyed by
+    player id, season and season type.
+    """
+    stints = defaultdict(list)
+    for plr_game, game in games:
+        key = (plr_game.player_id, game.season, SEASON_TYPES[game.type])
+        # starting a new stint whenever a player's team changes
+        if not stints[key] or stints[key][-1][-1][0].team_id != (
+                plr_game.team_id):
+            stints[key].append(list())
+        stints[key][-1].append((plr_game, game))
+
+    return stints
+
+
+def get_goal_stats(goals, games):
+    """
+    Gets goals and points scored by each player on the power play, short
+    handed, in overtime and as game-winners from specified pairs of goals and
+    events. Returns statistics keyed by game and player id.
+    """
+    goal_stats = defaultdict(lambda: defaultdict(int))
+
+    for goal, event in goals:
+        game = games.get(event.game_id)
+        num_situation = (event.num_situation or '').strip()
+        scorers = [(goal.player_id, True)] + [
+            (assist, False) for assist in (goal.assist_1, goal.assist_2) if
+            assist is not None]
+        for player_id, goal_scored in scorers:
+            stats = goal_stats[(event.game_id, player_id)]
+            if num_situation == 'PP':
+                stats['pp_pts'] += 1
+                stats['ppg'] += goal_scored
+            elif num_situation == 'SH':
+                stats['sh_pts'] += 1
+                stats['shg'] += goal_scored
+            if not goal_scored:
+                continue
+            if event.period > 3:
+                stats['otg'] += 1
+            if game is not None and is_game_winning_goal(goal, game):
+                stats['gwg'] += 1
+
+    return goal_stats
+
+
+def is_game_winning_goal(goal, game):
+    """
+    Checks whether specified goal is the game-winning one, i.e. the goal that
+    put the winning team ahead for good. No game-winning goals are credited in
+    games decided by shootout.
+    """
+    if game.shootout_game or game.home_score == game.road_score:
+        return False
+    if game.home_score > game.road_score:
+        winning_team_id, losing_score = game.home_team_id, game.road_score
+    else:
+        winning_team_id, losing_score = game.road_team_id, game.home_score
+    return (
+        goal.team_id == winning_team_id and
+        goal.in_game_team_cnt == losing_score + 1)
+
+
+def aggregate_skater_stint(stint, goal_stats):
+    """
+    Aggregates specified player games of a single stint into season data
+    structured like the season statistics retrieved from the NHL API.
+    """
+    totals = defaultdict(int)
+    toi = timedelta(0)
+
+    for plr_game, game in stint:
+        for attr in [
+            'goals', 'assists', 'points', 'plus_minus', 'pim',
+            'shots_on_goal', 'faceoffs_won', 'faceoffs_lost'
+        ]:
+            totals[attr] += getattr(plr_game, attr) or 0
+        if plr_game.toi_overall is not None:
+            toi += plr_game.toi_overall
+        stats = goal_stats.get((plr_game.game_id, plr_game.player_id), dict())
+        for attr in ['ppg', 'pp_pts', 'shg', 'sh_pts', 'gwg', 'otg']:
+            totals[attr] += stats.get(attr, 0)
+
+    faceoffs = totals['faceoffs_won'] + totals['faceoffs_lost']
+
+    return {
+        "gamesPlayed": len(stint),
+        "goals": totals['goals'],
+        "assists": totals['assists'],
+        "points": totals['points'],
+        "plusMinus": totals['plus_minus'],
+        "pim": totals['pim'],
+        "shots": totals['shots_on_goal'],
+        "powerPlayGoals": totals['ppg'],
+        "powerPlayPoints": totals['pp_pts'],
+        "shorthandedGoals": totals['shg'],
+        "shorthandedPoints": totals['sh_pts'],
+        "gameWinningGoals": totals['gwg'],
+        "otGoals": totals['otg'],
+        "faceoffWinningPctg": (
+            round(totals['faceoffs_won'] / float(faceoffs), 4) if
+            faceoffs else 0.),
+        "timeOnIce": format_toi(toi),
+    }
+
+
+def aggregate_goalie_stint(stint):
+    """
+    Aggregates specified goalie games of a single stint into season data
+    structured like the season statistics retrieved from the NHL API. Save
+    percentage and goals against average are calculated from these totals
+    upon creation of the goalie season item.
+    """
+    totals = defaultdict(int)
+    toi = timedelta(0)
+
+    for goalie_game, game in stint:
+        for attr in [
+            'starting', 'win', 'loss', 'otl', 'tie', 'shutout',
+            'shots_against', 'goals_against'
+        ]:
+            totals[attr] += int(getattr(goalie_game, attr) or 0)
+        if goalie_game.toi_overall is not None:
+            toi += goalie_game.toi_overall
+
+    return {
+        "gamesPlayed": len(stint),
+        "gamesStarted": totals['starting'],
+        "wins": totals['win'],
+        "losses": totals['loss'],
+        "otLosses": totals['otl'],
+        "ties": totals['tie'],
+        "shutouts": totals['shutout'],
+        "shotsAgainst": totals['shots_against'],
+        "goalsAgainst": totals['goals_against'],
+        "timeOnIce": format_toi(toi),
+    }
+
+
+def format_toi(toi):
+    """
+    Formats specified time interval as minutes and seconds, i.e. '1234:56'.
+    """
+    minutes, seconds = divmod(int(toi.total_seconds()), 60)
+    return "%d:%02d" % (minutes, seconds)
+
+
+def match_db_items(new_items, db_items):
+    """
+    Matches specified derived season items with existing ones, i.e. the
+    first stint with a team in a season with the first existing item for
+    this team and so on. Derived items adopt the season team sequence of
+    their matching item, unmatched ones are appended to the existing ones.
+    Returns pairs of existing (or None) and derived items.
+    """
+    db_items_by_team = defaultdict(list)
+    max_sequence = defaultdict(int)
+    for db_item in sorted(db_items, key=lambda x: x.season_team_sequence):
+        key = (db_item.player_id, db_item.season, db_item.season_type)
+        db_items_by_team[key + (db_item.team_id,)].append(db_item)
+        max_sequence[key] = max(
+            max_sequence[key], db_item.season_team_sequence)
+
+    pairs = list()
+    for new_item in new_items:
+        key = (new_item.player_id, new_item.season, new_item.season_type)
+        candidates = db_items_by_team[key + (new_item.team_id,)]
+        if candidates:
+            db_item = candidates.pop(0)
+            new_item.season_team_sequence = db_item.season_team_sequence
+        else:
+            db_item = None
+            max_sequence[key] += 1
+            new_item.season_team_sequence = max_sequence[key]
+        pairs.append((db_item, new_item))
+
+    return pairs
+
+
+def get_storable_pairs(pairs):
+    """
+    Gets pairs of existing and derived season items that may be stored, i.e.
+    those without an existing item or with derived items covering at least
+    as many games as the existing ones. Existing items with more games played
+    are based on data not (yet) available in the database.
+    """
+    return [
+        (db_item, new_item) for db_item, new_item in pairs if
+        db_item is None or db_item.games_played is None or
+        new_item.games_played >= db_item.games_played]
+
+
+def reconcile(pairs):
+    """
+    Compares specified pairs of existing and derived season items. Returns
+    discrepancies as tuples of player id, season, season type, team id,
+    attribute, existing and derived value.
+    """
+    discrepancies = list()
+
+    for db_item, new_item in pairs:
+        if db_item is None:
+            continue
+        if isinstance(new_item, GoalieSeason):
+            attrs = GOALIE_RECONCILE_ATTRS
+        else:
+            attrs = SKATER_RECONCILE_ATTRS
+        for attr in attrs:
+            db_value = getattr(db_item, attr, None)
+            new_value = getattr(new_item, attr, None)
+            # skipping items that haven't been retrieved at all
+            if db_value is None or db_value == new_value:
+                continue
+            discrepancies.append((
+                new_item.player_id, new_item.season, new_item.season_type,
+                new_item.team_id, attr, db_value, new_value))
+
+    return discrepancies
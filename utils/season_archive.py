@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Seekable per-season container for downloaded summary data. Each file is
+compressed independently and appended to the archive, followed by an index
+keyed by game id and a fixed-size trailer pointing to the index:
+
+    [header][member]...[member][index][trailer]
+
+Updates append new members along with a new index and trailer, leaving all
+existing data untouched. Readers memory-map the archive and access any member
+by a single seek using the index read from the end of the file.
+"""
+import os
+import json
+import mmap
+import zlib
+import struct
+import logging
+import threading
+from zipfile import ZipFile
+
+logger = logging.getLogger(__name__)
+
+
+class SeasonArchive():
+
+    # file name suffix for season archives
+    SUFFIX = '.sar'
+    # magic number at the beginning of each season archive
+    HEADER = b'NHLSAR01'
+    # trailer consisting of index offset, index length and magic number
+    TRAILER_FORMAT = '<QI4s'
+    TRAILER_MAGIC = b'SIDX'
+    TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+    # codecs for stored members
+    STORED = 'n'
+    DEFLATED = 'z'
+    # magic number of zstd-compressed data, i.e. data that is stored as is
+    ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+    def __init__(self, path):
+        self.path = path
+        # index entries by game id and file name, each consisting of offset,
+        # stored size, codec and crc of uncompressed data
+        self.index = dict()
+        # additional information, e.g. game dates, by game id
+        self.game_info = dict()
+        self.mm = None
+        self.fh = None
+        self.lock = threading.Lock()
+        if os.path.isfile(path):
+            self.open()
+
+    def open(self):
+        """
+        Maps archive file into memory and reads index from its end.
+        """
+        self.close()
+        self.fh = open(self.path, 'rb')
+        self.mm = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mm[:len(self.HEADER)] != self.HEADER:
+            raise ValueError("%s is not a season archive" % self.path)
+        index_offset, index_length, magic = struct.unpack(
+            self.TRAILER_FORMAT, self.mm[-self.TRAILER_SIZE:])
+        if magic != self.TRAILER_MAGIC:
+            raise ValueError("%s lacks a valid index" % self.path)
+
+        index_data = json.loads(
+            zlib.decompress(self.mm[index_offset:index_offset + index_length]))
+        self.index = index_data['index']
+        self.game_info = index_data['games']
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_game_ids(self, dates=None):
+        """
+        Gets ids of games contained in archive, optionally only those played
+        on one of the specified dates (as ISO-formatted strings).
+        """
+        if dates is None:
+            return sorted(self.index)
+        return sorted(
+            game_id for game_id in self.index if
+            self.game_info.get(game_id, dict()).get('date') in dates)
+
+    def namelist(self):
+        """
+        Gets names of all files contained in archive.
+        """
+        return sorted(
+            name for game_files in self.index.values() for name in game_files)
+
+    def get_entry(self, name):
+        """
+        Gets index entry for file with specified name.
+        """
+        for game_files in self.index.values():
+            if name in game_files:
+                return game_files[name]
+
+    def read(self, name, game_id=None):
+        """
+        Reads contents of file with specified name, looking it up among the
+        files of the specified game if possible.
+        """
+        if game_id is not None:
+            entry = self.index.get(game_id, dict()).get(name)
+        else:
+            entry = self.get_entry(name)
+        if entry is None:
+            raise KeyError("%s not found in %s" % (name, self.path))
+
+        offset, size, codec, crc = entry
+        data = self.mm[offset:offset + size]
+        if codec == self.DEFLATED:
+            data = zlib.decompress(data)
+
+        return data
+
+    def append(self, members, game_info=None):
+        """
+        Appends specified members, i.e. tuples of game id, file name and
+        contents, to the archive. Members identical to already archived ones
+        are skipped. Returns number of appended members.
+        """
+        with self.lock:
+            index = {
+                game_id: dict(game_files) for
+                game_id, game_files in self.index.items()}
+            game_info_all = dict(self.game_info)
+            if game_info:
+                game_info_all.update(game_info)
+
+            new_file = not os.path.isfile(self.path)
+            self.close()
+            appended = 0
+
+            with open(self.path, 'ab') as archive:
+                start = archive.tell()
+                try:
+                    if new_file:
+                        archive.write(self.HEADER)
+                    for game_id, name, content in members:
+                        if isinstance(content, str):
+                            content = content.encode('utf-8')
+                        crc = zlib.crc32(content)
+                        existing = index.get(game_id, dict()).get(name)
+                        if existing is not None and existing[3] == crc:
+                            continue
+                        # compressing each member independently unless it is
+                        # compressed already
+                        if content.startswith(self.ZSTD_MAGIC):
+                            codec, data = self.STORED, content
+                        else:
+                            codec, data = self.DEFLATED, zlib.compress(content)
+                        index.setdefault(game_id, dict())[name] = [
+                            archive.tell(), len(data), codec, crc]
+                        archive.write(data)
+                        appended += 1
+
+                    if appended or new_file:
+                        index_data = zlib.compress(json.dumps(
+                            {'index': index, 'games': game_info_all},
+                            separators=(',', ':')).encode('utf-8'))
+                        index_offset = archive.tell()
+                        archive.write(index_data)
+                        archive.write(struct.pack(
+                            self.TRAILER_FORMAT, index_offset,
+                            len(index_data), self.TRAILER_MAGIC))
+                except Exception:
+                    # discarding incomplete update to keep archive readable
+                    archive.truncate(start)
+                    raise
+
+            self.open()
+            return appended
+
+    def append_zip(self, zip_path, game_date=None):
+        """
+        Appends all files of the specified zip file, i.e. the downloaded
+        summaries of a single date, to the archive.
+        """
+        members = list()
+        game_info = dict()
+        with ZipFile(zip_path) as zip:
+            for name in zip.namelist():
+                game_id = get_game_id_from_file_name(name)
+                if game_id is None:
+                    continue
+                members.append((game_id, name, zip.read(name)))
+                if game_date is not None:
+                    game_info[game_id] = {'date': game_date}
+
+        return self.append(members, game_info)
+
+    def contains_zip(self, zip_path):
+        """
+        Checks whether all game files of the specified zip file are contained
+        in the archive with identical contents, i.e. whether the zip file
+        doesn't contain any corrections made after archiving. Only the
+        checksums stored in both files are compared.
+        """
+        with ZipFile(zip_path) as zip:
+            for info in zip.infolist():
+                game_id = get_game_id_from_file_name(info.filename)
+                if game_id is None:
+                    continue
+                entry = self.index.get(game_id, dict()).get(info.filename)
+                if entry is None or entry[3] != info.CRC:
+                    return False
+        return True
+
+
+def get_game_id_from_file_name(name):
+    """
+    Gets game id from specified file name, i.e. 'ES020081.HTM' or
+    '020081_sc.json'.
+    """
+    base = os.path.basename(name).split('.')[0].split('_')[0]
+    game_id = base[-6:]
+    if len(game_id) == 6 and game_id.isdigit():
+        return game_id
+
+
+def get_season_archive_path(tgt_dir, season):
+    """
+    Gets path to archive for specified season in given directory.
+    """
+    return os.path.join(
+        tgt_dir, "%d%d%s" % (season, season + 1, SeasonArchive.SUFFIX))
@@ -5,14 +5,17 @@ import os
 import json
 import logging
 
-import requests
 from lxml import html, etree
 
-from db.player import Player
+from utils.player_name_index import get_player_name_index
+from utils import http_client
 
 logger = logging.getLogger(__name__)
 
 JSON_SUMMARY_URL_TEMPLATE = "https://api-web.nhle.com/v1/gamecenter/%s/play-by-play"
+# query parameters for JSON summary requests, shared with game feed downloads
+# to make responses retrieved by both available in a common fetch cache
+JSON_SUMMARY_PARAMS = {'site': 'en_nhl'}
 
 
 def add_nhl_ids_to_content(url, content):
@@ -20,6 +23,20 @@ def add_nhl_ids_to_content(url, content):
     Adds player ids used by nhl.com to each roster player on event summary
     to allow for a unique identification later on.
     """
+    # parsing html content into document tree first
+    doc = html.document_fromstring(content)
+    add_nhl_ids_to_document(url, doc)
+
+    return etree.tostring(doc, method='html', pretty_print=True)
+
+
+def add_nhl_ids_to_document(url, doc, fetch_cache=None):
+    """
+    Adds player ids used by nhl.com to each roster player in the specified
+    (already parsed) event summary document tree. Modifies the document tree
+    in place. If a fetch cache is specified, the JSON summary is retrieved
+    through it.
+    """
     # retrieving current season and game id from specified url
     season = int(os.path.dirname(url).split("/")[-1][:4])
     game_id = os.path.basename(url).split(".")[0][2:]
@@ -27,7 +44,7 @@ def add_nhl_ids_to_content(url, content):
     # setting up fully qualified game id to be used in boxscore url
     full_game_id = "%d%s" % (season, game_id)
     # retrieving json summary from  NHL stats API
-    summary = retrieve_summary(full_game_id)
+    summary = retrieve_summary(full_game_id, fetch_cache)
 
     # if json boxscore is valid, use it to retrieve nhl player ids from it
     if summary and 'rosterSpots' in summary.keys():
@@ -40,11 +57,9 @@ def add_nhl_ids_to_content(url, content):
         logger.warn(
             "Trying to retrieve nhl ids from database for " +
             "game %s" % full_game_id)
-        road_players, home_players = retrieve_player_ids_from_database(content)
+        road_players, home_players = retrieve_player_ids_from_database(doc)
 
     # finally adding retrieved player ids to recently downloaded game rosters
-    # parsing html content into document tree first
-    doc = html.document_fromstring(content)
     for players, sibling_type in zip(
             [road_players, home_players], ['preceding', 'following']):
         # retrieving all table cells that contain a player's number
@@ -52,7 +67,7 @@ def add_nhl_ids_to_content(url, content):
         # inserting player id in span element behind player's numbers
         insert_nhl_ids(tds, players)
 
-    return etree.tostring(doc, method='html', pretty_print=True)
+    return doc
 
 
 def insert_nhl_ids(tds, players):
@@ -106,13 +121,11 @@ def get_table_cells(doc, sibling_type):
     return list(distinct_table_cells.values())
 
 
-def retrieve_player_ids_from_database(content):
+def retrieve_player_ids_from_database(game_report):
     """
-    Retrieves NHL player ids for all players listed in event summary from
-    database.
+    Retrieves NHL player ids for all players listed in (parsed) event summary
+    from database.
     """
-    # parsing raw HTML data into structured format
-    game_report = html.document_fromstring(content)
 
     # retrieving player numbers and names from the game report raw data
     # TODO: check xpath expressions for general validity
@@ -155,13 +168,17 @@ def retrieve_player_ids_from_summary(summary):
     return player_nos_by_team['away'], player_nos_by_team['home']
 
 
-def retrieve_summary(full_game_id):
+def retrieve_summary(full_game_id, fetch_cache=None):
     """
     Retrieves JSON summary from NHL stats API using the specified game id.
+    Uses specified fetch cache to avoid requesting the same data twice.
     """
     try:
         url = JSON_SUMMARY_URL_TEMPLATE % full_game_id
-        req = requests.get(url, params={'site': 'en_nhl'})
+        if fetch_cache is not None:
+            req = fetch_cache.get(url, params=JSON_SUMMARY_PARAMS)
+        else:
+            req = http_client.get(url, params=JSON_SUMMARY_PARAMS)
         logger.info(f"Retrieving player nhl ids for game {full_game_id} from {req.url}")
         summary = json.loads(req.text)
     except:
@@ -207,13 +224,8 @@ def retrieve_player_id(last_name, first_name, position):
     well as position.
     """
 
-    plr = Player.find_by_name(first_name, last_name)
-
-    if plr is None:
-        plr = Player.find_by_name_position(first_name, last_name, position)
-
-    if plr is None:
-        plr = Player.find_by_name_extended(first_name, last_name)
+    # resolving player name using in-memory index of all players
+    plr = get_player_name_index().find(first_name, last_name, position)
 
     if plr is None:
         logger.error(
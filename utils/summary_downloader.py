@@ -6,15 +6,24 @@ import re
 import sys
 import json
 import hashlib
+import threading
+from datetime import datetime, timedelta
+from zipfile import ZipFile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from functools import partial
 from urllib.parse import urlsplit
 
-import requests
+from lxml import html, etree
 from dateutil.parser import parse
 from dateutil.rrule import rrule, DAILY
 
 from .multi_downloader import MultiFileDownloader
-from .summary_data_injector import add_nhl_ids_to_content
-from utils import adjust_html_response
+from .fetch_cache import FetchCache
+from .summary_data_injector import add_nhl_ids_to_document, JSON_SUMMARY_PARAMS
+from utils import adjust_html_document, minify_html_document
+from utils import http_client
+from utils import json_storage
 
 BASE_URL = 'https://api-web.nhle.com'
 
@@ -41,7 +50,21 @@ class SummaryDownloader(MultiFileDownloader):
 
     GAME_ID_PATTERN = R"\d{2}\d{4}"
 
-    def __init__(self, tgt_dir, date, to_date='', zip_summaries=True, workers=0, cleanup=True, exclude=None):
+    # game states indicating finished games
+    FINAL_GAME_STATES = ['OFF', 'FINAL']
+    # http status codes indicating missing reports
+    MISSING_STATUS_CODES = [404, 410]
+    # reports still missing this long after a game are regarded as
+    # permanently missing
+    MISSING_PERMANENTLY_AFTER = timedelta(days=7)
+    # intervals to re-check missing reports for recent (less than a day old)
+    # and older games
+    RECHECK_RECENT_MISSING_AFTER = timedelta(hours=1)
+    RECHECK_MISSING_AFTER = timedelta(days=1)
+    # game properties retained in cached schedule
+    SCHEDULE_GAME_KEYS = ['id', 'season', 'gameType', 'gameState', 'gameOutcome']
+
+    def __init__(self, tgt_dir, date, to_date='', zip_summaries=True, workers=0, cleanup=True, exclude=None, minify=False, game_queue=None, skip_archived=True, resume=True, raw_json=False):
         # constructing base class instance
         super().__init__(tgt_dir, zip_summaries, workers, cleanup)
         # parsing start date for summary retrieval
@@ -53,10 +76,36 @@ class SummaryDownloader(MultiFileDownloader):
             self.to_date = self.date
         # preparing list of dates to download summary data for
         self.game_dates = list(rrule(DAILY, dtstart=self.date, until=self.to_date))
+        self.current_date = self.date
         # storing datasets to be excluded from downloading
         self.exclude = list()
         if exclude is not None:
             self.exclude = exclude
+        # setting flag whether to minify downloaded html reports
+        self.minify = minify
+        # setting flag whether to store downloaded json data as raw response
+        # bytes (compressed if possible) instead of pretty-printing it
+        self.raw_json = raw_json
+        # setting up cache to share play-by-play data between game feed
+        # download and nhl id injection into event summaries
+        self.fetch_cache = FetchCache()
+        # setting up (bounded) queue to publish games to as soon as all of
+        # their files have been downloaded
+        self.game_queue = game_queue
+        # numbers of files still to be downloaded by full game id, i.e.
+        # including the season to tell apart games of different seasons
+        self.pending_game_files = dict()
+        # downloaded files by full game id
+        self.downloaded_game_files = defaultdict(list)
+        self.game_lock = threading.Lock()
+        # numbers of published games not yet processed by date, finalizing a
+        # date waits for its games only
+        self.published_games = defaultdict(int)
+        self.game_processed = threading.Condition(self.game_lock)
+        # thread-specific context of current downloading task, i.e. the path
+        # to the zip file of the date the task belongs to
+        self.task_context = threading.local()
+        self.zip_path = None
 
         # preparing connection to dumped dictionary of modification timestamps
         self.mod_timestamp_src = os.path.join(tgt_dir, '_mod_timestamps.json')
@@ -66,12 +115,55 @@ class SummaryDownloader(MultiFileDownloader):
         else:
             self.mod_timestamps = dict()
 
+        # setting flag whether to skip games that have been completely
+        # downloaded and archived before
+        self.skip_archived = skip_archived
+        # preparing connection to dumped dictionary of scheduled games by date
+        self.schedule_src = os.path.join(tgt_dir, '_schedule.json')
+        # loading previously retrieved schedule (if available)
+        if os.path.isfile(self.schedule_src):
+            self.schedule = json.loads(open(self.schedule_src).read())
+        else:
+            self.schedule = dict()
+        # preparing connection to dumped dictionary of timestamps of schedule
+        # retrievals by date
+        self.schedule_retrieved_src = os.path.join(tgt_dir, '_schedule_retrieved.json')
+        # loading previously registered schedule retrievals (if available)
+        if os.path.isfile(self.schedule_retrieved_src):
+            self.schedule_retrieved = json.loads(open(self.schedule_retrieved_src).read())
+        else:
+            self.schedule_retrieved = dict()
+
+        # preparing connection to dumped dictionary of missing reports, i.e.
+        # timestamps of last unsuccessful retrievals by url
+        self.missing_reports_src = os.path.join(tgt_dir, '_missing_reports.json')
+        # loading previously registered missing reports (if available)
+        if os.path.isfile(self.missing_reports_src):
+            self.missing_reports = json.loads(open(self.missing_reports_src).read())
+        else:
+            self.missing_reports = dict()
+
+        # setting flag whether to resume an interrupted run
+        self.resume = resume
+        # preparing connection to dumped list of dates completed in an
+        # interrupted run
+        self.checkpoint_src = os.path.join(tgt_dir, '_checkpoint.json')
+        # dates completed in current (or resumed) run
+        self.completed_dates = set()
+
     def get_tgt_dir(self):
         """
         Returns target directory according to current date.
         """
         return os.path.join(self.base_tgt_dir, self.current_date.strftime("%Y-%m"))
 
+    def get_current_zip_path(self):
+        """
+        Returns path to zip file of the date the current downloading task
+        belongs to.
+        """
+        return getattr(self.task_context, 'zip_path', self.zip_path)
+
     def get_zip_name(self):
         """
         Returns file name of zipped downloads for current date.
@@ -90,21 +182,153 @@ class SummaryDownloader(MultiFileDownloader):
         """
         # making sure that the list of files to download is empty
         self.files_to_download = list()
-        # preparing formatted date string as necessary for scoreboard retrieval
-        fmt_date = "%d-%02d-%02d" % (self.current_date.year, self.current_date.month, self.current_date.day)
+        # retrieving (possibly cached) schedule for current date
+        games = self.retrieve_schedule(self.current_date)
+        self.files_to_download = self.get_files_to_download_for_games(games, self.current_date)
+
+    def retrieve_schedule(self, game_date):
+        """
+        Retrieves games scheduled for the specified date. Uses the cached
+        schedule if all of the date's games are final already, otherwise
+        retrieves the schedule for the whole week beginning at this date.
+        """
+        # preparing formatted date string as necessary for schedule retrieval
+        fmt_date = self.get_formatted_date(game_date)
+
+        if self.check_for_final_schedule(fmt_date):
+            return self.schedule[fmt_date]
 
-        # retrieving schedule for current date in json format
+        # retrieving schedule for week beginning with date in json format
         schedule_url = "/".join((self.SCHEDULE_URL_BASE, fmt_date))
-        req = requests.get(schedule_url)
-        json_scoreboard = json.loads(req.text)
-        self.files_to_download = self.get_files_to_download_from_scoreboard(json_scoreboard)
+        req = http_client.get(schedule_url)
+        json_schedule = json.loads(req.text)
+
+        for game_day in json_schedule['gameWeek']:
+            # retaining archive status of previously cached games
+            archived_game_ids = set([
+                game['id'] for game in self.schedule.get(game_day['date'], list())
+                if game.get('archived')])
+            games = list()
+            for game in game_day['games']:
+                game = {key: game[key] for key in self.SCHEDULE_GAME_KEYS if key in game}
+                if game['id'] in archived_game_ids:
+                    game['archived'] = True
+                games.append(game)
+            self.schedule[game_day['date']] = games
+            self.schedule_retrieved[game_day['date']] = datetime.now().isoformat()
+
+        return self.schedule.setdefault(fmt_date, list())
+
+    def check_for_final_schedule(self, fmt_date):
+        """
+        Checks whether the cached schedule for the specified (formatted) date
+        is final, i.e. all of its games are final. Dates without games are
+        only regarded as final if the schedule has been retrieved after the
+        date had passed, as games may still be added before.
+        """
+        if fmt_date not in self.schedule:
+            return False
+        if self.schedule[fmt_date]:
+            return all(
+                game['gameState'] in self.FINAL_GAME_STATES for
+                game in self.schedule[fmt_date])
+        if fmt_date not in self.schedule_retrieved:
+            return False
+        return parse(self.schedule_retrieved[fmt_date]) >= parse(fmt_date) + timedelta(days=1)
+
+    def retrieve_slate(self):
+        """
+        Retrieves schedules for all registered game dates in advance, using
+        one request per week at most.
+        """
+        for game_date in self.game_dates:
+            self.retrieve_schedule(game_date)
+
+    def get_expected_files(self, game):
+        """
+        Gets names of all files expected to be available for the specified
+        (final) game.
+        """
+        game_id = str(game['id'])[4:]
+        report_types = list(self.REPORT_TYPES)
+        # shootout reports only exist for games that ended in a shootout
+        if game.get('gameOutcome', dict()).get('lastPeriodType') != 'SO':
+            report_types.remove('SO')
+        expected_files = ["".join((rt, game_id, ".HTM")) for rt in report_types]
+        expected_files.append(".".join((game_id, "json")))
+        expected_files.append("".join((game_id, "_sc.json")))
+
+        return expected_files
+
+    def mark_archived_games(self, tgt_dir):
+        """
+        Marks final games of the current date as archived if all of their
+        expected files have been downloaded.
+        """
+        fmt_date = self.get_formatted_date(self.current_date)
+        for game in self.schedule.get(fmt_date, list()):
+            if game['gameState'] not in self.FINAL_GAME_STATES:
+                continue
+            if all(
+                self.check_for_file(self.zip_path, f) or
+                os.path.isfile(os.path.join(tgt_dir, f)) or
+                # permanently missing reports won't be available ever
+                self.check_for_permanently_missing_report("".join((
+                    self.HTML_REPORT_PREFIX, str(game['season']), "/", f)), self.current_date) for
+                f in self.get_expected_files(game)
+            ):
+                game['archived'] = True
 
     def get_files_to_download_from_scoreboard(self, json_scoreboard):
         """
         Gets downloadable files from JSON scoreboard page.
         """
+        return self.get_files_to_download_for_games(json_scoreboard['gameWeek'][0]['games'])
+
+    def check_for_missing_report(self, url, game_date):
+        """
+        Checks whether the report at the specified url is known to be missing.
+        Reports still missing a week after the game are regarded as
+        permanently missing, otherwise they are checked again after an hour
+        (for recent games) or a day.
+        """
+        if url not in self.missing_reports:
+            return False
+        if self.check_for_permanently_missing_report(url, game_date):
+            return True
+
+        checked = parse(self.missing_reports[url])
+        game_date = datetime(game_date.year, game_date.month, game_date.day)
+        if checked - game_date < timedelta(days=1):
+            return datetime.now() - checked < self.RECHECK_RECENT_MISSING_AFTER
+        return datetime.now() - checked < self.RECHECK_MISSING_AFTER
+
+    def check_for_permanently_missing_report(self, url, game_date):
+        """
+        Checks whether the report at the specified url is known to be missing
+        permanently, i.e. it was still missing a week after the game.
+        """
+        if url not in self.missing_reports:
+            return False
+
+        checked = parse(self.missing_reports[url])
+        game_date = datetime(game_date.year, game_date.month, game_date.day)
+        return checked - game_date >= self.MISSING_PERMANENTLY_AFTER
+
+    def register_missing_report(self, url):
+        """
+        Registers the report at the specified url as missing.
+        """
+        self.missing_reports[url] = datetime.now().isoformat()
+
+    def get_files_to_download_for_games(self, games, game_date=None):
+        """
+        Gets downloadable files for specified scheduled games. Skips reports
+        known to be missing and shootout reports for games that didn't end in
+        a shootout.
+        """
         files_to_download = list()
-        for game in json_scoreboard['gameWeek'][0]['games']:
+        for game in games:
             season = game['season']
             full_game_id = game['id']
             game_type = game['gameType']
@@ -113,14 +337,25 @@ class SummaryDownloader(MultiFileDownloader):
             # skipping game unless it's a regular season or playoff game
             if game_type not in self.GAME_TYPES:
                 continue
+            # skipping games that are not final yet
+            if 'gameState' in game and game['gameState'] not in self.FINAL_GAME_STATES:
+                print("+ Skipping game %d (not final yet)" % full_game_id)
+                continue
+            # skipping games that have been completely archived before
+            if self.skip_archived and game.get('archived'):
+                continue
             # constructing urls to individual game report pages
             if 'html_reports' not in self.exclude:
                 for rt in self.REPORT_TYPES:
                     # only adding shootout report to files to be downloaded
-                    # if the current game ended in a shootout
-                    # if rt == 'SO' and not game['linescore']['hasShootout']:
-                    #     continue
+                    # if the current game ended in a shootout (or if it's
+                    # unknown how the game ended)
+                    if rt == 'SO' and 'gameOutcome' in game and game['gameOutcome'].get('lastPeriodType') != 'SO':
+                        continue
                     htmlreport_url = "".join((self.HTML_REPORT_PREFIX, str(season), "/", rt, str(game_id), ".HTM"))
+                    # skipping reports known to be missing
+                    if game_date is not None and self.check_for_missing_report(htmlreport_url, game_date):
+                        continue
                     files_to_download.append((htmlreport_url, None))
             # setting upd json game feed url and adding it to list of
             # files to be downloaded
@@ -144,7 +379,7 @@ class SummaryDownloader(MultiFileDownloader):
         # target file exists in file system or in a corresponding zip file
         if (
             os.path.isfile(tgt_path) or self.check_for_file(
-                self.zip_path, os.path.basename(tgt_path))
+                self.get_current_zip_path(), os.path.basename(tgt_path))
         ):
             # if data has been downloaded before, retrieve last
             # modification timestamp
@@ -153,26 +388,56 @@ class SummaryDownloader(MultiFileDownloader):
 
         return ""
 
+    def download_task_for_date(self, date, zip_path, url, tgt_dir, tgt_file):
+        """
+        Represents a single downloading task for the specified date with the
+        specified zip file.
+        """
+        self.task_context.date = date
+        self.task_context.zip_path = zip_path
+        return self.download_task(url, tgt_dir, tgt_file)
+
     def download_task(self, url, tgt_dir, tgt_file):
         """
         Represents a single downloading task.
         """
-        # setting up target path
+        # setting up target file
         if tgt_file is None:
             tgt_file = os.path.basename(urlsplit(url).path)
+
+        tgt_path = None
+        try:
+            tgt_path = self.download_file(url, tgt_dir, tgt_file)
+            return tgt_path
+        finally:
+            # registering finished download with corresponding game
+            if self.game_queue is not None:
+                self.finish_game_file(tgt_dir, tgt_file, tgt_path)
+
+    def download_file(self, url, tgt_dir, tgt_file):
+        """
+        Downloads a single file from specified url to given target location.
+        """
+        # setting up target path
         tgt_path = os.path.join(tgt_dir, tgt_file)
 
         # downloading data according to actual content type
         if url.lower().endswith('.htm'):
             content = self.download_html_content(url, tgt_path)
-            write_type = 'wb'
         else:
             content = self.download_json_content(url, tgt_path)
-            write_type = 'w'
+        write_type = 'wb' if isinstance(content, bytes) else 'w'
 
         if content:
+            # skipping content that is identical to an already zipped file
+            zip_path = self.get_current_zip_path()
+            if self.check_for_identical_file(zip_path, tgt_file, content):
+                return
             # writing downloaded content to target path
-            open(tgt_path, write_type).write(content)
+            with open(tgt_path, write_type) as tgt:
+                tgt.write(content)
+            # registering written file with index of zip file contents
+            self.register_file(zip_path, tgt_file, content)
             return tgt_path
 
     def download_html_content(self, url, tgt_path):
@@ -192,10 +457,13 @@ class SummaryDownloader(MultiFileDownloader):
         # downloaded data
         if mod_time_stamp:
             headers['If-Modified-Since'] = mod_time_stamp
-        req = requests.get(url, headers=headers)
+        req = http_client.get(url, headers=headers)
 
         # if server responds with code for no modification
-        if req.status_code == 304:
+        if req.status_code in self.MISSING_STATUS_CODES:
+            self.register_missing_report(url)
+            return
+        elif req.status_code == 304:
             # TODO: proper logging
             sys.stdout.write(".")
             sys.stdout.flush()
@@ -204,14 +472,33 @@ class SummaryDownloader(MultiFileDownloader):
             # TODO: proper logging
             sys.stdout.write("+")
             sys.stdout.flush()
+            # previously missing reports may have been published meanwhile
+            self.missing_reports.pop(url, None)
             # updating modification timestamp in corresponding dictionary
             self.mod_timestamps[url] = req.headers.get('Last-Modified')
-            # adjusting html data
-            content = adjust_html_response(req)
-            if "ES" in url:
-                content = add_nhl_ids_to_content(url, content)
+            return self.process_html_content(url, req)
 
-            return content
+    def process_html_content(self, url, req):
+        """
+        Applies all necessary modifications to the html content of the
+        specified response. Parses and serializes the content only once.
+        """
+        # converting to document tree
+        doc = html.document_fromstring(req.text)
+        # removing scripts and adding timestamp of last modification
+        adjust_html_document(doc, req.headers.get('Last-Modified'))
+        # adding nhl player ids to event summaries
+        is_event_summary = "ES" in url
+        if is_event_summary:
+            add_nhl_ids_to_document(url, doc, self.fetch_cache)
+        if self.minify:
+            minify_html_document(doc)
+
+        # returning document tree dumped as string, event summaries are
+        # pretty-printed as before unless minification has been requested
+        return etree.tostring(
+            doc, method='html',
+            pretty_print=is_event_summary and not self.minify)
 
     def download_json_content(self, url, tgt_path):
         """
@@ -229,11 +516,23 @@ class SummaryDownloader(MultiFileDownloader):
         # retrieving MD5 hash of data from last download
         prev_data_hash = self.get_last_modification_timestamp(url, tgt_path)
 
-        req = requests.get(url)
+        # retrieving game feed via cache as it may have been requested already
+        # to add nhl ids to the event summary
+        req = self.fetch_cache.get(url, params=JSON_SUMMARY_PARAMS)
 
         if req.status_code == 200:
-            json_data = req.json()
-            data_hash = hashlib.md5(json.dumps(json_data).encode('utf-8')).hexdigest()
+            if self.raw_json:
+                # hashing raw response bytes, decoding them only if they
+                # have changed since the last download
+                data_hash = hashlib.md5(req.content).hexdigest()
+                if data_hash == prev_data_hash:
+                    sys.stdout.write(".")
+                    sys.stdout.flush()
+                    return
+                json_data = json_storage.loads(req.content)
+            else:
+                json_data = req.json()
+                data_hash = hashlib.md5(json.dumps(json_data).encode('utf-8')).hexdigest()
             # checking whether json data that is due to update an existing data
             # set contains any play information at all and bailing out if that
             # is not the case - by doing so we avoid overwriting existing
@@ -255,7 +554,10 @@ class SummaryDownloader(MultiFileDownloader):
                 sys.stdout.flush()
                 # updating data hash in corresponding dictionary
                 self.mod_timestamps[url] = data_hash
-            # returning json data as prettily formatted string
+            # returning raw (compressed) response bytes...
+            if self.raw_json:
+                return json_storage.compress(req.content)
+            # ...or json data as prettily formatted string
             return json.dumps(json_data, indent=2)
 
     def download_json_shift_chart(self, url, tgt_path):
@@ -266,22 +568,137 @@ class SummaryDownloader(MultiFileDownloader):
         # downloaded before
         existing_data_hash = self.get_last_modification_timestamp(url, tgt_path)
 
-        req = requests.get(url)
+        req = http_client.get(url, stream=self.raw_json)
 
         if req.status_code == 200:
-            json_data = req.json()
-            # calculating MD5 hash for downloaded data
-            json_data_hash = hashlib.md5(json.dumps(json_data).encode('utf-8')).hexdigest()
+            if self.raw_json:
+                # calculating MD5 hash for raw bytes while they are streamed
+                raw_data, json_data_hash = json_storage.read_response(req)
+            else:
+                json_data = req.json()
+                # calculating MD5 hash for downloaded data
+                json_data_hash = hashlib.md5(json.dumps(json_data).encode('utf-8')).hexdigest()
             # comparing hashes of downloaded and already exising data
             if not existing_data_hash == json_data_hash:
                 sys.stdout.write("+")
                 sys.stdout.flush()
                 self.mod_timestamps[url] = json_data_hash
+                if self.raw_json:
+                    return json_storage.compress(raw_data)
                 return json.dumps(json_data, indent=2)
             else:
                 sys.stdout.write(".")
                 sys.stdout.flush()
 
+    def get_game_id_from_file_name(self, file_name):
+        """
+        Gets game id from specified file name, i.e. 'ES020081.HTM' or
+        '020081_sc.json'.
+        """
+        match = re.search(self.GAME_ID_PATTERN, os.path.basename(file_name))
+        if match:
+            return match.group(0)
+
+    def get_full_game_id(self, game_id, date):
+        """
+        Gets full game id, i.e. '2016020081', for the specified game id as
+        used in file names and the date the game has been scheduled for.
+        """
+        for game in self.schedule.get(self.get_formatted_date(date), list()):
+            if str(game['id'])[4:] == game_id:
+                return str(game['id'])
+        # deriving season from date if game can't be found in schedule
+        season = date.year if date.month >= 7 else date.year - 1
+        return "%d%s" % (season, game_id)
+
+    def prepare_game_files(self):
+        """
+        Registers numbers of files to be downloaded for each game.
+        """
+        for url, tgt_file in self.files_to_download:
+            if tgt_file is None:
+                tgt_file = os.path.basename(urlsplit(url).path)
+            full_game_id = self.get_full_game_id(
+                self.get_game_id_from_file_name(tgt_file), self.current_date)
+            self.pending_game_files[full_game_id] = self.pending_game_files.get(
+                full_game_id, 0) + 1
+
+    def finish_game_file(self, tgt_dir, tgt_file, tgt_path):
+        """
+        Registers a finished download (successful or not) and publishes the
+        corresponding game as soon as all of its files have been downloaded.
+        """
+        game_id = self.get_game_id_from_file_name(tgt_file)
+        date = getattr(self.task_context, 'date', self.current_date)
+        full_game_id = self.get_full_game_id(game_id, date)
+        with self.game_lock:
+            if tgt_path:
+                self.downloaded_game_files[full_game_id].append(tgt_path)
+            self.pending_game_files[full_game_id] -= 1
+            if self.pending_game_files[full_game_id] > 0:
+                return
+            # games without any new data don't need to be parsed again
+            if not self.downloaded_game_files[full_game_id]:
+                return
+            self.published_games[self.get_formatted_date(date)] += 1
+
+        # making sure all files of the game are available in target directory
+        extracted_files = self.extract_game_files(game_id, tgt_dir)
+        # publishing game (blocks while the queue is full), extracted files
+        # are removed as soon as the game has been processed
+        self.game_queue.put((game_id, tgt_dir, partial(
+            self.finish_game, self.get_formatted_date(date), extracted_files)))
+
+    def finish_game(self, fmt_date, extracted_files):
+        """
+        Registers a published game of the specified date as processed and
+        removes files extracted for it.
+        """
+        self.remove_extracted_files(extracted_files)
+        with self.game_processed:
+            self.published_games[fmt_date] -= 1
+            self.game_processed.notify_all()
+
+    def wait_for_published_games(self, date):
+        """
+        Waits until all published games of the specified date have been
+        processed.
+        """
+        fmt_date = self.get_formatted_date(date)
+        with self.game_processed:
+            self.game_processed.wait_for(
+                lambda: self.published_games[fmt_date] <= 0)
+            self.published_games.pop(fmt_date, None)
+
+    def extract_game_files(self, game_id, tgt_dir):
+        """
+        Extracts files of the game with the specified id that have not been
+        downloaded anew from the existing zip file to the target directory.
+        Returns paths of extracted files.
+        """
+        extracted_files = list()
+        zip_path = self.get_current_zip_path()
+        if not zip_path or not os.path.isfile(zip_path):
+            return extracted_files
+
+        with ZipFile(zip_path) as zip:
+            for file_name in zip.namelist():
+                if self.get_game_id_from_file_name(file_name) != game_id:
+                    continue
+                if os.path.isfile(os.path.join(tgt_dir, file_name)):
+                    continue
+                extracted_files.append(zip.extract(file_name, tgt_dir))
+
+        return extracted_files
+
+    def remove_extracted_files(self, extracted_files):
+        """
+        Removes specified files previously extracted from existing zip files.
+        """
+        for extracted in extracted_files:
+            if os.path.isfile(extracted):
+                os.unlink(extracted)
+
     def get_downloaded_game_ids(self):
         """
         Gets game ids of games that have been downloaded.
@@ -294,22 +711,154 @@ class SummaryDownloader(MultiFileDownloader):
 
     def run(self):
         """
-        Runs downloading process for all registered game dates.
+        Runs downloading process for all registered game dates. Downloads for
+        all dates share one pool of threads, each date is finalized, i.e.
+        archived, as soon as all of its downloads have finished.
+        """
+        # retrieving schedules for all dates in advance
+        self.retrieve_slate()
+
+        # skipping dates already completed in an interrupted previous run
+        self.completed_dates = self.load_checkpoint()
+        game_dates = [
+            date for date in self.game_dates if
+            self.get_formatted_date(date) not in self.completed_dates]
+        if len(game_dates) < len(self.game_dates):
+            print("+ Resuming interrupted run, skipping %d completed dates" % (
+                len(self.game_dates) - len(game_dates)))
+
+        self.pending_game_files = dict()
+        self.downloaded_game_files = defaultdict(list)
+
+        # numbers of files still to be downloaded by date
+        pending_files = dict()
+        # downloaded files by date
+        downloaded_files = defaultdict(list)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as dld_threads:
+            tasks = dict()
+            for date in game_dates:
+                self.current_date = date
+                self.find_files_to_download()
+                if self.game_queue is not None:
+                    self.prepare_game_files()
+                tgt_dir = self.get_tgt_dir()
+                if not os.path.isdir(tgt_dir):
+                    os.makedirs(tgt_dir)
+                zip_path = self.get_zip_path()
+                pending_files[date] = len(self.files_to_download)
+                for url, tgt_file in sorted(self.files_to_download):
+                    tasks[dld_threads.submit(
+                        self.download_task_for_date, date, zip_path,
+                        url, tgt_dir, tgt_file)] = date
+                # finalizing dates without anything to download right away
+                if not self.files_to_download:
+                    self.finalize_date(date, list())
+
+            for completed_task in as_completed(tasks):
+                date = tasks[completed_task]
+                try:
+                    if completed_task.result():
+                        downloaded_files[date].append(completed_task.result())
+                except Exception as e:
+                    print()
+                    print("Task generated an exception: %s" % e)
+                pending_files[date] -= 1
+                if not pending_files[date]:
+                    self.finalize_date(date, downloaded_files.pop(date, list()))
+
+        self.save_state()
+        # removing dates of this run from checkpoint after all of them have
+        # been completed, retaining those of other interrupted runs
+        self.completed_dates.difference_update([
+            self.get_formatted_date(date) for date in self.game_dates])
+        self.write_checkpoint()
+
+        # reporting on retries and throttling by remote host
+        for host, metrics in sorted(http_client.get_http_client().get_metrics().items()):
+            print("+ %s: %d requests, %d retries, %d throttled" % (
+                host, metrics.get('requests', 0), metrics.get('retries', 0), metrics.get('throttled', 0)))
+
+    def finalize_date(self, date, downloaded_files):
+        """
+        Finalizes downloads for specified date, i.e. zips downloaded files and
+        registers the date as completed.
+        """
+        self.current_date = date
+        self.zip_path = self.get_zip_path()
+        self.downloaded_files = downloaded_files
+        print()
+        print("+ Downloaded summaries for %s" % self.current_date.strftime("%A, %B %d, %Y"))
+
+        # waiting for all published games of this date to be processed
+        # before archiving (and removing) downloaded files
+        if self.game_queue is not None:
+            self.wait_for_published_games(date)
+
+        downloaded_game_ids = self.get_downloaded_game_ids()
+        if downloaded_game_ids:
+            print("Downloaded data for the following game IDs:")
+            print(" ".join(sorted(list(downloaded_game_ids))))
+
+        if self.zip_downloaded_files:
+            self.zip_files(self.get_zip_name(), self.get_tgt_dir())
+
+        self.mark_archived_games(self.get_tgt_dir())
+
+        # cached responses are only needed for games of the current date
+        for game in self.schedule.get(self.get_formatted_date(date), list()):
+            self.fetch_cache.discard(self.JSON_GAME_FEED_URL_TEMPLATE % str(game['id']), JSON_SUMMARY_PARAMS)
+
+        self.save_checkpoint(date)
+
+    def get_formatted_date(self, date):
+        """
+        Returns specified date formatted as string, i.e. '2016-10-12'.
         """
-        for date in self.game_dates:
-            self.current_date = date
-            print("+ Downloading summaries for %s" % self.current_date.strftime("%A, %B %d, %Y"))
-            self.find_files_to_download()
-            self.zip_path = self.get_zip_path()
-            self.download_files(self.get_tgt_dir())
-            print()
+        return "%d-%02d-%02d" % (date.year, date.month, date.day)
 
-            downloaded_game_ids = self.get_downloaded_game_ids()
-            if downloaded_game_ids:
-                print("Downloaded data for the following game IDs:")
-                print(" ".join(sorted(list(downloaded_game_ids))))
+    def load_checkpoint(self):
+        """
+        Loads dates completed in interrupted previous runs, regardless of the
+        range of dates these runs were registered for.
+        """
+        if self.resume and os.path.isfile(self.checkpoint_src):
+            checkpoint = json.loads(open(self.checkpoint_src).read())
+            if isinstance(checkpoint, dict):
+                checkpoint = checkpoint.get('completed_dates', list())
+            return set(checkpoint)
+        return set()
+
+    def save_checkpoint(self, date):
+        """
+        Registers specified date as completed and saves current state to allow
+        for an interrupted run to be resumed. Dates with games not final yet
+        aren't regarded as completed.
+        """
+        fmt_date = self.get_formatted_date(date)
+        if all(
+            game['gameState'] in self.FINAL_GAME_STATES for
+            game in self.schedule.get(fmt_date, list())
+        ):
+            self.completed_dates.add(fmt_date)
+        self.write_checkpoint()
+        self.save_state()
 
-            if self.zip_downloaded_files:
-                self.zip_files(self.get_zip_name(), self.get_tgt_dir())
+    def write_checkpoint(self):
+        """
+        Writes completed dates to checkpoint file, removes it if there are
+        none.
+        """
+        if self.completed_dates:
+            json.dump({'completed_dates': sorted(self.completed_dates)}, open(self.checkpoint_src, 'w'), indent=2)
+        elif os.path.isfile(self.checkpoint_src):
+            os.unlink(self.checkpoint_src)
 
-        json.dump(self.mod_timestamps, open(self.mod_timestamp_src, 'w'), indent=2, sort_keys=True)
+    def save_state(self):
+        """
+        Saves modification timestamps and schedule to disk.
+        """
+        json.dump(dict(self.mod_timestamps), open(self.mod_timestamp_src, 'w'), indent=2, sort_keys=True)
+        json.dump(self.schedule, open(self.schedule_src, 'w'), indent=2, sort_keys=True)
+        json.dump(self.schedule_retrieved, open(self.schedule_retrieved_src, 'w'), indent=2, sort_keys=True)
+        json.dump(dict(self.missing_reports), open(self.missing_reports_src, 'w'), indent=2, sort_keys=True)